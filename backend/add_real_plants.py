@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.core.database import SessionLocal
 from app.models.plant import Plant, PlantCategory, CareLevel
 from app.models.price import PlantPrice
+from app.services.price_summary import refresh_price_summaries
 from datetime import datetime
 
 def add_real_plants():
@@ -233,6 +234,9 @@ def add_real_plants():
             price = PlantPrice(**price_item)
             db.add(price)
         
+        # สรุปราคาของ plant ที่เพิ่มราคาใน transaction เดียวกัน
+        db.flush()
+        refresh_price_summaries(db, {item["plant_id"] for item in price_data})
         db.commit()
         print(f"✅ เพิ่มราคา: {len(price_data)} รายการ")
         
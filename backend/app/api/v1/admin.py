@@ -1,172 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, File, Query, UploadFile
 from sqlalchemy.orm import Session
+from app.core.cache import response_cache
 from app.core.database import get_db
-from app.models.plant import Plant, PlantCategory, CareLevel
+from app.core.db_pool import get_db_connection, pool_stats
+from app.models.plant import Plant
 from app.schemas.plant import PlantCreate, PlantUpdate
-import csv
+from app.services.batch_jobs import recent_job_runs
+from app.services.csv_import import CHUNK_SIZE, ON_CONFLICT_MODES
+from app.services.csv_types import CSV_TYPES
+from app.services.import_jobs import import_jobs
+from app.services.plant_import import import_plants
+from app.services.plant_stats import plant_stats_cache
 import io
-from typing import List, Dict, Any
+import shutil
+import tempfile
+from typing import List, Dict, Any, Optional
 
 router = APIRouter(tags=["admin"])
 
 @router.post("/plants/import-csv")
-async def import_plants_from_csv(
+def import_plants_from_csv(
     file: UploadFile = File(...),
+    on_conflict: str = Query("skip", description="skip: keep existing plants, update: overwrite by scientific_name"),
+    chunk_size: int = Query(CHUNK_SIZE, ge=1, le=5000),
     db: Session = Depends(get_db)
 ):
-    """Import plants from uploaded CSV file"""
+    """Import plants from uploaded CSV file (streamed in chunks, per-row error report)"""
+    # ตรวจสอบไฟล์
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="ไฟล์ต้องเป็น CSV เท่านั้น")
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise HTTPException(status_code=400, detail=f"on_conflict must be one of: {', '.join(ON_CONFLICT_MODES)}")
+    
+    # อ่านจาก spooled temp file ทีละส่วน - ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ
+    stream = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
     try:
-        print("🌱 เริ่ม import ข้อมูลพืชจาก CSV ที่อัพโหลด...")
-        
-        # ตรวจสอบไฟล์
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="ไฟล์ต้องเป็น CSV เท่านั้น")
-        
-        # อ่านข้อมูลจากไฟล์ที่อัพโหลด
-        content = await file.read()
-        csv_text = content.decode('utf-8')
-        
-        # แปลงค่า category ให้ตรงกับ enum
-        category_mapping = {
-            'indoor': PlantCategory.INDOOR,
-            'outdoor': PlantCategory.OUTDOOR,
-            'tropical': PlantCategory.TROPICAL,
-            'succulent': PlantCategory.SUCCULENT,
-            'cactus': PlantCategory.CACTUS,
-            'orchid': PlantCategory.ORCHID,
-            'herb': PlantCategory.HERB,
-            'tree': PlantCategory.TREE,
-            'shrub': PlantCategory.SHRUB,  # เพิ่ม shrub
-            'vine': PlantCategory.VINE,
-            'garden': PlantCategory.GARDEN,
-            'water': PlantCategory.WATER,
-            'rock': PlantCategory.ROCK,
-            'border': PlantCategory.BORDER,
-            'other': PlantCategory.OTHER
-        }
-        
-        # แปลงค่า care_level ให้ตรงกับ enum
-        care_level_mapping = {
-            'easy': CareLevel.EASY,
-            'moderate': CareLevel.MODERATE,
-            'difficult': CareLevel.DIFFICULT
-        }
-        
-        # แปลงค่า boolean
-        def parse_boolean(value):
-            if isinstance(value, str):
-                return value.lower() in ['true', '1', 'yes', 'y']
-            return bool(value)
-        
-        # แปลงค่า numeric
-        def parse_float(value):
-            try:
-                return float(value) if value else 0.0
-            except (ValueError, TypeError):
-                return 0.0
-        
-        plants_added = 0
-        plants_skipped = 0
-        
-        # ใช้ StringIO แทนการเปิดไฟล์
-        csv_io = io.StringIO(csv_text)
-        reader = csv.DictReader(csv_io)
-        
-        for row in reader:
-            try:
-                # ตรวจสอบว่าพืชมีอยู่แล้วหรือไม่
-                existing_plant = db.query(Plant).filter(
-                    Plant.scientific_name == row['scientific_name']
-                ).first()
-                
-                if existing_plant:
-                    plants_skipped += 1
-                    continue
-                
-                # แปลงค่า category
-                csv_category = row['category'].lower()
-                mapped_category = category_mapping.get(csv_category, PlantCategory.OTHER)
-                
-                # Debug logging
-                print(f"DEBUG: CSV category: '{csv_category}' -> Mapped: {mapped_category}")
-                
-                # แปลงค่า care_level
-                csv_care_level = row['care_level'].lower()
-                mapped_care_level = care_level_mapping.get(csv_care_level, CareLevel.MODERATE)
-                
-                # สร้างพืชใหม่
-                plant = Plant(
-                    scientific_name=row['scientific_name'],
-                    common_name_th=row['common_name_th'],
-                    common_name_en=row['common_name_en'],
-                    category=mapped_category,
-                    care_level=mapped_care_level,
-                    origin_country=row['origin_country'],
-                    description_th=row['description_th'],
-                    description_en=row['description_th'],
-                    care_instructions=row['care_instructions'],
-                    water_needs=row['water_needs'],
-                    light_needs=row['light_needs'],
-                    humidity_needs=row['humidity_needs'],
-                    temperature_min=parse_float(row['temperature_min']),
-                    temperature_max=parse_float(row['temperature_max']),
-                    growth_rate=row['growth_rate'],
-                    max_height=parse_float(row['max_height']),
-                    max_width=parse_float(row['max_width']),
-                    is_poisonous=parse_boolean(row['is_poisonous']),
-                    is_rare=parse_boolean(row['is_rare']),
-                    is_trending=parse_boolean(row['is_trending'])
-                )
-                
-                db.add(plant)
-                plants_added += 1
-                
-            except Exception as e:
-                print(f"❌ เกิดข้อผิดพลาดกับพืช: {row.get('scientific_name', 'Unknown')} - {e}")
-                print(f"  Category: {row.get('category', 'N/A')}")
-                print(f"  Care Level: {row.get('care_level', 'N/A')}")
-                continue
-        
+        report = import_plants(db, stream, on_conflict=on_conflict, chunk_size=chunk_size)
         db.commit()
-        
-        total_plants = db.query(Plant).count()
-        
-        return {
-            "message": "Import completed successfully",
-            "plants_added": plants_added,
-            "plants_skipped": plants_skipped,
-            "total_plants": total_plants,
-            "status": "success"
-        }
-            
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    finally:
+        stream.detach()
+    
+    return {
+        "message": "Import completed successfully",
+        **report.as_dict(),
+        "plants_added": report.inserted,
+        "plants_skipped": report.skipped,
+        "total_plants": db.query(Plant).count(),
+        "status": "success"
+    }
+
+@router.post("/import-jobs", status_code=202)
+def submit_import_job(
+    file: UploadFile = File(...),
+    csv_type: str = Query(..., description="plants, sellers, plant_images, plant_propagations, plant_pest_diseases, "
+                                            "plant_seasonal_infos, plant_shipping_infos or plant_prices_detailed"),
+    on_conflict: str = Query("skip", description="skip: keep existing rows (detail CSVs: plants that already have rows), "
+                                                  "update: overwrite them (detail CSVs: replace each plant's rows)"),
+    chunk_size: int = Query(CHUNK_SIZE, ge=1, le=5000)
+):
+    """Queue a CSV import on the background workers; poll /import-jobs/{job_id} for progress"""
+    if csv_type not in CSV_TYPES:
+        raise HTTPException(status_code=400, detail=f"csv_type must be one of: {', '.join(CSV_TYPES)}")
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise HTTPException(status_code=400, detail=f"on_conflict must be one of: {', '.join(ON_CONFLICT_MODES)}")
+    
+    # เก็บ upload ลงไฟล์ชั่วคราวให้ worker อ่าน (worker ลบไฟล์เมื่อเสร็จ)
+    with tempfile.NamedTemporaryFile(prefix="plantdex-import-", suffix=".csv", delete=False) as target:
+        shutil.copyfileobj(file.file, target)
+    job = import_jobs.submit(csv_type, target.name, file.filename, on_conflict, chunk_size)
+    return import_jobs.get(job.id)
+
+@router.get("/import-jobs")
+def list_import_jobs(status: Optional[str] = Query(None, description="queued, running, success or failed")):
+    """List import jobs of this process (newest first)"""
+    return {"jobs": import_jobs.list(status), "csv_types": list(CSV_TYPES)}
+
+@router.get("/import-jobs/{job_id}")
+def get_import_job(job_id: str):
+    """Import job status, row counts, rows/sec and ETA"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @router.get("/plants/stats")
-async def get_plants_stats(db: Session = Depends(get_db)):
+def get_plants_stats(db: Session = Depends(get_db)):
     """Get plants statistics"""
     try:
-        total_plants = db.query(Plant).count()
-        
-        # จำนวนพืชตาม category
-        category_stats = db.query(Plant.category, db.func.count(Plant.id)).group_by(Plant.category).all()
-        category_counts = {str(cat): count for cat, count in category_stats}
-        
-        # จำนวนพืชตาม care level
-        care_level_stats = db.query(Plant.care_level, db.func.count(Plant.id)).group_by(Plant.care_level).all()
-        care_level_counts = {str(level): count for level, count in care_level_stats}
-        
-        # จำนวนพืชที่ rare และ trending
-        rare_plants = db.query(Plant).filter(Plant.is_rare == True).count()
-        trending_plants = db.query(Plant).filter(Plant.is_trending == True).count()
+        stats = plant_stats_cache.get(db)
         
         return {
-            "total_plants": total_plants,
-            "category_distribution": category_counts,
-            "care_level_distribution": care_level_counts,
-            "rare_plants": rare_plants,
-            "trending_plants": trending_plants,
+            "total_plants": stats["total_plants"],
+            "category_distribution": stats["category_distribution"],
+            "care_level_distribution": stats["care_level_distribution"],
+            "rare_plants": stats["rare_plants"],
+            "trending_plants": stats["trending_plants"],
             "database_status": "healthy"
         }
         
@@ -252,4 +186,40 @@ async def get_detailed_health(db: Session = Depends(get_db)):
             "database": "disconnected",
             "error": str(e),
             "timestamp": "2025-08-12T08:18:23.688888Z"
-        } 
\ No newline at end of file
+        } 
+
+@router.get("/db-pool/stats")
+async def get_db_pool_stats():
+    """Get connection pool metrics (in-use, waiting, acquire latency)"""
+    return pool_stats()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get response cache metrics (backend, hits, stale hits, coalesced requests)"""
+    return response_cache.stats()
+
+@router.post("/cache/invalidate")
+def invalidate_cache(tags: List[str] = Query(..., description="e.g. plants, price-index, shopee, market-intelligence")):
+    """Drop cached responses carrying any of the given tags"""
+    removed = response_cache.invalidate_tags(*tags)
+    return {"tags": tags, "entries_removed": removed, "status": "success"}
+
+@router.get("/batch-jobs/runs")
+def get_batch_job_runs(
+    job_name: Optional[str] = Query(None, description="e.g. market_intelligence"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Get recent batch job runs with duration and row counts"""
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        return {"runs": recent_job_runs(cursor, job_name, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
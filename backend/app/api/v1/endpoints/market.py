@@ -1,24 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import date, timedelta
+from app.core.cache import cached, response_cache
 from app.core.database import get_db
-from app.models.market import MarketTrend, PlantPriceIndex, TrendingPlant
+from app.core.events import ChangeSet, on_change
+from app.core.query_profile import QueryProfile, register_profile, use_profile
+from app.models.market import MarketTrend, PlantPriceIndex, PlantTrendWeekly
 from app.models.plant import Plant
-from app.models.price import PlantPrice
+from app.services.forecasting import load_demand_forecast
+from app.services.price_analysis import analyze_prices
+from app.services.trend_rollups import category_trends, trending_ranking
 
 router = APIRouter()
 
+register_profile("market.trends", raiseload("*"), budget=1)
+register_profile("market.trending", budget=1)  # cache miss = 1 query, hit = 0
+
 @router.get("/trends")
 def get_market_trends(
     week_start: Optional[date] = None,
     plant_id: Optional[int] = None,
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("market.trends"))
 ):
-    """Get market trends for plants"""
-    query = db.query(MarketTrend)
+    """Get market trends for plants (plant names and week-over-week rollups in the same query)"""
+    query = profile.apply(db.query(
+        MarketTrend,
+        Plant.scientific_name,
+        Plant.common_name_th,
+        Plant.common_name_en,
+        Plant.category,
+        PlantTrendWeekly.demand_change,
+        PlantTrendWeekly.sales_change_percent,
+        PlantTrendWeekly.demand_avg_4w,
+        PlantTrendWeekly.price_avg_4w,
+    ).join(Plant, Plant.id == MarketTrend.plant_id).outerjoin(
+        PlantTrendWeekly,
+        (PlantTrendWeekly.plant_id == MarketTrend.plant_id) & (PlantTrendWeekly.week_start == MarketTrend.week_start)
+    ))
     
     if week_start:
         query = query.filter(MarketTrend.week_start == week_start)
@@ -26,14 +48,42 @@ def get_market_trends(
     if plant_id:
         query = query.filter(MarketTrend.plant_id == plant_id)
     
-    trends = query.order_by(desc(MarketTrend.week_start)).limit(limit).all()
+    rows = query.order_by(desc(MarketTrend.week_start), MarketTrend.id).limit(limit).all()
+    trends = [
+        {
+            **{column.key: getattr(trend, column.key) for column in MarketTrend.__table__.columns},
+            "scientific_name": scientific_name,
+            "common_name_th": common_name_th,
+            "common_name_en": common_name_en,
+            "category": category.value if category else None,
+            "demand_change": demand_change,
+            "sales_change_percent": sales_change_percent,
+            "demand_avg_4w": demand_avg_4w,
+            "price_avg_4w": price_avg_4w,
+        }
+        for (trend, scientific_name, common_name_th, common_name_en, category,
+             demand_change, sales_change_percent, demand_avg_4w, price_avg_4w) in rows
+    ]
     
     return {
         "trends": trends,
         "total_count": len(trends)
     }
 
+@router.get("/trends/categories")
+def get_category_trends(
+    week_start: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get weekly trend aggregates per plant category (latest week by default)"""
+    return category_trends(db, week_start)
+
+@on_change(PlantPriceIndex)
+def _invalidate_price_index(changeset: ChangeSet):
+    response_cache.invalidate_tags("price-index")
+
 @router.get("/price-index")
+@cached(ttl=300, stale_ttl=900, tags=["price-index"])
 def get_price_index(
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
@@ -55,7 +105,7 @@ def get_price_index(
         "total_count": len(indices)
     }
 
-@router.get("/trending")
+@router.get("/trending", dependencies=[Depends(use_profile("market.trending"))])
 def get_trending_plants(
     week_start: Optional[date] = None,
     limit: int = Query(10, ge=1, le=50),
@@ -66,9 +116,7 @@ def get_trending_plants(
         # Default to current week
         week_start = date.today() - timedelta(days=date.today().weekday())
     
-    trending = db.query(TrendingPlant).filter(
-        TrendingPlant.week_start == week_start
-    ).order_by(TrendingPlant.rank).limit(limit).all()
+    trending = trending_ranking(db, week_start, limit)
     
     return {
         "week_start": week_start,
@@ -84,52 +132,28 @@ def get_price_analysis(
     db: Session = Depends(get_db)
 ):
     """Get comprehensive price analysis"""
-    query = db.query(PlantPrice)
-    
-    if plant_id:
-        query = query.filter(PlantPrice.plant_id == plant_id)
+    analysis = analyze_prices(db, plant_id=plant_id, category=category, location=location)
     
-    if location:
-        query = query.filter(PlantPrice.seller_location.ilike(f"%{location}%"))
-    
-    prices = query.all()
-    
-    if not prices:
+    if analysis is None:
         return {"message": "No price data found"}
     
-    # Calculate price statistics
-    price_values = [p.price for p in prices]
-    avg_price = sum(price_values) / len(price_values)
-    min_price = min(price_values)
-    max_price = max(price_values)
-    
-    # Group by source
-    sources = {}
-    for price in prices:
-        if price.source not in sources:
-            sources[price.source] = []
-        sources[price.source].append(price.price)
-    
-    source_stats = {}
-    for source, source_prices in sources.items():
-        source_stats[source] = {
-            "count": len(source_prices),
-            "avg_price": sum(source_prices) / len(source_prices),
-            "min_price": min(source_prices),
-            "max_price": max(source_prices)
-        }
-    
+    overall = analysis["overall"]
     return {
         "overall_stats": {
-            "total_records": len(prices),
-            "avg_price": round(avg_price, 2),
-            "min_price": min_price,
-            "max_price": max_price,
-            "price_range": max_price - min_price
+            "total_records": overall["count"],
+            "avg_price": round(overall["avg_price"], 2),
+            "min_price": overall["min_price"],
+            "max_price": overall["max_price"],
+            "price_range": overall["max_price"] - overall["min_price"],
+            "median_price": overall["median_price"],
+            "p10_price": overall["p10_price"],
+            "p90_price": overall["p90_price"],
+            "stddev": overall["stddev"]
         },
-        "by_source": source_stats,
+        "by_source": analysis["by_source"],
         "location_filter": location,
-        "plant_id_filter": plant_id
+        "plant_id_filter": plant_id,
+        "category_filter": category
     }
 
 @router.get("/demand-forecast")
@@ -138,48 +162,13 @@ def get_demand_forecast(
     weeks_ahead: int = Query(4, ge=1, le=12),
     db: Session = Depends(get_db)
 ):
-    """Get demand forecast for a specific plant"""
-    # Get historical trends
-    trends = db.query(MarketTrend).filter(
-        MarketTrend.plant_id == plant_id
-    ).order_by(desc(MarketTrend.week_start)).limit(8).all()
-    
-    if not trends:
+    """Get demand forecast for a specific plant (precomputed by forecast_demand.py)"""
+    forecast = load_demand_forecast(db, plant_id, weeks_ahead)
+    if forecast is not None:
+        return forecast
+    
+    # ไม่มี forecast: แยกกรณีไม่มีข้อมูลเลย กับข้อมูลไม่พอ / batch ยังไม่ได้รัน
+    has_trends = db.query(MarketTrend.id).filter(MarketTrend.plant_id == plant_id).first()
+    if not has_trends:
         raise HTTPException(status_code=404, detail="No trend data found for this plant")
-    
-    # Simple forecasting based on recent trends
-    recent_demand = [t.demand_score for t in trends[:4] if t.demand_score]
-    recent_supply = [t.supply_score for t in trends[:4] if t.supply_score]
-    
-    if not recent_demand:
-        return {"message": "Insufficient data for forecasting"}
-    
-    # Calculate trend
-    avg_demand = sum(recent_demand) / len(recent_demand)
-    avg_supply = sum(recent_supply) / len(recent_supply) if recent_supply else 50
-    
-    # Simple linear projection
-    demand_trend = (recent_demand[0] - recent_demand[-1]) / len(recent_demand) if len(recent_demand) > 1 else 0
-    
-    forecast = []
-    current_date = date.today()
-    
-    for week in range(1, weeks_ahead + 1):
-        forecast_date = current_date + timedelta(weeks=week)
-        projected_demand = max(0, min(100, avg_demand + (demand_trend * week)))
-        
-        forecast.append({
-            "week": forecast_date,
-            "projected_demand": round(projected_demand, 1),
-            "supply_score": avg_supply,
-            "demand_supply_ratio": round(projected_demand / avg_supply, 2) if avg_supply > 0 else 0
-        })
-    
-    return {
-        "plant_id": plant_id,
-        "forecast_periods": weeks_ahead,
-        "current_demand": avg_demand,
-        "current_supply": avg_supply,
-        "trend_direction": "increasing" if demand_trend > 0 else "decreasing" if demand_trend < 0 else "stable",
-        "forecast": forecast
-    } 
\ No newline at end of file
+    return {"message": "Insufficient data for forecasting"}
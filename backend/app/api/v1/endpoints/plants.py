@@ -1,25 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, raiseload
+from datetime import datetime
 from typing import List, Optional
 from app.core.database import get_db
+from app.core.async_database import run_in_session
+from app.core.cache import cached, response_cache
+from app.core.events import ChangeSet, on_change
+from app.core.pagination import (
+    NEXT_CURSOR_HEADER, CountCache, decode_offset_cursor, offset_cursor, paginate_keyset
+)
+from app.core.query_profile import QueryProfile, register_profile, use_profile
 from app.models.plant import Plant, PlantCategory, CareLevel
 from app.schemas.plant import PlantResponse, PlantCreate, PlantUpdate
 from app.models.price import PlantPrice
+from app.services.autocomplete import autocomplete_index
+from app.services.plant_detail import (
+    MAX_BATCH_IDS, MAX_QUERIES, fetch_plant_detail, fetch_plant_details, parse_sections
+)
+from app.services.plant_scores import score_column, with_scores
+from app.services.plant_stats import plant_stats_cache
+from app.services.price_summary import get_price_summary
+from app.services.search import load_plants_in_order, search_filter, search_plants
 
 router = APIRouter()
 
+plant_count_cache = CountCache()
+
+# PlantResponse ไม่มี relationship - raiseload ทำให้ lazy load (N+1) ที่หลุดเข้ามา error ทันที
+register_profile("plants.list", raiseload("*"), budget=2)
+register_profile("plants.search_advanced", raiseload("*"), budget=4)
+register_profile("plants.get", raiseload("*"), budget=1)
+# +2 เมื่อ plant ยังไม่มี summary และต้องคำนวณสด (median บน SQLite เป็นอีก query)
+register_profile("plants.prices", raiseload("*"), budget=5)
+register_profile("plants.by_category", raiseload("*"), budget=1)
+register_profile("plants.trending", raiseload("*"), budget=1)
+# selectinload ต่อ section เลือกใน app/services/plant_detail.py ตาม fields ที่ขอ
+register_profile("plants.detail", budget=MAX_QUERIES)
+
+@on_change(Plant)
+def _invalidate_plant_caches(changeset: ChangeSet):
+    plant_count_cache.clear()
+    response_cache.invalidate_tags("plants")
+
 @router.get("/", response_model=List[PlantResponse])
 def get_plants(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[PlantCategory] = None,
     care_level: Optional[CareLevel] = None,
     search: Optional[str] = None,
     trending: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("plants.list"))
 ):
     """Get all plants with optional filtering"""
-    query = db.query(Plant)
+    query = profile.apply(db.query(Plant))
     
     if category:
         query = query.filter(Plant.category == category)
@@ -31,111 +68,90 @@ def get_plants(
         query = query.filter(Plant.is_trending == trending)
     
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Plant.common_name_th.ilike(search_filter)) |
-            (Plant.common_name_en.ilike(search_filter)) |
-            (Plant.scientific_name.ilike(search_filter))
+        # เรียงตาม relevance จาก search index แทน ILIKE '%q%'
+        offset = decode_offset_cursor(cursor, "plants:search") if cursor else skip
+        result = search_plants(
+            db, search, category=category, care_level=care_level, trending=trending,
+            offset=offset, limit=limit
         )
+        if offset + limit < result.total:
+            response.headers[NEXT_CURSOR_HEADER] = offset_cursor("plants:search", offset + limit)
+        return load_plants_in_order(db, result.ids, profile.apply)
     
-    plants = query.offset(skip).limit(limit).all()
+    plants, next_cursor = paginate_keyset(query, [Plant.id], "plants:id", limit, cursor, offset=skip)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return plants
 
 # Move specific routes before generic {plant_id} route to avoid conflicts
+@router.get("/details", dependencies=[Depends(use_profile("plants.detail"))])
+def get_plant_details(
+    ids: List[int] = Query(..., description="Plant ids (repeat the parameter), up to 100"),
+    fields: Optional[str] = Query(None, description="Comma-separated sections, e.g. plant,images (default: all)"),
+    db: Session = Depends(get_db)
+):
+    """Plant detail documents for several plants at once (in the requested order)"""
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    try:
+        sections = parse_sections(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    ids = list(dict.fromkeys(ids))
+    documents = fetch_plant_details(db, ids, sections)
+    return {
+        "plants": [{"id": plant_id, **documents[plant_id]} for plant_id in ids if plant_id in documents],
+        "missing_ids": [plant_id for plant_id in ids if plant_id not in documents],
+        "fields": list(sections)
+    }
+
 @router.get("/market-data")
-async def get_market_data(db: Session = Depends(get_db)):
+@cached(ttl=60, stale_ttl=300, tags=["plants"])
+async def get_market_data():
     """Get market data and trends"""
     try:
-        from sqlalchemy import func
-        
-        # Category distribution
-        category_stats = db.query(
-            Plant.category, 
-            func.count(Plant.id)
-        ).group_by(Plant.category).all()
-        
-        # Care level distribution
-        care_level_stats = db.query(
-            Plant.care_level, 
-            func.count(Plant.id)
-        ).group_by(Plant.care_level).all()
-        
-        # Trending plants
-        trending_plants = db.query(Plant).filter(
-            Plant.is_trending == True
-        ).limit(10).all()
-        
-        # Rare plants
-        rare_plants = db.query(Plant).filter(
-            Plant.is_rare == True
-        ).limit(10).all()
-        
-        # Market summary
-        total_plants = db.query(Plant).count()
-        indoor_plants = db.query(Plant).filter(
-            Plant.category == PlantCategory.INDOOR
-        ).count()
-        outdoor_plants = db.query(Plant).filter(
-            Plant.category == PlantCategory.OUTDOOR
-        ).count()
-        
-        return {
-            "market_summary": {
-                "total_plants": total_plants,
-                "indoor_plants": indoor_plants,
-                "outdoor_plants": outdoor_plants,
-                "market_health": "healthy"
-            },
-            "category_distribution": {
-                str(cat): count for cat, count in category_stats
-            },
-            "care_level_distribution": {
-                str(level): count for level, count in care_level_stats
-            },
-            "trending_plants": [
-                {
-                    "id": plant.id,
-                    "scientific_name": plant.scientific_name,
-                    "common_name_th": plant.common_name_th,
-                    "category": plant.category.value if plant.category else None
-                }
-                for plant in trending_plants
-            ],
-            "rare_plants": [
-                {
-                    "id": plant.id,
-                    "scientific_name": plant.scientific_name,
-                    "common_name_th": plant.common_name_th,
-                    "category": plant.category.value if plant.category else None
-                }
-                for plant in rare_plants
-            ]
-        }
-        
+        stats = plant_stats_cache.peek() or await run_in_session(plant_stats_cache.get)
+        return _build_market_data(stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get market data: {str(e)}")
 
+def _build_market_data(stats: dict):
+    return {
+        "market_summary": {
+            "total_plants": stats["total_plants"],
+            "indoor_plants": stats["indoor_plants"],
+            "outdoor_plants": stats["outdoor_plants"],
+            "market_health": "healthy"
+        },
+        "category_distribution": stats["category_distribution"],
+        "care_level_distribution": stats["care_level_distribution"],
+        "trending_plants": stats["trending_list"],
+        "rare_plants": stats["rare_list"]
+    }
+
 @router.get("/quick-stats")
-async def get_quick_stats(db: Session = Depends(get_db)):
+async def get_quick_stats():
     """Get quick stats for homepage"""
     try:
-        total_plants = db.query(Plant).count()
-        trending_count = db.query(Plant).filter(Plant.is_trending == True).count()
-        rare_count = db.query(Plant).filter(Plant.is_rare == True).count()
-        indoor_count = db.query(Plant).filter(Plant.category == PlantCategory.INDOOR).count()
-        
-        return {
-            "total_plants": total_plants,
-            "trending_plants": trending_count,
-            "rare_plants": rare_count,
-            "indoor_plants": indoor_count,
-            "market_status": "active",
-            "last_updated": "2025-01-27"
-        }
-        
+        stats = plant_stats_cache.peek() or await run_in_session(plant_stats_cache.get)
+        return _build_quick_stats(stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get quick stats: {str(e)}")
 
+def _build_quick_stats(stats: dict):
+    return {
+        "total_plants": stats["total_plants"],
+        "trending_plants": stats["trending_plants"],
+        "rare_plants": stats["rare_plants"],
+        "indoor_plants": stats["indoor_plants"],
+        "market_status": "active",
+        "last_updated": stats["computed_at"].date().isoformat()
+    }
+
+# text search + score sort โดยไม่มี tsvector index: เรียงใน DB จากผลลัพธ์ไม่เกินจำนวนนี้ (pagination.truncated)
+SCORE_SORT_MAX_MATCHES = 5000
+
 @router.get("/search/advanced")
 async def search_plants_advanced(
     q: str = Query("", description="Search query"),
@@ -143,22 +159,71 @@ async def search_plants_advanced(
     care_level: Optional[str] = Query(None, description="Care level"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from pagination.next_cursor (overrides page)"),
+    include_total: bool = Query(True, description="Return total_count (cached for a short time)"),
+    sort: str = Query("default", description="default (relevance for q, otherwise id) or investment_score"),
+    min_score: Optional[int] = Query(None, ge=0, le=100, description="Minimum investment score"),
+    profile: QueryProfile = Depends(use_profile("plants.search_advanced"))
 ):
     """Advanced search plants with filters and pagination"""
+    if sort not in ("default", "investment_score"):
+        raise HTTPException(status_code=400, detail="sort must be 'default' or 'investment_score'")
     try:
-        query = db.query(Plant)
+        return await run_in_session(
+            _search_plants_advanced, q, category, care_level, page, limit, cursor, include_total, sort, min_score,
+            profile
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Advanced search failed: {str(e)}")
+
+def _search_plants_advanced(
+    db: Session,
+    q: str,
+    category: Optional[str],
+    care_level: Optional[str],
+    page: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    sort: str = "default",
+    min_score: Optional[int] = None,
+    profile: Optional[QueryProfile] = None
+):
+    offset = (page - 1) * limit
+    options = profile.apply if profile else (lambda query: query)
+    total_count = None
+    truncated = False
+    by_score = sort == "investment_score"
+    
+    # Text search ranked by relevance - คะแนนลงทุนแนบจาก plant_scores
+    if q.strip() and not by_score and min_score is None:
+        if cursor:
+            offset = decode_offset_cursor(cursor, "plants:search")
+        result = search_plants(
+            db, q, category=category, care_level=care_level,
+            include_descriptions=True, offset=offset, limit=limit
+        )
+        total_count = result.total  # search index นับให้อยู่แล้ว ไม่ต้อง COUNT(*)
+        plants = load_plants_in_order(db, result.ids, lambda query: options(with_scores(query)))
+        next_cursor = offset_cursor("plants:search", offset + limit) if offset + limit < result.total else None
+    else:
+        query = options(with_scores(db.query(Plant)))
         
-        # Text search
-        if q:
-            search_filter = f"%{q}%"
-            query = query.filter(
-                (Plant.common_name_th.ilike(search_filter)) |
-                (Plant.common_name_en.ilike(search_filter)) |
-                (Plant.scientific_name.ilike(search_filter)) |
-                (Plant.description_th.ilike(search_filter)) |
-                (Plant.description_en.ilike(search_filter))
-            )
+        if q.strip():
+            text_match = search_filter(db, q, include_descriptions=True)
+            if text_match is not None:
+                # Postgres: เงื่อนไข tsvector อยู่ใน query เดียวกับการกรอง/เรียงคะแนน
+                query = query.filter(text_match)
+            else:
+                # in-memory index: กรอง/เรียงตามคะแนนใน DB จากผลลัพธ์ไม่เกิน SCORE_SORT_MAX_MATCHES อันดับแรก
+                result = search_plants(
+                    db, q, category=category, care_level=care_level,
+                    include_descriptions=True, offset=0, limit=SCORE_SORT_MAX_MATCHES
+                )
+                query = query.filter(Plant.id.in_(result.ids))
+                truncated = result.total > SCORE_SORT_MAX_MATCHES
         
         # Category filter
         if category:
@@ -168,105 +233,128 @@ async def search_plants_advanced(
         if care_level:
             query = query.filter(Plant.care_level == care_level)
         
-        # Calculate total count for pagination
-        total_count = query.count()
-        
-        # Apply pagination
-        offset = (page - 1) * limit
-        plants = query.offset(offset).limit(limit).all()
+        if min_score is not None:
+            query = query.filter(score_column() >= min_score)
         
-        # Calculate investment scores
-        for plant in plants:
-            plant.investment_score = calculate_investment_score(plant)
-        
-        return {
-            "plants": plants,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total_count": total_count,
-                "total_pages": (total_count + limit - 1) // limit
-            },
-            "filters": {
-                "query": q,
-                "category": category,
-                "care_level": care_level
-            }
-        }
+        # Total count - cached per filter set, cleared when plants change
+        if include_total:
+            total_count = plant_count_cache.get(("advanced", q.strip(), category, care_level, min_score), query.count)
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Advanced search failed: {str(e)}")
-
-def calculate_investment_score(plant):
-    """Calculate investment score based on plant attributes"""
-    score = 50  # Base score
-    
-    # Rarity bonus
-    if plant.is_rare:
-        score += 20
-    
-    # Trending bonus
-    if plant.is_trending:
-        score += 15
-    
-    # Category bonus
-    if plant.category == PlantCategory.INDOOR:
-        score += 10
-    
-    # Care level bonus (easier = higher score)
-    if plant.care_level == CareLevel.EASY:
-        score += 10
-    elif plant.care_level == CareLevel.MODERATE:
-        score += 5
-    
-    # Size bonus (larger = higher score)
-    if plant.max_height and plant.max_height > 100:
-        score += 5
+        # Keyset pagination (page/offset kept for old clients)
+        if by_score:
+            plants, next_cursor = paginate_keyset(
+                query, [score_column(), Plant.id], "plants:score", limit, cursor, descending=True, offset=offset
+            )
+        else:
+            plants, next_cursor = paginate_keyset(query, [Plant.id], "plants:id", limit, cursor, offset=offset)
     
-    return min(score, 100)  # Cap at 100
+    return {
+        "plants": plants,
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total_count": total_count,
+            "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "truncated": truncated  # True = มีผลค้นหาเกิน SCORE_SORT_MAX_MATCHES ที่ไม่ได้ถูกพิจารณา
+        },
+        "filters": {
+            "query": q,
+            "category": category,
+            "care_level": care_level,
+            "sort": sort,
+            "min_score": min_score
+        }
+    }
 
 @router.get("/{plant_id}", response_model=PlantResponse)
-def get_plant(plant_id: int, db: Session = Depends(get_db)):
+def get_plant(
+    plant_id: int,
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("plants.get"))
+):
     """Get a specific plant by ID"""
-    plant = db.query(Plant).filter(Plant.id == plant_id).first()
+    plant = profile.apply(db.query(Plant)).filter(Plant.id == plant_id).first()
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
     return plant
 
+@router.get("/{plant_id}/detail", dependencies=[Depends(use_profile("plants.detail"))])
+def get_plant_detail(
+    plant_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated sections, e.g. plant,images (default: all)"),
+    db: Session = Depends(get_db)
+):
+    """Plant page: the plant with images, propagation, pests/diseases, seasons, shipping and detailed prices"""
+    try:
+        sections = parse_sections(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    document = fetch_plant_detail(db, plant_id, sections)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Plant not found")
+    return {"id": plant_id, **document}
+
 @router.get("/{plant_id}/prices")
-def get_plant_prices(plant_id: int, db: Session = Depends(get_db)):
-    """Get all prices for a specific plant"""
-    plant = db.query(Plant).filter(Plant.id == plant_id).first()
+def get_plant_prices(
+    plant_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    source: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only prices collected at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only prices collected before this time"),
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("plants.prices"))
+):
+    """Get prices for a specific plant (newest first) with its precomputed price summary"""
+    plant = profile.apply(db.query(Plant)).filter(Plant.id == plant_id).first()
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
     
-    prices = db.query(PlantPrice).filter(PlantPrice.plant_id == plant_id).all()
+    query = profile.apply(db.query(PlantPrice)).filter(PlantPrice.plant_id == plant_id)
+    if source:
+        query = query.filter(PlantPrice.source == source)
+    if since:
+        query = query.filter(PlantPrice.data_collected_at >= since)
+    if until:
+        query = query.filter(PlantPrice.data_collected_at < until)
+    
+    prices, next_cursor = paginate_keyset(query, [PlantPrice.id], "plant-prices:id", limit, cursor, descending=True)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return {
         "plant": plant,
         "prices": prices,
-        "price_summary": {
-            "min_price": min([p.price for p in prices]) if prices else None,
-            "max_price": max([p.price for p in prices]) if prices else None,
-            "avg_price": sum([p.price for p in prices]) / len(prices) if prices else None,
-            "total_sources": len(prices)
-            }
+        "price_summary": get_price_summary(db, plant_id)
         }
 
 @router.get("/categories/{category}", response_model=List[PlantResponse])
 def get_plants_by_category(
     category: PlantCategory,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("plants.by_category"))
 ):
     """Get plants by category"""
-    plants = db.query(Plant).filter(Plant.category == category).offset(skip).limit(limit).all()
+    query = profile.apply(db.query(Plant)).filter(Plant.category == category)
+    plants, next_cursor = paginate_keyset(query, [Plant.id], "plants:id", limit, cursor, offset=skip)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return plants
 
 @router.get("/trending/list")
-def get_trending_plants(db: Session = Depends(get_db)):
+def get_trending_plants(
+    db: Session = Depends(get_db),
+    profile: QueryProfile = Depends(use_profile("plants.trending"))
+):
     """Get trending plants"""
-    trending_plants = db.query(Plant).filter(Plant.is_trending == True).all()
+    trending_plants = profile.apply(db.query(Plant)).filter(Plant.is_trending == True).all()
     return {
         "trending_plants": trending_plants,
         "total_count": len(trending_plants)
@@ -282,25 +370,10 @@ def get_search_suggestions(
     if len(q) < 2:
         return {"suggestions": []}
     
-    search_filter = f"%{q}%"
-    suggestions = db.query(Plant).filter(
-        (Plant.common_name_th.ilike(search_filter)) |
-        (Plant.common_name_en.ilike(search_filter)) |
-        (Plant.scientific_name.ilike(search_filter))
-    ).limit(limit).all()
+    # ตอบจาก index ในหน่วยความจำ - ไม่ query database ยกเว้นมีข้อมูลที่ต้อง reload
+    autocomplete_index.ensure_fresh(db)
     
     return {
         "query": q,
-        "suggestions": [
-            {
-                "id": plant.id,
-                "common_name_th": plant.common_name_th,
-                "common_name_en": plant.common_name_en,
-                "scientific_name": plant.scientific_name,
-                "category": plant.category.value
-            }
-            for plant in suggestions
-        ]
+        "suggestions": autocomplete_index.suggest(q, limit)
     }
-
- 
\ No newline at end of file
@@ -1,17 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 import json
 
 from app.core.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER, paginate_keyset
 from app.models.sell_to_us import PlantSubmission, PlantSubmissionStatus
 from app.schemas.sell_to_us import PlantSubmissionCreate, PlantSubmissionResponse, PlantSubmissionUpdate
 
 router = APIRouter()
 
 @router.post("/submit-plant", response_model=PlantSubmissionResponse)
-async def submit_plant(
+def submit_plant(
     species: str = Form(...),
     size: str = Form(...),
     age: str = Form(...),
@@ -61,7 +62,7 @@ async def submit_plant(
         raise HTTPException(status_code=500, detail=f"Failed to submit plant: {str(e)}")
 
 @router.get("/submissions/{submission_id}", response_model=PlantSubmissionResponse)
-async def get_submission(
+def get_submission(
     submission_id: int,
     db: Session = Depends(get_db)
 ):
@@ -87,21 +88,29 @@ async def get_submission(
     )
 
 @router.get("/submissions", response_model=List[PlantSubmissionResponse])
-async def list_submissions(
+def list_submissions(
+    response: Response,
     status: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     List plant submissions (admin only)
+    
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
     """
     query = db.query(PlantSubmission)
     
     if status:
         query = query.filter(PlantSubmission.status == PlantSubmissionStatus(status))
     
-    submissions = query.offset(offset).limit(limit).all()
+    submissions, next_cursor = paginate_keyset(
+        query, [PlantSubmission.id], "submissions:id", limit, cursor, offset=offset
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         PlantSubmissionResponse(
@@ -121,7 +130,7 @@ async def list_submissions(
     ]
 
 @router.put("/submissions/{submission_id}/review")
-async def review_submission(
+def review_submission(
     submission_id: int,
     status: str = Form(...),
     price_offer: Optional[float] = Form(None),
@@ -5,23 +5,23 @@ Provide access to Shopee plant data
 
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-import psycopg2
 import json
-import os
+from datetime import date, timedelta
 from pydantic import BaseModel
 
+from app.core.cache import cached
+from app.core.db_pool import get_db_connection
+from app.core.pagination import (
+    ESTIMATE_MIN_ROWS, CountCache, decode_cursor, encode_cursor, estimate_row_count
+)
+from app.services.price_history import item_price_series, market_daily_prices
+
 router = APIRouter()
 
 # Shopee Affiliate Configuration
 SHOPEE_APP_ID = "15394330041"
 SHOPEE_AFFILIATE_BASE_URL = "https://shopee.co.th"
 
-# Database connection
-def get_db_connection():
-    """Get database connection"""
-    database_url = os.getenv('DATABASE_URL', 'postgresql://postgres@localhost:5432/plantdex')
-    return psycopg2.connect(database_url)
-
 # Pydantic models
 class ShopeeProduct(BaseModel):
     id: int
@@ -44,24 +44,44 @@ class ShopeeProduct(BaseModel):
 
 class ShopeeProductList(BaseModel):
     products: List[ShopeeProduct]
-    total: int
+    total: Optional[int]
     page: int
     limit: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
+
+# COUNT(*) ต่อ filter set - collector เขียนจาก process อื่น จึงใช้ TTL แทนการ invalidate
+product_count_cache = CountCache()
+
+# ตาราง stats ที่ trigger ดูแล (create_shopee_stats.py) - ก่อนติดตั้งจะ aggregate สดแทน
+_stats_tables_ready = False
+
+def stats_tables_ready(cursor) -> bool:
+    """Whether the trigger-maintained shopee stats tables are installed"""
+    global _stats_tables_ready
+    if not _stats_tables_ready:
+        cursor.execute("SELECT to_regclass('shopee_category_stats') IS NOT NULL")
+        _stats_tables_ready = bool(cursor.fetchone()[0])
+    return _stats_tables_ready
 
 def generate_affiliate_link(item_id: int, shop_id: int) -> str:
     """Generate Shopee affiliate link"""
     return f"{SHOPEE_AFFILIATE_BASE_URL}/product/{shop_id}/{item_id}?affiliate_id={SHOPEE_APP_ID}"
 
 @router.get("/products", response_model=ShopeeProductList)
-async def get_shopee_products(
+def get_shopee_products(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
     category: Optional[str] = Query(None, description="Filter by category"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
-    search: Optional[str] = Query(None, description="Search in product names")
+    search: Optional[str] = Query(None, description="Search in product names"),
+    page_cursor: Optional[str] = Query(None, alias="cursor", description="Opaque cursor from next_cursor (overrides page)"),
+    include_total: bool = Query(True, description="Return total (cached, or estimated on large tables)")
 ):
     """Get Shopee plant products with pagination and filters"""
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -91,15 +111,49 @@ async def get_shopee_products(
             where_conditions.append(f"name ILIKE %s")
             params.append(f"%{search}%")
         
+        filter_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+        filter_params = list(params)
+        
+        # Keyset pagination on (created_at, id) - ไม่ต้อง scan แถวที่ข้ามไปแบบ OFFSET
+        offset = (page - 1) * limit
+        if page_cursor:
+            values = decode_cursor(page_cursor, "shopee:created_at")
+            if len(values) != 2:
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+            last_created_at, last_id = values
+            if last_created_at is None:
+                where_conditions.append("(created_at IS NULL AND id < %s)")
+                params.append(last_id)
+            else:
+                where_conditions.append(
+                    "(created_at < %s OR (created_at = %s AND id < %s) OR created_at IS NULL)"
+                )
+                params.extend([last_created_at, last_created_at, last_id])
+            offset = 0
+        
         where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
         
         # Count total products
-        count_query = f"SELECT COUNT(*) FROM shopee_products WHERE {where_clause}"
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-        
-        # Calculate offset
-        offset = (page - 1) * limit
+        total = None
+        total_is_estimate = False
+        if include_total:
+            if min_price is None and max_price is None and not search and stats_tables_ready(cursor):
+                # ไม่มี filter หรือกรองแค่ category - นับจาก stats ได้ตรงทันที
+                if category:
+                    cursor.execute("SELECT product_count FROM shopee_category_stats WHERE category = %s", [category])
+                else:
+                    cursor.execute("SELECT COALESCE(SUM(product_count), 0) FROM shopee_category_stats")
+                row = cursor.fetchone()
+                total = int(row[0]) if row else 0
+            elif not filter_params:
+                estimate = estimate_row_count(cursor, "shopee_products")
+                if estimate is not None and estimate >= ESTIMATE_MIN_ROWS:
+                    total, total_is_estimate = estimate, True
+            if total is None:
+                def count_products():
+                    cursor.execute(f"SELECT COUNT(*) FROM shopee_products WHERE {filter_clause}", filter_params)
+                    return cursor.fetchone()[0]
+                total = product_count_cache.get((filter_clause, tuple(filter_params)), count_products)
         
         # Get products
         query = f"""
@@ -108,13 +162,18 @@ async def get_shopee_products(
                    primary_image_url, additional_images, created_at, updated_at, shop_id
             FROM shopee_products 
             WHERE {where_clause}
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC NULLS LAST, id DESC
             LIMIT %s OFFSET %s
         """
         
-        cursor.execute(query, params + [limit, offset])
+        cursor.execute(query, params + [limit + 1, offset])
         rows = cursor.fetchall()
         
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor("shopee:created_at", [rows[-1][14], rows[-1][0]])
+        
         # Convert to Pydantic models
         products = []
         for row in rows:
@@ -159,9 +218,13 @@ async def get_shopee_products(
             products=products,
             total=total,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=next_cursor,
+            total_is_estimate=total_is_estimate
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
@@ -172,19 +235,29 @@ async def get_shopee_products(
             conn.close()
 
 @router.get("/products/categories")
-async def get_shopee_categories():
+def get_shopee_categories():
     """Get all available product categories"""
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT category, COUNT(*) as count 
-            FROM shopee_products 
-            WHERE category IS NOT NULL
-            GROUP BY category 
-            ORDER BY count DESC
-        """)
+        if stats_tables_ready(cursor):
+            cursor.execute("""
+                SELECT category, product_count
+                FROM shopee_category_stats
+                WHERE category IS NOT NULL
+                ORDER BY product_count DESC
+            """)
+        else:
+            cursor.execute("""
+                SELECT category, COUNT(*) as count 
+                FROM shopee_products 
+                WHERE category IS NOT NULL
+                GROUP BY category 
+                ORDER BY count DESC
+            """)
         
         categories = [{"category": row[0], "count": row[1]} for row in cursor.fetchall()]
         
@@ -200,41 +273,48 @@ async def get_shopee_categories():
             conn.close()
 
 @router.get("/products/stats")
-async def get_shopee_stats():
+@cached(ttl=120, stale_ttl=600, tags=["shopee"])
+def get_shopee_stats():
     """Get Shopee products statistics"""
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Total products
-        cursor.execute("SELECT COUNT(*) FROM shopee_products")
-        total_products = cursor.fetchone()[0]
-        
-        # Price statistics
-        cursor.execute("""
-            SELECT MIN(price), MAX(price), AVG(price), COUNT(*)
-            FROM shopee_products 
-            WHERE price > 0
-        """)
-        price_stats = cursor.fetchone()
-        
-        # Category count
-        cursor.execute("SELECT COUNT(DISTINCT category) FROM shopee_products")
-        category_count = cursor.fetchone()[0]
-        
-        # Shop count
-        cursor.execute("SELECT COUNT(DISTINCT shop_id) FROM shopee_products")
-        shop_count = cursor.fetchone()[0]
+        if stats_tables_ready(cursor):
+            # หนึ่งแถวต่อ category + ตัวนับร้านค้า - ไม่แตะ shopee_products
+            cursor.execute("""
+                SELECT COALESCE(SUM(product_count), 0),
+                       COUNT(*) FILTER (WHERE category IS NOT NULL),
+                       (SELECT shop_count FROM shopee_stats_totals WHERE id = 1),
+                       MIN(price_min), MAX(price_max),
+                       SUM(price_sum) / NULLIF(SUM(priced_count), 0),
+                       COALESCE(SUM(priced_count), 0)
+                FROM shopee_category_stats
+            """)
+        else:
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COUNT(DISTINCT category),
+                       COUNT(DISTINCT shop_id),
+                       MIN(price) FILTER (WHERE price > 0),
+                       MAX(price) FILTER (WHERE price > 0),
+                       AVG(price) FILTER (WHERE price > 0),
+                       COUNT(*) FILTER (WHERE price > 0)
+                FROM shopee_products
+            """)
+        total_products, category_count, shop_count, price_min, price_max, price_avg, priced_count = cursor.fetchone()
         
         stats = {
             "total_products": total_products,
             "category_count": category_count,
-            "shop_count": shop_count,
+            "shop_count": shop_count or 0,
             "price_stats": {
-                "min": float(price_stats[0]) if price_stats[0] else 0,
-                "max": float(price_stats[1]) if price_stats[1] else 0,
-                "average": float(price_stats[2]) if price_stats[2] else 0,
-                "count": price_stats[3]
+                "min": float(price_min) if price_min else 0,
+                "max": float(price_max) if price_max else 0,
+                "average": float(price_avg) if price_avg else 0,
+                "count": priced_count
             }
         }
         
@@ -249,9 +329,86 @@ async def get_shopee_stats():
         if conn:
             conn.close()
 
+def _history_range(date_from: Optional[date], date_to: Optional[date]):
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=90)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    return date_from, date_to
+
+@router.get("/products/{item_id}/price-history")
+def get_product_price_history(
+    item_id: int,
+    date_from: Optional[date] = Query(None, description="Start date (default: 90 days before date_to)"),
+    date_to: Optional[date] = Query(None, description="End date, inclusive (default: today)"),
+    interval: str = Query("day", description="'day' for daily OHLC, 'raw' for every recorded price")
+):
+    """Get price chart data for one Shopee product"""
+    if interval not in ("day", "raw"):
+        raise HTTPException(status_code=400, detail="interval must be 'day' or 'raw'")
+    date_from, date_to = _history_range(date_from, date_to)
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        series = item_price_series(cursor, item_id, date_from, date_to, interval)
+        return {
+            "item_id": item_id,
+            "interval": interval,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "prices": series
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+@router.get("/price-history/daily")
+@cached(ttl=300, stale_ttl=900, tags=["shopee"])
+def get_market_price_history(
+    date_from: Optional[date] = Query(None, description="Start date (default: 90 days before date_to)"),
+    date_to: Optional[date] = Query(None, description="End date, inclusive (default: today)"),
+    category: Optional[str] = Query(None, description="Filter by category")
+):
+    """Get market-wide daily Shopee price levels"""
+    date_from, date_to = _history_range(date_from, date_to)
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        return {
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "category": category,
+            "days": market_daily_prices(cursor, date_from, date_to, category)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 @router.get("/products/{item_id}", response_model=ShopeeProduct)
-async def get_shopee_product(item_id: int):
+def get_shopee_product(item_id: int):
     """Get specific Shopee product by item_id"""
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
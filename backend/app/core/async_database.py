@@ -0,0 +1,80 @@
+"""
+Async Database Access for PlantDex
+Non-blocking session helpers for async endpoints (asyncpg / aiosqlite)
+"""
+from typing import Any, AsyncGenerator, Callable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SQLALCHEMY_DATABASE_URL, SessionLocal
+
+T = TypeVar("T")
+
+
+def get_async_database_url(url: str) -> str:
+    """Translate a sync database URL to its async driver equivalent"""
+    if url.startswith("sqlite"):
+        scheme, rest = url.split(":", 1)
+        return "sqlite+aiosqlite:" + rest
+
+    scheme, rest = url.split("://", 1)
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        # asyncpg ใช้ ssl= แทน sslmode=
+        return "postgresql+asyncpg://" + rest.replace("sslmode=", "ssl=")
+    return url
+
+
+async_engine = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+if settings.DB_ASYNC_ENABLED:
+    ASYNC_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    else:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=300,
+        )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def is_async_enabled() -> bool:
+    return AsyncSessionLocal is not None
+
+
+# Dependency
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access is disabled (set DB_ASYNC_ENABLED=true)")
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def _run_with_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run fn(session, *args) without blocking the event loop.
+
+    With DB_ASYNC_ENABLED the function runs on the async engine via
+    AsyncSession.run_sync (asyncpg/aiosqlite); otherwise it runs on a
+    regular SessionLocal in the worker threadpool.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(_run_with_session, fn, *args, **kwargs)
+
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
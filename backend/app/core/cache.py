@@ -0,0 +1,451 @@
+"""
+Response Cache for PlantDex
+Redis-backed endpoint cache with an in-process LRU fallback
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set
+
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+LOCK_TIMEOUT = 10.0  # seconds - รอ worker อื่นคำนวณ key เดียวกันได้นานสุดเท่านี้
+LOCK_POLL_INTERVAL = 0.05
+
+
+class MemoryCacheBackend:
+    """Thread-safe LRU used when Redis is not configured"""
+
+    name = "memory"
+    blocking = False  # อยู่ใน process - เรียกจาก event loop ได้ตรงๆ
+    shared = False  # แต่ละ process มี cache ของตัวเอง
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["stale_until"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any], tags: Iterable[str]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    if self._entries.pop(key, None) is not None:
+                        removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    # process เดียว - single-flight ใน ResponseCache พอแล้ว
+    def try_lock(self, key: str) -> bool:
+        return True
+
+    def unlock(self, key: str):
+        pass
+
+
+class RedisCacheBackend:
+    """Shared cache across workers; tag membership kept in Redis sets"""
+
+    name = "redis"
+    blocking = True  # network I/O - async endpoint ต้องเรียกผ่าน thread
+    shared = True
+
+    def __init__(self, url: str, prefix: str):
+        import redis
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, entry: Dict[str, Any], tags: Iterable[str]):
+        expire = max(1, int(entry["stale_until"] - time.time()) + 1)
+        pipe = self.client.pipeline()
+        pipe.set(key, json.dumps(entry, separators=(",", ":")), ex=expire)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+            pipe.expire(self._tag_key(tag), max(expire, 86400))
+        pipe.execute()
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = self.client.smembers(tag_key)
+            if keys:
+                removed += self.client.delete(*keys)
+            self.client.delete(tag_key)
+        return removed
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+    def try_lock(self, key: str) -> bool:
+        return bool(self.client.set(f"{key}:lock", "1", nx=True, px=int(LOCK_TIMEOUT * 1000)))
+
+    def unlock(self, key: str):
+        self.client.delete(f"{key}:lock")
+
+
+class ResponseCache:
+    """TTL + stale-while-revalidate cache with per-key request coalescing"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+        self._refresh_tasks: Set[asyncio.Task] = set()  # event loop เก็บ task แค่ weak reference
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.backend.name, "inflight": len(self._inflight), **self._stats}
+
+    # ---- backend access (errors ไม่ทำให้ request ล้ม) -----------------
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            self._count("errors")
+            print(f"Warning: cache read failed for {key}: {e}")
+            return None
+
+    def _store(self, key: str, value: Any, ttl: float, stale_ttl: float, tags: Sequence[str]) -> Any:
+        value = jsonable_encoder(value)
+        now = time.time()
+        entry = {"value": value, "fresh_until": now + ttl, "stale_until": now + ttl + stale_ttl}
+        try:
+            self.backend.set(key, entry, tags)
+        except Exception as e:
+            self._count("errors")
+            print(f"Warning: cache write failed for {key}: {e}")
+        return value
+
+    def _claim(self, key: str):
+        """(future, is_leader) for the in-process single-flight slot of `key`"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _finish(self, key: str, future: Future, value: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _try_backend_lock(self, key: str) -> bool:
+        try:
+            return self.backend.try_lock(key)
+        except Exception:
+            return True
+
+    def _unlock_backend(self, key: str):
+        try:
+            self.backend.unlock(key)
+        except Exception:
+            pass
+
+    # ---- sync endpoints ------------------------------------------------
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], refresh: Callable[[], Any],
+                       ttl: float, stale_ttl: float = 0, tags: Sequence[str] = ()) -> Any:
+        entry = self._read(key)
+        now = time.time()
+        if entry is not None:
+            if now < entry["fresh_until"]:
+                self._count("hits")
+                return entry["value"]
+            if now < entry["stale_until"]:
+                self._count("stale_hits")
+                self._refresh_in_background(key, refresh, ttl, stale_ttl, tags)
+                return entry["value"]
+
+        future, leader = self._claim(key)
+        if not leader:
+            self._count("coalesced")
+            return future.result(timeout=LOCK_TIMEOUT * 3)
+
+        self._count("misses")
+        try:
+            value = self._compute_leader(key, compute, ttl, stale_ttl, tags)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value
+
+    def _compute_leader(self, key, compute, ttl, stale_ttl, tags):
+        # worker อื่นกำลังคำนวณ key นี้อยู่ (Redis) - รอผลแทนการคำนวณซ้ำ
+        if not self._try_backend_lock(key):
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = self._read(key)
+                if entry is not None and time.time() < entry["fresh_until"]:
+                    return entry["value"]
+        try:
+            return self._store(key, compute(), ttl, stale_ttl, tags)
+        finally:
+            self._unlock_backend(key)
+
+    def _refresh_in_background(self, key, refresh, ttl, stale_ttl, tags):
+        future, leader = self._claim(key)
+        if not leader:
+            return
+
+        def run():
+            self._count("refreshes")
+            try:
+                value = self._store(key, refresh(), ttl, stale_ttl, tags)
+            except BaseException as e:
+                print(f"Warning: background refresh failed for {key}: {e}")
+                self._finish(key, future, error=e)
+                return
+            self._finish(key, future, value)
+
+        self._refresher.submit(run)
+
+    # ---- async endpoints -----------------------------------------------
+
+    async def _call_backend(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a backend call without blocking the event loop on network I/O"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Any], refresh: Callable[[], Any],
+                                   ttl: float, stale_ttl: float = 0, tags: Sequence[str] = ()) -> Any:
+        entry = await self._call_backend(self._read, key)
+        now = time.time()
+        if entry is not None:
+            if now < entry["fresh_until"]:
+                self._count("hits")
+                return entry["value"]
+            if now < entry["stale_until"]:
+                self._count("stale_hits")
+                future, leader = self._claim(key)
+                if leader:
+                    task = asyncio.get_running_loop().create_task(
+                        self._refresh_async(key, future, refresh, ttl, stale_ttl, tags)
+                    )
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return entry["value"]
+
+        future, leader = self._claim(key)
+        if not leader:
+            self._count("coalesced")
+            return await asyncio.wrap_future(future)
+
+        self._count("misses")
+        try:
+            if not await self._call_backend(self._try_backend_lock, key):
+                deadline = time.monotonic() + LOCK_TIMEOUT
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+                    entry = await self._call_backend(self._read, key)
+                    if entry is not None and time.time() < entry["fresh_until"]:
+                        self._finish(key, future, entry["value"])
+                        return entry["value"]
+            try:
+                value = await self._call_backend(self._store, key, await compute(), ttl, stale_ttl, tags)
+            finally:
+                await self._call_backend(self._unlock_backend, key)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value)
+        return value
+
+    async def _refresh_async(self, key, future, refresh, ttl, stale_ttl, tags):
+        self._count("refreshes")
+        try:
+            value = await self._call_backend(self._store, key, await refresh(), ttl, stale_ttl, tags)
+        except BaseException as e:
+            print(f"Warning: background refresh failed for {key}: {e}")
+            self._finish(key, future, error=e)
+            return
+        self._finish(key, future, value)
+
+    # ---- batch access (caller loads the misses in one go) ---------------
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Fresh cached values of `keys`; absent / expired keys are left out"""
+        found = {}
+        now = time.time()
+        for key in keys:
+            entry = self._read(key)
+            if entry is not None and now < entry["fresh_until"]:
+                self._count("hits")
+                found[key] = entry["value"]
+            else:
+                self._count("misses")
+        return found
+
+    def put(self, key: str, value: Any, ttl: float, tags: Sequence[str] = ()) -> Any:
+        """Store `value` under `key`; returns it JSON-encoded like cached reads"""
+        return self._store(key, value, ttl, 0, tags)
+
+    # ---- invalidation --------------------------------------------------
+
+    @property
+    def shared(self) -> bool:
+        """True when other processes (API workers, scripts) see the same entries"""
+        return self.backend.shared
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Drop every cached response carrying any of `tags` (in this process only unless `shared`)"""
+        try:
+            return self.backend.invalidate_tags(tags)
+        except Exception as e:
+            self._count("errors")
+            print(f"Warning: cache invalidation failed for {tags}: {e}")
+            return 0
+
+    def clear(self):
+        self.backend.clear()
+
+
+def _create_backend():
+    if settings.REDIS_URL:
+        try:
+            return RedisCacheBackend(settings.REDIS_URL, settings.CACHE_KEY_PREFIX)
+        except Exception as e:
+            print(f"Warning: Redis unavailable ({e}), using in-process cache")
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_create_backend())
+
+
+# ---- decorator ---------------------------------------------------------
+
+_UNCACHEABLE_ARGS = (Session, Request, Response, BackgroundTasks)
+
+
+def _cache_key(name: str, kwargs: Dict[str, Any]) -> str:
+    params = {
+        key: value for key, value in kwargs.items()
+        if not isinstance(value, _UNCACHEABLE_ARGS)
+    }
+    encoded = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:20]
+    return f"{settings.CACHE_KEY_PREFIX}:cache:{name}:{digest}"
+
+
+def _with_fresh_sessions(kwargs: Dict[str, Any]):
+    """Copy of kwargs where request-scoped sessions are replaced by new ones"""
+    sessions = []
+    fresh = {}
+    for key, value in kwargs.items():
+        if isinstance(value, Session):
+            value = SessionLocal()
+            sessions.append(value)
+        fresh[key] = value
+    return fresh, sessions
+
+
+def cached(ttl: float, stale_ttl: float = 0, tags: Sequence[str] = (), name: Optional[str] = None):
+    """Cache an endpoint's response.
+
+    Place it under the router decorator. Arguments such as query parameters
+    form the key; injected sessions/requests are ignored. Stale entries are
+    served for `stale_ttl` more seconds while one background refresh runs
+    (on its own SessionLocal). Use response_cache.invalidate_tags() on writes.
+    """
+    tags = tuple(tags)
+
+    def decorator(fn):
+        cache_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not settings.CACHE_ENABLED:
+                    return await fn(*args, **kwargs)
+
+                async def refresh():
+                    fresh, sessions = _with_fresh_sessions(kwargs)
+                    try:
+                        return await fn(*args, **fresh)
+                    finally:
+                        for session in sessions:
+                            session.close()
+
+                return await response_cache.get_or_compute_async(
+                    _cache_key(cache_name, kwargs), lambda: fn(*args, **kwargs), refresh, ttl, stale_ttl, tags
+                )
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return fn(*args, **kwargs)
+
+            def refresh():
+                fresh, sessions = _with_fresh_sessions(kwargs)
+                try:
+                    return fn(*args, **fresh)
+                finally:
+                    for session in sessions:
+                        session.close()
+
+            return response_cache.get_or_compute(
+                _cache_key(cache_name, kwargs), lambda: fn(*args, **kwargs), refresh, ttl, stale_ttl, tags
+            )
+        return wrapper
+
+    return decorator
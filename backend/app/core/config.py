@@ -12,9 +12,34 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: Optional[str] = None  # จะถูก set จาก environment
     
+    # Connection pool สำหรับ router ที่ใช้ psycopg2 โดยตรง
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 10.0  # seconds
+    DB_POOL_HEALTH_CHECK_INTERVAL: float = 30.0  # ping connection ที่ว่างนานกว่านี้ (seconds)
+    DB_POOL_MAX_LIFETIME: float = 300.0  # recycle connection (seconds)
+    
+    # ใช้ async engine (asyncpg / aiosqlite) กับ endpoint แบบ async แทน threadpool
+    DB_ASYNC_ENABLED: bool = False
+    
+    # อายุ cache สถิติหน้าแรก (seconds) - การเขียนใน process เดียวกันจะล้าง cache ทันที
+    PLANT_STATS_CACHE_TTL: float = 300.0
+    
+    # Query profiles - DEBUG ใส่ X-Query-Count / X-Query-Time-Ms ใน response
+    # เปิด enforce ตอนรัน test เพื่อให้ request ที่ query เกิน budget ของ profile fail
+    QUERY_BUDGET_ENFORCE: bool = False
+    
+    # CSV import jobs (/admin/import-jobs) - จำนวน worker thread ที่ import พร้อมกันได้
+    IMPORT_JOB_WORKERS: int = 2
+    
     # Redis (สำหรับ caching)
     REDIS_URL: Optional[str] = None
     
+    # Response cache - ใช้ Redis ถ้ามี REDIS_URL ไม่งั้นใช้ LRU ใน process
+    CACHE_ENABLED: bool = True
+    CACHE_KEY_PREFIX: str = "plantdex"
+    CACHE_MAX_ENTRIES: int = 1024
+    
     # Security
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
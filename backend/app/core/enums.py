@@ -0,0 +1,23 @@
+"""
+Enum Parsing for PlantDex
+Lenient conversion of query / CSV values into model enums
+"""
+from enum import Enum
+from typing import Any, Optional, Type, TypeVar
+
+E = TypeVar("E", bound=Enum)
+
+
+def coerce_enum(enum_cls: Type[E], value: Any) -> Optional[E]:
+    """Accept an enum member, its value ('indoor') or its name ('INDOOR'); None for empty values"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(str(value).lower())
+    except ValueError:
+        try:
+            return enum_cls[str(value).upper()]
+        except KeyError:
+            raise ValueError(f"Invalid {enum_cls.__name__}: {value}")
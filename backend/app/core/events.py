@@ -0,0 +1,147 @@
+"""
+Model Change Events for PlantDex
+Notify in-process caches and indexes after rows are committed
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class ChangeSet:
+    """Rows of one model written by a committed transaction"""
+    model: type
+    upserted: Dict[int, Dict[str, Any]] = field(default_factory=dict)  # id -> loaded column values
+    deleted: Set[int] = field(default_factory=set)
+    bulk: bool = False  # bulk UPDATE/DELETE หรือ import - ไม่รู้ว่าแถวไหนเปลี่ยน
+    # id -> ค่าก่อนเขียนของ column ที่เปลี่ยน (แถวที่ลบ: ทุก column ที่โหลดอยู่)
+    previous: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def ids(self) -> Set[int]:
+        return set(self.upserted) | self.deleted
+
+    def merge(self, other: "ChangeSet"):
+        for pk in other.deleted:
+            self.upserted.pop(pk, None)
+        self.upserted.update(other.upserted)
+        self.deleted |= other.deleted
+        self.bulk = self.bulk or other.bulk
+        for pk, values in other.previous.items():
+            # flush แรกของ transaction เก็บค่าก่อนเปลี่ยนจริง
+            earlier = self.previous.setdefault(pk, {})
+            for key, value in values.items():
+                earlier.setdefault(key, value)
+
+
+_listeners: Dict[type, List[Callable[[ChangeSet], None]]] = {}
+
+_PENDING_KEY = "plantdex_pending_changes"
+
+
+def on_change(*models):
+    """Decorator: call fn(changeset) after a commit that wrote any of `models`"""
+    def decorator(fn):
+        for model in models:
+            _listeners.setdefault(model, []).append(fn)
+        return fn
+    return decorator
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass  # active_history ทำให้ SQLAlchemy โหลดค่าเดิมก่อน set - listener เองไม่ต้องทำอะไร
+
+
+def track_previous(*attributes):
+    """Always load the old value when these attributes are set, so ChangeSet.previous has it"""
+    for attribute in attributes:
+        event.listen(attribute, "set", _load_old_value, active_history=True)
+
+
+def publish(changeset: ChangeSet):
+    """Deliver a change set to listeners (use directly for non-ORM writers)"""
+    for listener in _listeners.get(changeset.model, []):
+        try:
+            listener(changeset)
+        except Exception as e:
+            print(f"Warning: change listener {listener.__name__} failed: {e}")
+
+
+def record_change(
+    session: Session,
+    model: type,
+    upserted: Optional[Dict[int, Dict[str, Any]]] = None,
+    deleted: Optional[Set[int]] = None,
+    bulk: bool = False,
+    previous: Optional[Dict[int, Dict[str, Any]]] = None,
+):
+    """Queue a change for Core-level writes; published when the session commits"""
+    if model not in _listeners:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    changeset = pending.setdefault(model, ChangeSet(model))
+    changeset.merge(ChangeSet(model, upserted or {}, set(deleted or ()), bulk, previous or {}))
+
+
+def _snapshot(obj) -> Dict[str, Any]:
+    # อ่านเฉพาะค่าที่โหลดอยู่แล้ว - ห้าม trigger lazy load ระหว่าง flush
+    state = inspect(obj)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _previous_values(obj) -> Dict[str, Any]:
+    # history ยังไม่ถูกล้างใน after_flush - ค่าเดิมของ column ที่เปลี่ยนใน flush นี้
+    state = inspect(obj)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            values[attr.key] = history.deleted[0]
+    return values
+
+
+def _primary_key(obj):
+    # identity ของ object ใหม่ยังไม่ถูกตั้งใน after_flush จึงอ่าน PK จาก instance
+    state = inspect(obj)
+    return state.mapper.primary_key_from_instance(obj)[0]
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    for obj in session.new:
+        if type(obj) in _listeners:
+            record_change(session, type(obj), upserted={_primary_key(obj): _snapshot(obj)})
+    for obj in session.dirty:
+        if type(obj) in _listeners and session.is_modified(obj, include_collections=False):
+            pk = _primary_key(obj)
+            record_change(session, type(obj), upserted={pk: _snapshot(obj)}, previous={pk: _previous_values(obj)})
+    for obj in session.deleted:
+        if type(obj) in _listeners:
+            pk = _primary_key(obj)
+            record_change(session, type(obj), deleted={pk}, previous={pk: {**_snapshot(obj), **_previous_values(obj)}})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            record_change(orm_execute_state.session, mapper.class_, bulk=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for changeset in (pending or {}).values():
+        publish(changeset)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,144 @@
+"""
+Cursor Pagination for PlantDex
+Opaque keyset cursors and cheap total counts for list endpoints
+"""
+import base64
+import json
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+COUNT_CACHE_TTL = 60.0  # seconds
+ESTIMATE_MIN_ROWS = 100_000  # ตารางที่ใหญ่กว่านี้ใช้ค่าประมาณจาก pg_class แทน COUNT(*)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """Opaque, URL-safe cursor for the row after `values` in ordering `kind`"""
+    payload = json.dumps({"k": kind, "v": [_encode_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> List[Any]:
+    """Values stored in a cursor; 400 if it is malformed or from another listing"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["k"] != kind:
+            raise ValueError("cursor belongs to a different listing")
+        return [_decode_value(v) for v in payload["v"]]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_condition(columns: Sequence, values: Sequence[Any], descending: bool = False):
+    """(c1, c2, ...) > (v1, v2, ...) expanded so every database can use the index"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def paginate_keyset(
+    query: Query,
+    columns: Sequence,
+    kind: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page ordered by `columns` (last column must be unique).
+
+    `offset` is kept for old clients that still send skip/page; the returned
+    cursor is valid either way.
+    """
+    if cursor:
+        values = decode_cursor(cursor, kind)
+        if len(values) != len(columns):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = query.filter(keyset_condition(columns, values, descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if offset and not cursor:
+        query = query.offset(offset)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(kind, [getattr(last, column.key) for column in columns])
+
+
+def offset_cursor(kind: str, offset: int) -> str:
+    """Cursor for listings ordered by relevance rather than a column"""
+    return encode_cursor(kind, [offset])
+
+
+def decode_offset_cursor(cursor: str, kind: str) -> int:
+    values = decode_cursor(cursor, kind)
+    if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values[0]
+
+
+class CountCache:
+    """Short-lived cache of COUNT(*) results keyed by filter set"""
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Tuple[float, int]] = {}
+
+    def get(self, key: Hashable, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        cached = self._values.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            self._values[key] = (now + self.ttl, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def estimate_row_count(cursor, table: str) -> Optional[int]:
+    """Planner estimate of a table's row count (PostgreSQL, psycopg2 cursor)"""
+    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None  # ยังไม่เคย ANALYZE
+    return int(row[0])
@@ -0,0 +1,177 @@
+"""
+Query Profiles for PlantDex
+Named eager-loading plans per endpoint, per-request query counting and query budgets
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+QUERY_PROFILE_HEADER = "X-Query-Profile"
+DEBUG_HEADERS = (QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QUERY_PROFILE_HEADER)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or block ran more SQL statements than its budget allows"""
+
+
+@dataclass(frozen=True)
+class QueryProfile:
+    """Loader options for one endpoint plus the number of statements it may run"""
+    name: str
+    options: Tuple = ()
+    budget: Optional[int] = None
+
+    def apply(self, query: Query) -> Query:
+        return query.options(*self.options) if self.options else query
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    profile: Optional[QueryProfile] = None
+    statements: Optional[List[str]] = None  # เก็บ SQL ด้วยเมื่อ record=True (ใช้ตอน debug N+1)
+    paused: int = 0
+    _started: List[float] = field(default_factory=list)
+
+
+_profiles: Dict[str, QueryProfile] = {}
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("plantdex_query_stats", default=None)
+
+
+def register_profile(name: str, *options, budget: Optional[int] = None) -> QueryProfile:
+    """Declare a named loading plan (selectinload / joinedload / raiseload options)"""
+    if name in _profiles:
+        raise ValueError(f"Query profile {name!r} is already registered")
+    profile = QueryProfile(name, tuple(options), budget)
+    _profiles[name] = profile
+    return profile
+
+
+def get_profile(name: str) -> QueryProfile:
+    return _profiles[name]
+
+
+def registered_profiles() -> Dict[str, QueryProfile]:
+    return dict(_profiles)
+
+
+def use_profile(name: str):
+    """FastAPI dependency: attach profile `name` to the current request and return it"""
+    profile = get_profile(name)
+
+    def dependency() -> QueryProfile:
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.profile = profile
+        return profile
+
+    return dependency
+
+
+# ---- counting -------------------------------------------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is not None and not stats.paused:
+        stats._started.append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or stats.paused or not stats._started:
+        return
+    stats.count += 1
+    stats.seconds += time.perf_counter() - stats._started.pop()
+    if stats.statements is not None:
+        stats.statements.append(statement)
+
+
+@contextmanager
+def count_queries(record: bool = False) -> Iterator[QueryStats]:
+    """Count SQLAlchemy statements executed inside the block (any engine, same context)"""
+    stats = QueryStats(statements=[] if record else None)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def unmetered() -> Iterator[None]:
+    """Leave one-time work (schema probes, index warm-up) out of the current count"""
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    stats.paused += 1
+    try:
+        yield
+    finally:
+        stats.paused -= 1
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[QueryStats]:
+    """Fail with QueryBudgetExceeded when the block runs more than `max_queries` statements"""
+    with count_queries(record=True) as stats:
+        yield stats
+    _check_budget(stats, max_queries, label)
+
+
+def _check_budget(stats: QueryStats, budget: int, label: str):
+    if stats.count > budget:
+        statements = "\n".join(f"  {sql}" for sql in (stats.statements or [])[:20])
+        raise QueryBudgetExceeded(
+            f"{label} ran {stats.count} queries (budget {budget})" + (f":\n{statements}" if statements else "")
+        )
+
+
+class QueryProfileMiddleware:
+    """Count statements per request; debug headers and budget enforcement from settings"""
+
+    def __init__(self, app, debug_headers: Optional[bool] = None, enforce_budgets: Optional[bool] = None):
+        self.app = app
+        self.debug_headers = settings.DEBUG if debug_headers is None else debug_headers
+        self.enforce_budgets = settings.QUERY_BUDGET_ENFORCE if enforce_budgets is None else enforce_budgets
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.debug_headers or self.enforce_budgets):
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(statements=[] if self.enforce_budgets else None)
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                profile = stats.profile
+                if self.enforce_budgets and profile is not None and profile.budget is not None:
+                    # ตรวจก่อนส่ง header - TestClient จะ raise ให้ test fail ทันที
+                    _check_budget(stats, profile.budget, f"{scope['method']} {scope['path']} ({profile.name})")
+                if self.debug_headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()))
+                    if profile is not None:
+                        headers.append((QUERY_PROFILE_HEADER.lower().encode(), profile.name.encode()))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
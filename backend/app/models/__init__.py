@@ -1,8 +1,10 @@
 # Import all models
-from .plant import Plant, PlantCategory, CareLevel
+from .plant import Plant, PlantCategory, CareLevel, PlantScore, PlantMasterHash
 from .user import User, Seller, PlantListing
-from .price import PlantPrice
-from .market import MarketTrend, PlantPriceIndex, TrendingPlant
+from .price import PlantPrice, PlantPriceSummary
+from .market import (
+    MarketTrend, PlantPriceIndex, TrendingPlant, DemandForecast, CategoryTrendWeekly, PlantTrendWeekly
+)
 
 # Import detailed models
 from .plant_detailed import (
@@ -11,9 +13,10 @@ from .plant_detailed import (
 )
 
 __all__ = [
-    "Plant", "PlantCategory", "CareLevel",
+    "Plant", "PlantCategory", "CareLevel", "PlantScore", "PlantMasterHash",
     "User", "Seller", "PlantListing",
-    "PlantPrice", "MarketTrend", "PlantPriceIndex", "TrendingPlant",
+    "PlantPrice", "PlantPriceSummary", "MarketTrend", "PlantPriceIndex", "TrendingPlant", "DemandForecast",
+    "CategoryTrendWeekly", "PlantTrendWeekly",
     "PlantImage", "PlantPropagation", "PlantPestDisease", 
     "PlantSeasonalInfo", "PlantShippingInfo", "PlantPriceDetailed"
 ] 
\ No newline at end of file
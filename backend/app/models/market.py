@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Date
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Date, UniqueConstraint, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.models.plant import PlantCategory
 
 class MarketTrend(Base):
     __tablename__ = "market_trends"
@@ -63,4 +64,75 @@ class TrendingPlant(Base):
     plant = relationship("Plant")
     
     def __repr__(self):
-        return f"<TrendingPlant(id={self.id}, plant_id={self.plant_id}, rank={self.rank}, week_start='{self.week_start}')>" 
\ No newline at end of file
+        return f"<TrendingPlant(id={self.id}, plant_id={self.plant_id}, rank={self.rank}, week_start='{self.week_start}')>"
+
+class DemandForecast(Base):
+    """Weekly demand forecast per plant, regenerated in batch from market_trends"""
+    __tablename__ = "demand_forecasts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    plant_id = Column(Integer, ForeignKey("plants.id", ondelete="CASCADE"), nullable=False, index=True)
+    horizon = Column(Integer, nullable=False)  # weeks after the week the forecast was generated in
+    forecast_week = Column(Date, nullable=False)
+    projected_demand = Column(Float, nullable=False)  # 0-100
+    lower_bound = Column(Float)  # prediction interval; NULL when history is too short
+    upper_bound = Column(Float)
+    seasonal_factor = Column(Float)  # factor assumed for forecast_week
+    current_demand = Column(Float)
+    current_supply = Column(Float)
+    trend_slope = Column(Float)  # demand points per week (seasonally adjusted)
+    model = Column(String(30), nullable=False)  # weighted_trend, mean
+    history_weeks = Column(Integer, nullable=False)
+    generated_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("plant_id", "horizon", name="uq_demand_forecasts_plant_horizon"),
+    )
+    
+    def __repr__(self):
+        return f"<DemandForecast(plant_id={self.plant_id}, forecast_week='{self.forecast_week}', projected_demand={self.projected_demand})>"
+
+class CategoryTrendWeekly(Base):
+    """Weekly market_trends aggregates per plant category (rebuilt by app/services/trend_rollups.py)"""
+    __tablename__ = "category_trend_weekly"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    week_start = Column(Date, nullable=False, index=True)
+    category = Column(Enum(PlantCategory), nullable=False)
+    plant_count = Column(Integer, nullable=False)
+    total_search_volume = Column(Integer)
+    total_sales_volume = Column(Integer)
+    avg_price = Column(Float)
+    avg_price_change_percent = Column(Float)
+    avg_demand_score = Column(Float)
+    avg_supply_score = Column(Float)
+    up_count = Column(Integer)
+    down_count = Column(Integer)
+    stable_count = Column(Integer)
+    
+    __table_args__ = (
+        UniqueConstraint("week_start", "category", name="uq_category_trend_weekly_week_category"),
+    )
+    
+    def __repr__(self):
+        return f"<CategoryTrendWeekly(week_start='{self.week_start}', category='{self.category}', plant_count={self.plant_count})>"
+
+class PlantTrendWeekly(Base):
+    """Week-over-week changes and 4-week averages per plant, derived from market_trends"""
+    __tablename__ = "plant_trend_weekly"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    plant_id = Column(Integer, ForeignKey("plants.id", ondelete="CASCADE"), nullable=False)
+    week_start = Column(Date, nullable=False, index=True)
+    demand_change = Column(Float)  # demand_score minus the previous tracked week
+    sales_change_percent = Column(Float)
+    demand_avg_4w = Column(Float)
+    price_avg_4w = Column(Float)
+    weeks_tracked = Column(Integer, nullable=False)  # market_trends rows up to this week
+    
+    __table_args__ = (
+        UniqueConstraint("plant_id", "week_start", name="uq_plant_trend_weekly_plant_week"),
+    )
+    
+    def __repr__(self):
+        return f"<PlantTrendWeekly(plant_id={self.plant_id}, week_start='{self.week_start}', demand_change={self.demand_change})>"
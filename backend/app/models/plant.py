@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.orm import query_expression, relationship
 from sqlalchemy.sql import func
 import enum
 from app.core.database import Base
@@ -59,6 +59,9 @@ class Plant(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # โหลดจาก plant_scores เมื่อ query ใช้ with_expression (ดู app/services/plant_scores.py)
+    investment_score = query_expression()
+    
     # Relationships
     prices = relationship("PlantPrice", back_populates="plant")
     market_trends = relationship("MarketTrend", back_populates="plant")
@@ -72,4 +75,33 @@ class Plant(Base):
     prices_detailed = relationship("PlantPriceDetailed", overlaps="plant")
     
     def __repr__(self):
-        return f"<Plant(id={self.id}, scientific_name='{self.scientific_name}', common_name_th='{self.common_name_th}')>" 
\ No newline at end of file
+        return f"<Plant(id={self.id}, scientific_name='{self.scientific_name}', common_name_th='{self.common_name_th}')>"
+
+class PlantScore(Base):
+    """Precomputed investment score per plant, kept in sync with the plants table"""
+    __tablename__ = "plant_scores"
+    
+    plant_id = Column(Integer, ForeignKey("plants.id", ondelete="CASCADE"), primary_key=True)
+    investment_score = Column(Integer, nullable=False)  # 0-100
+    model_version = Column(String(20), nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # เรียงตามคะแนนแบบ keyset (score DESC, plant_id DESC)
+        Index("ix_plant_scores_score_plant", "investment_score", "plant_id"),
+    )
+    
+    def __repr__(self):
+        return f"<PlantScore(plant_id={self.plant_id}, investment_score={self.investment_score})>"
+
+class PlantMasterHash(Base):
+    """Hash of the master CSV row a plant was last synced from (see sync_plants.py)"""
+    __tablename__ = "plant_master_hashes"
+    
+    plant_id = Column(Integer, ForeignKey("plants.id", ondelete="CASCADE"), primary_key=True)
+    scientific_name = Column(String(255), nullable=False, unique=True)
+    row_hash = Column(String(64), nullable=False)  # sha256 ของค่าที่ parse แล้ว
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<PlantMasterHash(scientific_name='{self.scientific_name}', plant_id={self.plant_id})>"
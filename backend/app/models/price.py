@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -28,5 +28,32 @@ class PlantPrice(Base):
     # Relationships
     plant = relationship("Plant", back_populates="prices")
     
+    __table_args__ = (
+        # ราคาล่าสุดของต้นไม้หนึ่งต้น (paginated /plants/{id}/prices, ช่วงเวลา)
+        Index("ix_plant_prices_plant_collected", "plant_id", "data_collected_at"),
+    )
+    
+    def __repr__(self):
+        return f"<PlantPrice(id={self.id}, plant_id={self.plant_id}, source='{self.source}', price={self.price})>"
+
+class PlantPriceSummary(Base):
+    """Per plant and source price statistics, refreshed whenever plant_prices changes"""
+    __tablename__ = "plant_price_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    plant_id = Column(Integer, ForeignKey("plants.id"), nullable=False, index=True)
+    source = Column(String(100), nullable=False)
+    price_count = Column(Integer, nullable=False, default=0)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    avg_price = Column(Float)
+    median_price = Column(Float)
+    last_seen_at = Column(DateTime(timezone=True))  # data_collected_at ล่าสุดของ source นี้
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("plant_id", "source", name="uq_plant_price_summaries_plant_source"),
+    )
+    
     def __repr__(self):
-        return f"<PlantPrice(id={self.id}, plant_id={self.plant_id}, source='{self.source}', price={self.price})>" 
\ No newline at end of file
+        return f"<PlantPriceSummary(plant_id={self.plant_id}, source='{self.source}', price_count={self.price_count})>"
@@ -0,0 +1,306 @@
+"""
+Plant Autocomplete for PlantDex
+In-process sorted-array prefix index for type-ahead suggestions
+"""
+import bisect
+import re
+import threading
+from itertools import compress
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.events import ChangeSet, on_change
+from app.models.market import TrendingPlant
+from app.models.plant import Plant
+from app.services.search import normalize
+
+NAME_FIELDS = ("common_name_th", "common_name_en", "scientific_name")
+PAYLOAD_FIELDS = ("id",) + NAME_FIELDS + ("category", "is_trending")
+
+# ประเภทของ key - ยิ่งน้อยยิ่งตรง
+MATCH_FULL_NAME = 0  # prefix ของชื่อเต็ม
+MATCH_WORD = 1  # prefix ของคำถัดๆ ไปในชื่อ ("deli" -> Monstera deliciosa)
+MATCH_THAI_INNER = 2  # prefix ของพยางค์กลางชื่อไทย ("สเตอ" -> มอนสเตอร่า)
+
+# สระหลัง/สระบนล่าง ขึ้นต้นพยางค์ไม่ได้ - ไม่ต้องสร้าง key ที่ขึ้นต้นด้วยตัวเหล่านี้
+THAI_RUN = re.compile("[\u0e00-\u0e7f]+")
+THAI_NON_INITIAL = set("\u0e30\u0e31\u0e32\u0e33\u0e34\u0e35\u0e36\u0e37\u0e38\u0e39\u0e3a\u0e45")
+MIN_INNER_KEY = 2
+
+TRENDING_WEIGHT = 10.0
+TOP_RANK_WEIGHT = 50.0  # อันดับ 1 ใน TrendingPlant สัปดาห์ล่าสุด = 50, อันดับ 2 = 25, ...
+
+# rank ของแต่ละ entry เป็น int64 เดียว: kind | popularity | name length | plant id
+MAX_POPULARITY = 9999
+ID_BITS = 31
+ID_MASK = (1 << ID_BITS) - 1
+
+CACHE_RANGE_THRESHOLD = 256  # cache คำตอบของ prefix สั้นๆ ที่ครอบคลุมหลาย key
+CACHE_MAX_ENTRIES = 2048
+
+Entry = Tuple[str, int, int]  # (normalised key, match kind, plant id)
+# (sorted entries, rank ของแต่ละ entry, cache ของ suggest) - สลับพร้อมกันใน assignment เดียว
+Snapshot = Tuple[List[Entry], np.ndarray, Dict[Tuple[str, int], List[int]]]
+
+
+def _keys_for(payload: Dict[str, Any]) -> Set[Tuple[str, int]]:
+    keys: Set[Tuple[str, int]] = set()
+    for field_name in NAME_FIELDS:
+        name = " ".join(normalize(payload.get(field_name)).split())
+        if not name:
+            continue
+        keys.add((name, MATCH_FULL_NAME))
+
+        words = name.split(" ")
+        for i in range(1, len(words)):
+            keys.add((" ".join(words[i:]), MATCH_WORD))
+
+        # ชื่อไทยไม่เว้นวรรค จึง index ทุกตำแหน่งที่ขึ้นต้นพยางค์ได้
+        for match in THAI_RUN.finditer(name):
+            for start in range(match.start() + 1, match.end() - MIN_INNER_KEY + 1):
+                if name[start] not in THAI_NON_INITIAL:
+                    keys.add((name[start:], MATCH_THAI_INNER))
+    return keys
+
+
+def _entries_for(payload: Dict[str, Any]) -> List[Entry]:
+    return [(key, kind, payload["id"]) for key, kind in _keys_for(payload)]
+
+
+def _suggestion(payload: Dict[str, Any]) -> Dict[str, Any]:
+    category = payload.get("category")
+    return {
+        "id": payload["id"],
+        "common_name_th": payload.get("common_name_th"),
+        "common_name_en": payload.get("common_name_en"),
+        "scientific_name": payload.get("scientific_name"),
+        "category": category.value if hasattr(category, "value") else category,
+    }
+
+
+class AutocompleteIndex:
+    """Sorted (key, kind, plant_id) array searched with bisect.
+
+    Each entry also has a precomputed int64 rank (match kind, popularity,
+    name length, plant id packed into one number), so a lookup is a bisect
+    plus a partial sort of the matching slice. Writers build new arrays and
+    swap them in as one (entries, ranks, query cache) tuple, so lookups never
+    take a lock and never see entries and ranks from different versions.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshot: Snapshot = ([], np.empty(0, dtype=np.int64), {})
+        self._plants: Dict[int, Dict[str, Any]] = {}
+        self._popularity: Dict[int, float] = {}
+        self._trending_ranks: Dict[int, int] = {}
+
+        self._built = False
+        self._needs_rebuild = False
+        self._stale_ids: Set[int] = set()
+        self._ranks_stale = True
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot[0])
+
+    # ---- maintenance -------------------------------------------------
+
+    def _score_popularity(self, plant_id: int):
+        payload = self._plants.get(plant_id)
+        if payload is None:
+            self._popularity.pop(plant_id, None)
+            return
+        score = TRENDING_WEIGHT if payload.get("is_trending") else 0.0
+        rank = self._trending_ranks.get(plant_id)
+        if rank:
+            score += TOP_RANK_WEIGHT / rank
+        self._popularity[plant_id] = score
+
+    def _entry_rank(self, entry: Entry) -> int:
+        # เรียงจาก: ชนิดการ match, ความนิยม (มากก่อน), ชื่อสั้นก่อน, id
+        _, kind, plant_id = entry
+        popularity = min(int(self._popularity.get(plant_id, 0.0) * 100), MAX_POPULARITY)
+        name_length = min(len(self._plants[plant_id].get("scientific_name") or ""), 255)
+        return (((kind * (MAX_POPULARITY + 1) + MAX_POPULARITY - popularity) << 8 | name_length) << ID_BITS) | plant_id
+
+    def _swap(self, entries: List[Entry]):
+        ranks = np.fromiter((self._entry_rank(entry) for entry in entries), dtype=np.int64, count=len(entries))
+        self._snapshot = (entries, ranks, {})
+
+    def load(self, payloads: Iterable[Dict[str, Any]]):
+        """Replace the whole index"""
+        plants = {payload["id"]: payload for payload in payloads}
+        entries = sorted(entry for payload in plants.values() for entry in _entries_for(payload))
+        with self._lock:
+            self._plants = plants
+            self._popularity = {}
+            for plant_id in plants:
+                self._score_popularity(plant_id)
+            self._swap(entries)
+            self._built = True
+
+    def apply(self, upserts: Iterable[Dict[str, Any]] = (), removed: Iterable[int] = ()):
+        """Merge changed plants into the array in one O(n) pass"""
+        upserts = {payload["id"]: payload for payload in upserts}
+        dropped = set(upserts) | set(removed)
+        if not dropped or not self._built:
+            return  # ยังไม่ได้ build - ensure_fresh จะโหลดทั้งหมดอยู่แล้ว
+        added = sorted(entry for payload in upserts.values() for entry in _entries_for(payload))
+        with self._lock:
+            for plant_id in dropped:
+                self._plants.pop(plant_id, None)
+            self._plants.update(upserts)
+            for plant_id in dropped:
+                self._score_popularity(plant_id)
+            # เก็บ rank เดิมของ entry ที่ไม่เปลี่ยน แล้วแทรกเฉพาะ entry ใหม่
+            current, ranks, _ = self._snapshot
+            keep = ~np.isin(ranks & ID_MASK, np.fromiter(dropped, dtype=np.int64))
+            kept = list(compress(current, keep.tolist()))
+            kept_ranks = ranks[keep]
+
+            positions = [bisect.bisect_left(kept, entry) for entry in added]
+            entries: List[Entry] = []
+            previous = 0
+            for position, entry in zip(positions, added):
+                entries.extend(kept[previous:position])
+                entries.append(entry)
+                previous = position
+            entries.extend(kept[previous:])
+
+            added_ranks = np.fromiter((self._entry_rank(entry) for entry in added), dtype=np.int64, count=len(added))
+            self._snapshot = (entries, np.insert(kept_ranks, positions, added_ranks), {})
+
+    def set_trending_ranks(self, ranks: Dict[int, int]):
+        with self._lock:
+            self._trending_ranks = dict(ranks)
+            for plant_id in self._plants:
+                self._score_popularity(plant_id)
+            self._swap(self._snapshot[0])
+
+    def mark_stale(self, ids: Iterable[int] = (), rebuild: bool = False, ranks: bool = False):
+        with self._lock:
+            self._stale_ids.update(ids)
+            self._needs_rebuild = self._needs_rebuild or rebuild
+            self._ranks_stale = self._ranks_stale or ranks
+
+    def _query_payloads(self, db: Session, ids: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        query = db.query(*[getattr(Plant, name) for name in PAYLOAD_FIELDS])
+        if ids is not None:
+            query = query.filter(Plant.id.in_(ids))
+        return [dict(zip(PAYLOAD_FIELDS, row)) for row in query.yield_per(1000)]
+
+    def _query_trending_ranks(self, db: Session) -> Dict[int, int]:
+        latest_week = db.query(func.max(TrendingPlant.week_start)).scalar()
+        if latest_week is None:
+            return {}
+        rows = db.query(TrendingPlant.plant_id, func.min(TrendingPlant.rank)).filter(
+            TrendingPlant.week_start == latest_week
+        ).group_by(TrendingPlant.plant_id).all()
+        return {plant_id: rank for plant_id, rank in rows}
+
+    def ensure_fresh(self, db: Session):
+        """Apply pending reloads; a no-op (no query) in the steady state"""
+        if self._built and not self._needs_rebuild and not self._stale_ids and not self._ranks_stale:
+            return
+        with self._lock:
+            if self._ranks_stale:
+                self._ranks_stale = False
+                self._trending_ranks = self._query_trending_ranks(db)
+                if self._built and not self._needs_rebuild:
+                    self.set_trending_ranks(self._trending_ranks)
+            if not self._built or self._needs_rebuild:
+                self._needs_rebuild = False
+                self._stale_ids.clear()
+                self.load(self._query_payloads(db))
+            elif self._stale_ids:
+                stale, self._stale_ids = self._stale_ids, set()
+                payloads = self._query_payloads(db, stale)
+                self.apply(payloads, removed=stale - {payload["id"] for payload in payloads})
+
+    # ---- querying ----------------------------------------------------
+
+    def _top_plants(self, ranks: np.ndarray, limit: int) -> List[int]:
+        """Best `limit` distinct plants in a slice of entry ranks"""
+        take = min(len(ranks), limit * 4)
+        while True:
+            if take < len(ranks):
+                order = np.argpartition(ranks, take - 1)[:take]
+                best = ranks[order]
+                best.sort()
+            else:
+                best = np.sort(ranks)
+
+            plant_ids: List[int] = []
+            seen: Set[int] = set()
+            for rank in best.tolist():
+                plant_id = rank & ID_MASK
+                if plant_id not in seen:
+                    seen.add(plant_id)
+                    plant_ids.append(plant_id)
+                    if len(plant_ids) == limit:
+                        return plant_ids
+            # หลาย key ของพืชต้นเดียวกันกินที่ - ขยายแล้วลองใหม่
+            if take >= len(ranks):
+                return plant_ids
+            take *= 4
+
+    def suggest(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        prefix = " ".join(normalize(q).split())
+        if not prefix:
+            return []
+
+        entries, ranks, cache = self._snapshot
+        cache_key = (prefix, limit)
+        plant_ids = cache.get(cache_key)
+        if plant_ids is None:
+            lo = bisect.bisect_left(entries, (prefix,))
+            hi = bisect.bisect_left(entries, (prefix + "\uffff",), lo)
+            plant_ids = self._top_plants(ranks[lo:hi], limit)
+
+            if hi - lo > CACHE_RANGE_THRESHOLD:
+                if len(cache) >= CACHE_MAX_ENTRIES:
+                    cache.clear()
+                cache[cache_key] = plant_ids
+
+        plants = self._plants
+        return [_suggestion(plants[plant_id]) for plant_id in plant_ids if plant_id in plants]
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def build_autocomplete_index():
+    """Load the index at startup"""
+    db = SessionLocal()
+    try:
+        autocomplete_index.ensure_fresh(db)
+    finally:
+        db.close()
+
+
+@on_change(Plant)
+def _refresh_plants(changeset: ChangeSet):
+    if changeset.bulk:
+        autocomplete_index.mark_stale(rebuild=True)
+        return
+
+    # snapshot จาก flush มีชื่อครบ (เช่น import CSV) ก็ merge ได้เลยไม่ต้อง query
+    upserts, partial = [], []
+    for plant_id, values in changeset.upserted.items():
+        if all(name in values for name in PAYLOAD_FIELDS):
+            upserts.append({name: values[name] for name in PAYLOAD_FIELDS})
+        else:
+            partial.append(plant_id)
+    autocomplete_index.apply(upserts, removed=changeset.deleted)
+    if partial:
+        autocomplete_index.mark_stale(partial)
+
+
+@on_change(TrendingPlant)
+def _refresh_trending_ranks(changeset: ChangeSet):
+    autocomplete_index.mark_stale(ranks=True)
@@ -0,0 +1,94 @@
+"""
+Batch Job Runs for PlantDex
+Record start, duration, row counts and outcome of scheduled jobs (psycopg2)
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+BATCH_JOB_RUNS_SQL = """
+CREATE TABLE IF NOT EXISTS batch_job_runs (
+    id SERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL,            -- running, success, failed
+    started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP,
+    duration_seconds NUMERIC(10,3),
+    rows_processed BIGINT,
+    rows_written BIGINT,
+    details JSON,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_batch_job_runs_job ON batch_job_runs(job_name, started_at DESC);
+"""
+
+
+def install_batch_job_runs(cursor):
+    cursor.execute(BATCH_JOB_RUNS_SQL)
+
+
+def start_job_run(conn, job_name: str) -> int:
+    """Insert a 'running' row and commit it so the run is visible while it works"""
+    with conn.cursor() as cursor:
+        install_batch_job_runs(cursor)
+        cursor.execute(
+            "INSERT INTO batch_job_runs (job_name, status) VALUES (%s, 'running') RETURNING id",
+            (job_name,),
+        )
+        run_id = cursor.fetchone()[0]
+    conn.commit()
+    return run_id
+
+
+def finish_job_run(
+    conn,
+    run_id: int,
+    status: str,
+    rows_processed: Optional[int] = None,
+    rows_written: Optional[int] = None,
+    details: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+):
+    """Close a run (call after the job's own commit or rollback)"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE batch_job_runs
+            SET status = %s,
+                finished_at = clock_timestamp(),
+                duration_seconds = EXTRACT(EPOCH FROM clock_timestamp() - started_at),
+                rows_processed = %s,
+                rows_written = %s,
+                details = %s,
+                error = %s
+            WHERE id = %s
+        """, (status, rows_processed, rows_written, json.dumps(details, default=str) if details else None, error, run_id))
+    conn.commit()
+
+
+def recent_job_runs(cursor, job_name: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    query = """
+        SELECT id, job_name, status, started_at, finished_at, duration_seconds,
+               rows_processed, rows_written, details, error
+        FROM batch_job_runs
+    """
+    params: List[Any] = []
+    if job_name:
+        query += " WHERE job_name = %s"
+        params.append(job_name)
+    query += " ORDER BY started_at DESC, id DESC LIMIT %s"
+    params.append(limit)
+    cursor.execute(query, params)
+    return [
+        {
+            "id": row[0],
+            "job_name": row[1],
+            "status": row[2],
+            "started_at": row[3].isoformat() if row[3] else None,
+            "finished_at": row[4].isoformat() if row[4] else None,
+            "duration_seconds": float(row[5]) if row[5] is not None else None,
+            "rows_processed": row[6],
+            "rows_written": row[7],
+            "details": row[8],
+            "error": row[9],
+        }
+        for row in cursor.fetchall()
+    ]
@@ -0,0 +1,326 @@
+"""
+Bulk CSV Loader for PlantDex
+Load a set of CSVs into PostgreSQL: COPY every file into an unlogged staging
+table in parallel (one connection each), check all foreign keys in one
+set-based query, then publish parents before children in one transaction
+"""
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.events import record_change
+from app.models.plant import Plant
+from app.services.csv_import import (
+    CHUNK_SIZE, ImportReport, RowError, iter_chunks, reset_id_sequence, text_value,
+)
+from app.services.csv_types import COMPANION_ROWS, CSV_TYPES, table_for
+from app.services.plant_import import refresh_plant_indexes
+
+STAGING_PREFIX = "load_"
+LINE_COLUMN = "load_line"  # บรรทัดใน CSV ต้นทาง - ใช้รายงาน error
+NULL_MARKER = "\\N"
+MAX_WORKERS = 4
+
+# (child table, column, parent table, parent column)
+ForeignKeyEdge = Tuple[str, str, str, str]
+
+
+def dependency_graph(models: Sequence[type]) -> Tuple[Dict[str, Set[str]], List[ForeignKeyEdge]]:
+    """table -> parent tables among `models`, plus every foreign key edge out of `models`"""
+    tables = {model.__table__.name for model in models}
+    graph: Dict[str, Set[str]] = {name: set() for name in tables}
+    edges = []
+    for model in models:
+        for fk in model.__table__.foreign_keys:
+            parent = fk.column.table.name
+            if parent == model.__table__.name:
+                continue
+            if parent in tables:
+                graph[model.__table__.name].add(parent)
+            edges.append((model.__table__.name, fk.parent.name, parent, fk.column.name))
+    return graph, sorted(edges)
+
+
+def load_waves(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """Tables grouped so each group only depends on earlier groups"""
+    remaining = {table: set(parents) for table, parents in graph.items()}
+    waves = []
+    while remaining:
+        ready = sorted(table for table, parents in remaining.items() if not parents)
+        if not ready:
+            raise ValueError(f"Foreign key cycle between: {', '.join(sorted(remaining))}")
+        waves.append(ready)
+        for table in ready:
+            del remaining[table]
+        for parents in remaining.values():
+            parents.difference_update(ready)
+    return waves
+
+
+def _models(csv_types: Iterable[str]) -> List[type]:
+    """Models written by these CSV types (companions included)"""
+    specs = [CSV_TYPES[csv_type] for csv_type in csv_types]
+    return list(dict.fromkeys(model for spec in specs for model in (spec.model, *spec.companions)))
+
+
+def load_order(csv_types: Iterable[str]) -> List[List[str]]:
+    """Publish waves (table names) for loading these CSV types"""
+    graph, _ = dependency_graph(_models(csv_types))
+    return load_waves(graph)
+
+
+def _staging(table: str) -> str:
+    return f"{STAGING_PREFIX}{table}"
+
+
+class _TableWriter:
+    """COPY rows for one table into its staging table"""
+
+    def __init__(self, model: type, dialect, report: ImportReport, key_column: str = "id"):
+        self.table = model.__table__
+        self.report = report
+        self.key_column = key_column
+        self.columns: Optional[List[str]] = None
+        self.processors = {
+            column.name: column.type.bind_processor(dialect) for column in self.table.columns
+        }
+        # NOT NULL ที่ไม่มี default - ตรวจก่อน COPY (COPY ล้มทั้ง chunk)
+        self.required = {
+            column.name for column in self.table.columns
+            if not column.nullable and column.default is None and column.server_default is None
+            and not column.primary_key
+        }
+
+    def complete(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply Python-side column defaults the ORM would have used"""
+        for column in self.table.columns:
+            if column.name in values or column.default is None:
+                continue
+            if column.default.is_scalar:
+                values[column.name] = column.default.arg
+            elif column.default.is_callable:
+                values[column.name] = column.default.arg(None)
+        missing = [name for name in self.required if values.get(name) is None]
+        if missing:
+            raise RowError(f"{', '.join(sorted(missing))} is required")
+        return values
+
+    def _encode(self, name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        processor = self.processors[name]
+        return processor(value) if processor else value
+
+    def write(self, cursor, rows: List[Tuple[int, Dict[str, Any]]]):
+        if not rows:
+            return
+        if self.columns is None:
+            self.columns = list(rows[0][1])
+        try:
+            cursor.execute("SAVEPOINT load_chunk")
+            self._copy(cursor, rows)
+            cursor.execute("RELEASE SAVEPOINT load_chunk")
+        except Exception:
+            # chunk ล้ม (เช่นข้อความยาวเกิน column) - COPY ทีละแถวเพื่อรายงานแถวที่ผิด
+            cursor.execute("ROLLBACK TO SAVEPOINT load_chunk")
+            for line, values in rows:
+                try:
+                    self._copy(cursor, [(line, values)])
+                    cursor.execute("RELEASE SAVEPOINT load_chunk")
+                    cursor.execute("SAVEPOINT load_chunk")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT load_chunk")
+                    self.report.add_error(line, values.get(self.key_column), str(e).strip().splitlines()[0])
+            cursor.execute("RELEASE SAVEPOINT load_chunk")
+
+    def _copy(self, cursor, rows: List[Tuple[int, Dict[str, Any]]]):
+        copy_rows(cursor, _staging(self.table.name), [*self.columns, LINE_COLUMN], (
+            [*(self._encode(name, values.get(name)) for name in self.columns), line] for line, values in rows
+        ))
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+    """COPY rows (None = NULL) into `table` through an in-memory CSV buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([NULL_MARKER if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')", buffer
+    )
+
+
+def _create_staging(cursor, model: type):
+    table = model.__table__.name
+    cursor.execute(f"DROP TABLE IF EXISTS {_staging(table)}")
+    cursor.execute(f"CREATE UNLOGGED TABLE {_staging(table)} (LIKE {table} INCLUDING DEFAULTS)")
+    cursor.execute(f"ALTER TABLE {_staging(table)} ADD COLUMN {LINE_COLUMN} integer")
+
+
+def _stage_csv(
+    engine: Engine, csv_type: str, path: str, reports: Dict[str, ImportReport], chunk_size: int,
+    progress: Optional[Callable[[str, ImportReport], None]],
+):
+    """Parse one CSV and COPY it (plus companion rows) into staging on its own connection"""
+    connection = engine.raw_connection()
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            reader = csv.DictReader(stream)
+            spec = table_for(csv_type, reader.fieldnames)
+            missing = spec.missing_columns(reader.fieldnames)
+            if missing:
+                raise ValueError(f"{path} is missing required columns for {spec.name}: {', '.join(missing)}")
+
+            report = reports[spec.model.__table__.name]
+            writer = _TableWriter(spec.model, engine.dialect, report, spec.key_column)
+            companions = [
+                (_TableWriter(model, engine.dialect, reports[model.__table__.name]), build)
+                for model, build in COMPANION_ROWS.get(csv_type, ())
+            ]
+            cursor = connection.cursor()
+            for model in (spec.model, *spec.companions):
+                _create_staging(cursor, model)
+
+            started = time.perf_counter()
+            for chunk in iter_chunks(reader, chunk_size):
+                report.rows_read += len(chunk)
+                rows = []
+                for line, row in chunk:
+                    try:
+                        rows.append((line, writer.complete(spec.parse(row))))
+                    except RowError as e:
+                        report.add_error(line, text_value(row, spec.key_column), str(e))
+                for companion, build in companions:
+                    built = build([values for _, values in rows])
+                    companion.report.rows_read += len(built)
+                    companion.write(cursor, [
+                        (line, companion.complete(values)) for (line, _), values in zip(rows, built)
+                    ])
+                writer.write(cursor, rows)
+                report.elapsed_seconds = time.perf_counter() - started
+                if progress:
+                    progress(csv_type, report)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def find_orphans(db: Session, edges: Sequence[ForeignKeyEdge], staged: Set[str]) -> List[Tuple[str, str, Any, int]]:
+    """(child table, column, value, CSV line) for staged rows whose parent is neither staged nor stored"""
+    checks = []
+    for child, column, parent, parent_column in edges:
+        if child not in staged:
+            continue
+        check = (
+            f"SELECT '{child}' AS child_table, '{column}' AS column_name, s.{column} AS value, "
+            f"s.{LINE_COLUMN} AS line FROM {_staging(child)} s WHERE s.{column} IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM {parent} p WHERE p.{parent_column} = s.{column})"
+        )
+        if parent in staged:
+            check += f" AND NOT EXISTS (SELECT 1 FROM {_staging(parent)} p WHERE p.{parent_column} = s.{column})"
+        checks.append(check)
+    if not checks:
+        return []
+    # ตรวจทุก foreign key ใน query เดียว
+    return [tuple(row) for row in db.execute(text(" UNION ALL ".join(checks) + " ORDER BY 1, 4"))]
+
+
+def _publish(db: Session, model: type, edges: Sequence[ForeignKeyEdge], replace_by: Optional[str] = None) -> List[Any]:
+    """INSERT the staged rows whose parents exist, returning their keys.
+
+    Existing keys (replace_by: existing row sets) are kept.
+    """
+    table = model.__table__.name
+    key = model.__mapper__.primary_key[0].name
+    columns = ", ".join(column.name for column in model.__table__.columns)
+    conditions = [
+        f"(s.{column} IS NULL OR EXISTS (SELECT 1 FROM {parent} p WHERE p.{parent_column} = s.{column}))"
+        for child, column, parent, parent_column in edges if child == table
+    ]
+    if replace_by:
+        # เหมือน import_csv แบบ skip - plant ที่มีแถวอยู่แล้วไม่ถูกเพิ่มแถวซ้ำ
+        conditions.append(f"NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{replace_by} = s.{replace_by})")
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    result = db.execute(text(
+        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {_staging(table)} s {where}"
+        f"ORDER BY s.{LINE_COLUMN} ON CONFLICT DO NOTHING RETURNING {key}"
+    ))
+    return result.scalars().all()
+
+
+def _drop_staging(db: Session, tables: Sequence[str]):
+    for table in tables:
+        db.execute(text(f"DROP TABLE IF EXISTS {_staging(table)}"))
+
+
+def load_csv_files(
+    db: Session,
+    files: Dict[str, str],
+    chunk_size: int = CHUNK_SIZE,
+    max_workers: int = MAX_WORKERS,
+    progress: Optional[Callable[[str, ImportReport], None]] = None,
+) -> Dict[str, ImportReport]:
+    """Load {csv_type: path} into their tables; returns a report per table in publish order.
+
+    Existing rows are kept (conflicting CSV rows, and detail rows of plants
+    that already have rows, count as skipped) and rows
+    pointing at a missing parent are reported as errors. The caller commits
+    the publish, so it is all-or-nothing; on failure `db` is rolled back.
+    """
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("The bulk loader needs PostgreSQL (COPY); use import_csv.py on other databases")
+    unknown = set(files) - set(CSV_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown CSV types: {', '.join(sorted(unknown))}")
+
+    models = _models(files)
+    graph, edges = dependency_graph(models)
+    order = [table for wave in load_waves(graph) for table in wave]
+    by_table = {model.__table__.name: model for model in models}
+    replace_by = {CSV_TYPES[csv_type].model.__table__.name: CSV_TYPES[csv_type].replace_by for csv_type in files}
+    reports = {table: ImportReport() for table in order}
+
+    started = time.perf_counter()
+    try:
+        # staging ไม่มี constraint - ทุกไฟล์ COPY พร้อมกันได้
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk-load") as executor:
+            futures = [
+                executor.submit(_stage_csv, engine, csv_type, path, reports, chunk_size, progress)
+                for csv_type, path in files.items()
+            ]
+            for future in futures:
+                future.result()
+
+        for child, column, value, line in find_orphans(db, edges, set(order)):
+            reports[child].add_error(line, value, f"{column} {value} not found")
+
+        for table in order:
+            report = reports[table]
+            published = _publish(db, by_table[table], edges, replace_by.get(table))
+            report.inserted = len(published)
+            report.skipped = max(report.rows_read - report.failed - report.inserted, 0)
+            if report.inserted:
+                reset_id_sequence(db, by_table[table])
+                if by_table[table] is Plant:
+                    # search vector / score ของพืชใหม่ - อยู่ใน transaction เดียวกับการ publish
+                    refresh_plant_indexes(db, published)
+                record_change(db, by_table[table], bulk=True)
+            report.elapsed_seconds = time.perf_counter() - started
+    except Exception:
+        db.rollback()
+        _drop_staging(db, order)
+        db.commit()
+        raise
+    _drop_staging(db, order)
+    return reports
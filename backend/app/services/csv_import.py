@@ -0,0 +1,329 @@
+"""
+CSV Import Engine for PlantDex
+Stream a CSV in chunks into one table: one reference lookup and one
+INSERT ... ON CONFLICT executemany per chunk, with per-row error reports
+"""
+import csv
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.events import record_change
+
+CHUNK_SIZE = 1000
+MAX_ERROR_REPORTS = 200
+ON_CONFLICT_MODES = ("skip", "update")
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+Row = Dict[str, Optional[str]]
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported"""
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def add_error(self, line: int, key: Any, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_ERROR_REPORTS:
+            self.errors.append({"line": line, "key": key, "error": error})
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+# ---- cell parsers ---------------------------------------------------------
+
+def text_value(row: Row, name: str) -> Optional[str]:
+    return (row.get(name) or "").strip() or None
+
+
+def required_text(row: Row, name: str) -> str:
+    value = text_value(row, name)
+    if value is None:
+        raise RowError(f"{name} is required")
+    return value
+
+
+def boolean_value(row: Row, name: str) -> bool:
+    return (row.get(name) or "").strip().lower() in ("true", "1", "yes", "y")
+
+
+def float_value(row: Row, name: str) -> Optional[float]:
+    value = text_value(row, name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise RowError(f"{name} is not a number: {value!r}")
+
+
+def required_float(row: Row, name: str) -> float:
+    value = float_value(row, name)
+    if value is None:
+        raise RowError(f"{name} is required")
+    return value
+
+
+def int_value(row: Row, name: str) -> Optional[int]:
+    value = float_value(row, name)
+    if value is None:
+        return None
+    if not value.is_integer():
+        raise RowError(f"{name} is not an integer: {row.get(name)!r}")
+    return int(value)
+
+
+def required_int(row: Row, name: str) -> int:
+    value = int_value(row, name)
+    if value is None:
+        raise RowError(f"{name} is required")
+    return value
+
+
+# ---- table specs ----------------------------------------------------------
+
+@dataclass(frozen=True)
+class CsvTable:
+    """How one CSV layout maps onto one table"""
+    name: str
+    model: type
+    parse: Callable[[Row], Dict[str, Any]]
+    required_columns: Tuple[str, ...]
+    key_column: str = "id"  # ใช้ในรายงาน error และเป็น conflict target เมื่อ upsert=True
+    upsert: bool = False  # False = append ทุกแถว (ตารางลูกที่ไม่มี natural key)
+    # ตารางลูก: CSV คือชุดแถวทั้งหมดของ parent นี้ - update แทนที่แถวเดิม, skip ข้าม parent ที่มีแถวอยู่แล้ว
+    replace_by: Optional[str] = None
+    references: Tuple[Tuple[str, type], ...] = ()  # (column, parent model) - ตรวจว่ามีแถวแม่ก่อน insert
+    prepare: Optional[Callable[[Session, List[Dict[str, Any]]], None]] = None  # เขียนแถวที่ต้องมีก่อน (เช่น users)
+    companions: Tuple[type, ...] = ()  # model ที่ prepare เขียนด้วย (reset sequence / แจ้ง listener)
+
+    def missing_columns(self, fieldnames: Optional[Iterable[str]]) -> List[str]:
+        present = {name.strip() for name in (fieldnames or [])}
+        return [name for name in self.required_columns if name not in present]
+
+
+def iter_chunks(reader: csv.DictReader, chunk_size: int) -> Iterator[List[Tuple[int, Row]]]:
+    """(line number, row) in lists of `chunk_size` - reads the stream incrementally"""
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def dialect_insert(db: Session, table):
+    """INSERT with on_conflict_do_* support for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _INSERTS:
+        raise RuntimeError(f"Bulk CSV import is not supported on {dialect}")
+    return _INSERTS[dialect](table)
+
+
+def insert_statement(db: Session, spec: CsvTable, columns: Sequence[str], on_conflict: str):
+    """One cached INSERT for executemany; RETURNING counts the rows actually written"""
+    table = spec.model.__table__
+    statement = dialect_insert(db, table)
+    if spec.upsert:
+        if on_conflict == "update":
+            # ไม่เปลี่ยน id ของแถวที่มีอยู่แล้ว
+            assignments = {name: statement.excluded[name] for name in columns if name not in (spec.key_column, "id")}
+            if "updated_at" in table.c:
+                assignments["updated_at"] = func.now()
+            statement = statement.on_conflict_do_update(index_elements=[table.c[spec.key_column]], set_=assignments)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[table.c[spec.key_column]])
+    return statement.returning(table.c.id)
+
+
+def _execute(db: Session, spec: CsvTable, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+    with db.begin_nested():
+        if spec.prepare:
+            spec.prepare(db, rows)
+        result = db.connection().execute(insert_statement(db, spec, list(rows[0]), on_conflict), rows)
+        return len(result.all())
+
+
+def _existing_ids(db: Session, column, values: Set[Any]) -> Set[Any]:
+    if not values:
+        return set()
+    return set(db.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _claim_parents(db: Session, spec: CsvTable, rows: List[Tuple[int, Dict[str, Any]]], on_conflict: str,
+                   claimed: Dict[Any, str], report: ImportReport) -> List[Tuple[int, Dict[str, Any]]]:
+    """replace_by tables: the first chunk that mentions a parent decides what happens to all of its rows"""
+    column = spec.model.__table__.c[spec.replace_by]
+    new = {values[spec.replace_by] for _, values in rows} - claimed.keys()
+    stored = _existing_ids(db, column, new)
+    if stored and on_conflict == "update":
+        # ผ่าน connection ตรงๆ - import แจ้ง listener แบบ bulk ตอนจบอยู่แล้ว
+        db.connection().execute(delete(spec.model.__table__).where(column.in_(stored)))
+    for parent_id in new:
+        if parent_id not in stored:
+            claimed[parent_id] = "new"
+        else:
+            claimed[parent_id] = "replaced" if on_conflict == "update" else "kept"
+    kept = [(line, values) for line, values in rows if claimed[values[spec.replace_by]] != "kept"]
+    report.skipped += len(rows) - len(kept)
+    return kept
+
+
+def _write_chunk(db: Session, spec: CsvTable, rows: List[Tuple[int, Dict[str, Any]]], on_conflict: str,
+                 report: ImportReport, claimed: Optional[Dict[Any, str]] = None):
+    for column, parent in spec.references:
+        wanted = {values[column] for _, values in rows if values.get(column) is not None}
+        found = _existing_ids(db, parent.id, wanted)
+        kept = []
+        for line, values in rows:
+            if values.get(column) is not None and values[column] not in found:
+                report.add_error(line, values.get(spec.key_column), f"{column} {values[column]} not found")
+            else:
+                kept.append((line, values))
+        rows = kept
+
+    existing: Set[Any] = set()
+    if spec.upsert:
+        key_column = spec.model.__table__.c[spec.key_column]
+        existing = _existing_ids(db, key_column, {values[spec.key_column] for _, values in rows})
+        if on_conflict == "skip":
+            report.skipped += len(existing)
+            rows = [(line, values) for line, values in rows if values[spec.key_column] not in existing]
+    elif spec.replace_by:
+        rows = _claim_parents(db, spec, rows, on_conflict, claimed, report)
+    if not rows:
+        return
+
+    failed = set()
+    try:
+        written = _execute(db, spec, [values for _, values in rows], on_conflict)
+    except DBAPIError:
+        # chunk ล้ม - เขียนทีละแถวใน savepoint เพื่อรายงานแถวที่ผิด
+        written = 0
+        for line, values in rows:
+            try:
+                written += _execute(db, spec, [values], on_conflict)
+            except DBAPIError as e:
+                report.add_error(line, values.get(spec.key_column), str(e.orig).strip().splitlines()[0])
+                failed.add(line)
+
+    succeeded = [values for line, values in rows if line not in failed]
+    if spec.replace_by:
+        # แถวที่เขียนแทนชุดเดิมของ parent นับเป็น updated
+        updated = sum(1 for values in succeeded if claimed[values[spec.replace_by]] == "replaced")
+        report.updated += updated
+        report.inserted += written - updated
+    elif spec.upsert and on_conflict == "update":
+        updated = sum(1 for values in succeeded if values[spec.key_column] in existing)
+        report.updated += updated
+        report.inserted += len(succeeded) - updated
+    else:
+        report.inserted += written
+        report.skipped += len(succeeded) - written  # มี request อื่น insert key เดียวกันไปก่อน
+
+
+def reset_id_sequence(db: Session, model: type):
+    """After inserts with explicit ids, move the PostgreSQL id sequence past MAX(id)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    table = model.__table__.name
+    db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+    ))
+
+
+def import_table(
+    db: Session,
+    spec: CsvTable,
+    stream: TextIO,
+    on_conflict: str = "skip",
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+    reader: Optional[csv.DictReader] = None,
+) -> ImportReport:
+    """Import one CSV stream into spec.model; caller commits.
+
+    For upsert tables on_conflict="skip" keeps existing rows and "update"
+    overwrites them (matched on spec.key_column). For replace_by tables the
+    CSV holds all rows of each parent it mentions: "skip" leaves parents
+    that already have rows untouched and "update" replaces their rows.
+    Rows that fail to parse, reference a missing parent or fail to insert
+    are reported and skipped; the rest of the file still imports.
+    """
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of: {', '.join(ON_CONFLICT_MODES)}")
+
+    started = time.perf_counter()
+    report = ImportReport()
+    reader = reader or csv.DictReader(stream)
+    missing = spec.missing_columns(reader.fieldnames)
+    if missing:
+        raise ValueError(f"CSV is missing required columns for {spec.name}: {', '.join(missing)}")
+
+    explicit_ids = False
+    claimed: Dict[Any, str] = {}  # replace_by tables: parent -> "new", "replaced" or "kept"
+    for chunk in iter_chunks(reader, chunk_size):
+        report.rows_read += len(chunk)
+        parsed: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+        for line, row in chunk:
+            try:
+                values = spec.parse(row)
+            except RowError as e:
+                report.add_error(line, text_value(row, spec.key_column), str(e))
+                continue
+            explicit_ids = explicit_ids or values.get("id") is not None
+            key = values[spec.key_column] if spec.upsert else line
+            if key in parsed:
+                # key ซ้ำใน chunk เดียวกัน - skip ใช้แถวแรก, update ใช้แถวหลังสุด
+                if on_conflict == "skip":
+                    report.skipped += 1
+                    continue
+                report.updated += 1
+            parsed[key] = (line, values)
+
+        if parsed:
+            _write_chunk(db, spec, list(parsed.values()), on_conflict, report, claimed)
+        report.elapsed_seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    if report.inserted or report.updated:
+        for model in (spec.model, *spec.companions):
+            if explicit_ids:
+                reset_id_sequence(db, model)
+            record_change(db, model, bulk=True)
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,258 @@
+"""
+CSV Types for PlantDex
+Sellers, plants and the six detailed plant CSVs mapped for the import engine
+(column mappings from the original import_to_railway.py)
+"""
+import csv
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.plant import Plant
+from app.models.plant_detailed import (
+    DifficultyLevel, PlantImage, PlantPestDisease, PlantPriceDetailed, PlantPropagation, PlantSeasonalInfo,
+    PlantShippingInfo, PropagationMethod, VariegationLevel,
+)
+from app.models.user import Seller, User
+from app.services.csv_import import (
+    CHUNK_SIZE, CsvTable, ImportReport, Row, boolean_value, float_value, import_table, insert_statement,
+    int_value, required_float, required_int, required_text, text_value,
+)
+from app.services.plant_import import PLANTS, plant_table_for, refresh_plant_indexes
+
+PROPAGATION_METHOD_MAPPING = {
+    **{method.value: method for method in PropagationMethod},
+    "cutting_node": PropagationMethod.CUTTING,
+    "cutting_leaf_node": PropagationMethod.CUTTING,
+}
+DIFFICULTY_MAPPING = {
+    **{level.value: level for level in DifficultyLevel},
+    "medium": DifficultyLevel.MODERATE,
+    "hard": DifficultyLevel.DIFFICULT,
+}
+VARIEGATION_MAPPING = {level.value: level for level in VariegationLevel}
+
+# ค่าใน plant_shipping_infos.csv ที่หมายถึง "ต้องควบคุม"
+TEMPERATURE_CONTROL_MARKER = "cool_pack_if>32C"
+HUMIDITY_CONTROL_MARKER = "moist_wrap"
+
+
+def _flag(row: Row, name: str, marker: str) -> bool:
+    return boolean_value(row, name) or text_value(row, name) == marker
+
+
+# ---- sellers (users ถูกสร้างคู่กัน id เดียวกัน) ----------------------------------
+
+def parse_seller_row(row: Row) -> Dict[str, Any]:
+    seller_id = required_int(row, "seller_id")
+    name = required_text(row, "seller_name")
+    seller_type = text_value(row, "seller_type")
+    province = text_value(row, "province")
+    return {
+        "id": seller_id,
+        "user_id": seller_id,
+        "business_name": name,
+        "business_type": seller_type,
+        "business_license": text_value(row, "business_license"),
+        "description": f"ผู้ขาย {name} ประเภท {seller_type}",
+        "address": province,
+        "city": province,
+        "province": province,
+        "rating": 4.0,
+        "total_reviews": 0,
+        "total_sales": 0,
+        "total_plants_listed": 0,
+        "is_verified": True,
+    }
+
+
+def seller_user_rows(sellers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The users row each seller belongs to (same id)"""
+    return [
+        {
+            "id": seller["user_id"],
+            "email": f"seller{seller['id']}@example.com",
+            "username": f"seller{seller['id']}",
+            "hashed_password": "dummy_hash",
+            "full_name": seller["business_name"],
+            "location": seller["province"],
+            "province": seller["province"],
+            "is_verified": True,
+            "is_active": True,
+        }
+        for seller in sellers
+    ]
+
+
+def _insert_seller_users(db: Session, sellers: List[Dict[str, Any]]):
+    users = seller_user_rows(sellers)
+    db.connection().execute(insert_statement(db, SELLER_USERS, list(users[0]), "skip"), users).all()
+
+
+SELLER_USERS = CsvTable(name="users", model=User, parse=dict, required_columns=(), upsert=True)
+
+SELLERS = CsvTable(
+    name="sellers",
+    model=Seller,
+    parse=parse_seller_row,
+    required_columns=("seller_id", "seller_name"),
+    upsert=True,
+    prepare=_insert_seller_users,
+    companions=(User,),
+)
+
+# companion model -> แถวที่สร้างจากแถวหลัก (สำหรับ loader ที่ไม่ผ่าน prepare)
+COMPANION_ROWS: Dict[str, Tuple[Tuple[type, Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]], ...]] = {
+    SELLERS.name: ((User, seller_user_rows),),
+}
+
+
+# ---- detailed plant data --------------------------------------------------
+
+def parse_image_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "image_type": required_text(row, "image_type"),
+        "image_url": required_text(row, "image_url"),
+        "image_alt": text_value(row, "image_alt"),
+        "image_order": int_value(row, "image_order") or 0,
+        "is_primary": boolean_value(row, "is_primary"),
+    }
+
+
+def parse_propagation_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "method": PROPAGATION_METHOD_MAPPING.get((text_value(row, "method") or "").lower(), PropagationMethod.CUTTING),
+        "difficulty": DIFFICULTY_MAPPING.get((text_value(row, "difficulty") or "").lower(), DifficultyLevel.MODERATE),
+        "success_rate": float_value(row, "success_rate"),
+        "time_to_root": int_value(row, "time_to_root"),
+        "best_season": text_value(row, "best_season"),
+        "instructions": text_value(row, "instructions"),
+        "tools_needed": text_value(row, "tools_needed"),
+    }
+
+
+def parse_pest_disease_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "pest_or_disease": required_text(row, "pest_or_disease"),
+        "type": required_text(row, "type"),
+        "symptoms": text_value(row, "symptoms"),
+        "prevention": text_value(row, "prevention"),
+        "treatment": text_value(row, "treatment"),
+        "severity": text_value(row, "severity"),
+        "season_risk": text_value(row, "season_risk"),
+    }
+
+
+def parse_seasonal_info_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "best_planting_season": text_value(row, "best_planting_season"),
+        "blooming_season": text_value(row, "blooming_season"),
+        "dormancy_period": text_value(row, "dormancy_period"),
+        "seasonal_care": text_value(row, "seasonal_care"),
+        "seasonal_watering": text_value(row, "seasonal_watering"),
+        "seasonal_fertilizing": text_value(row, "seasonal_fertilizing"),
+    }
+
+
+def parse_shipping_info_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "fragility_level": required_text(row, "fragility_level"),
+        "packaging_requirements": text_value(row, "packaging_requirements"),
+        "max_shipping_distance": int_value(row, "max_shipping_distance"),
+        "shipping_preparation": text_value(row, "shipping_preparation"),
+        "special_handling": text_value(row, "special_handling"),
+        "temperature_control": _flag(row, "temperature_control", TEMPERATURE_CONTROL_MARKER),
+        "humidity_control": _flag(row, "humidity_control", HUMIDITY_CONTROL_MARKER),
+    }
+
+
+def parse_price_detailed_row(row: Row) -> Dict[str, Any]:
+    return {
+        "plant_id": required_int(row, "plant_id"),
+        "seller_id": required_int(row, "seller_id"),
+        "base_price": required_float(row, "base_price"),
+        "currency": text_value(row, "currency") or "THB",
+        "price_type": text_value(row, "price_type"),
+        "height": float_value(row, "height"),
+        "width": float_value(row, "width"),
+        "pot_size": text_value(row, "pot_size"),
+        "leaf_count": int_value(row, "leaf_count"),
+        "maturity_level": text_value(row, "maturity_level"),
+        "quality_grade": text_value(row, "quality_grade"),
+        "variegation_level": VARIEGATION_MAPPING.get((text_value(row, "variegation_level") or "").lower()),
+        "health_score": float_value(row, "health_score"),
+        "seasonal_multiplier": float_value(row, "seasonal_multiplier"),
+        "peak_season": text_value(row, "peak_season"),
+        "off_season": text_value(row, "off_season"),
+        "province": text_value(row, "province"),
+        "city": text_value(row, "city"),
+        "local_market_factor": float_value(row, "local_market_factor"),
+        "platform": text_value(row, "platform"),
+        "seller_type": text_value(row, "seller_type"),
+        "verification_status": text_value(row, "verification_status"),
+        "rating": float_value(row, "rating"),
+        "review_count": int_value(row, "review_count"),
+    }
+
+
+PLANT_REFERENCE = (("plant_id", Plant),)
+SELLER_REFERENCE = (("seller_id", Seller),)
+
+
+def _detail_table(name: str, model: type, parse, required_columns, references=PLANT_REFERENCE) -> CsvTable:
+    # ไม่มี natural key - แถวของแต่ละ plant ถูกแทนที่ทั้งชุด (key_column ใช้ระบุแถวในรายงาน error)
+    return CsvTable(
+        name, model, parse, required_columns, key_column="plant_id", replace_by="plant_id", references=references
+    )
+
+
+DETAIL_TABLES = (
+    _detail_table("plant_images", PlantImage, parse_image_row, ("plant_id", "image_type", "image_url")),
+    _detail_table("plant_propagations", PlantPropagation, parse_propagation_row, ("plant_id", "method", "difficulty")),
+    _detail_table("plant_pest_diseases", PlantPestDisease, parse_pest_disease_row,
+                  ("plant_id", "pest_or_disease", "type")),
+    _detail_table("plant_seasonal_infos", PlantSeasonalInfo, parse_seasonal_info_row, ("plant_id",)),
+    _detail_table("plant_shipping_infos", PlantShippingInfo, parse_shipping_info_row, ("plant_id", "fragility_level")),
+    _detail_table("plant_prices_detailed", PlantPriceDetailed, parse_price_detailed_row,
+                  ("plant_id", "seller_id", "base_price"), PLANT_REFERENCE + SELLER_REFERENCE),
+)
+
+# ลำดับที่ import ได้โดยไม่ติด foreign key (แม่ก่อนลูก)
+CSV_TYPES: Dict[str, CsvTable] = {
+    SELLERS.name: SELLERS,
+    PLANTS.name: PLANTS,
+    **{spec.name: spec for spec in DETAIL_TABLES},
+}
+
+
+def table_for(csv_type: str, fieldnames: Optional[Iterable[str]]) -> CsvTable:
+    """Spec for a CSV of `csv_type` with this header"""
+    if csv_type not in CSV_TYPES:
+        raise ValueError(f"Unknown CSV type {csv_type!r} (available: {', '.join(CSV_TYPES)})")
+    if csv_type == PLANTS.name:
+        # plants รองรับทั้ง master layout และ plants.csv แบบเก่า (ดูจาก header)
+        return plant_table_for(fieldnames)
+    return CSV_TYPES[csv_type]
+
+
+def import_csv(
+    db: Session,
+    csv_type: str,
+    stream: TextIO,
+    on_conflict: str = "skip",
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Import one CSV of `csv_type` (a CSV_TYPES key); caller commits"""
+    reader = csv.DictReader(stream)
+    spec = table_for(csv_type, reader.fieldnames)
+    report = import_table(db, spec, stream, on_conflict, chunk_size, progress, reader)
+    if spec.model is Plant and (report.inserted or report.updated):
+        # เขียนแบบ bulk - search vector / score ของทั้ง catalogue ใน transaction เดียวกัน (CLI และ import job)
+        refresh_plant_indexes(db)
+    return report
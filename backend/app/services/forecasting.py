@@ -0,0 +1,192 @@
+"""
+Demand Forecasting for PlantDex
+Batch weekly demand forecasts for every plant from market_trends
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.market import DemandForecast, MarketTrend
+
+MAX_HORIZON = 12  # weeks; /market/demand-forecast allows up to 12
+HALF_LIFE_WEEKS = 8.0  # exponential recency weighting of the trend fit
+MIN_HISTORY = 3  # fewer weeks -> flat forecast without an interval
+RECENT_WEEKS = 4  # current_demand / current_supply window
+STABLE_SLOPE = 0.25  # demand points per week treated as "stable"
+Z_95 = 1.96
+DEFAULT_SUPPLY = 50.0
+INSERT_CHUNK = 5000
+
+_WEEKS_PER_YEAR = 54  # ISO weeks 1..53 (+ index 0 unused)
+
+
+def _load_history(db: Session):
+    statement = select(
+        MarketTrend.plant_id,
+        MarketTrend.week_start,
+        MarketTrend.demand_score,
+        MarketTrend.supply_score,
+        MarketTrend.seasonal_factor,
+    ).where(MarketTrend.demand_score.isnot(None)).order_by(MarketTrend.plant_id, MarketTrend.week_start)
+    return db.execute(statement).all()
+
+
+def _segment_mean(codes, values, mask, size, default):
+    counts = np.bincount(codes, weights=mask.astype(np.float64), minlength=size)
+    sums = np.bincount(codes, weights=np.where(mask, values, 0.0), minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), default)
+
+
+def fit_demand_forecasts(rows, horizon: int = MAX_HORIZON, today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Fit every plant at once and return DemandForecast rows.
+
+    Demand is divided by seasonal_factor, a recency-weighted linear trend
+    is fitted per plant on the adjusted series (closed-form weighted least
+    squares from per-plant sums), and projections are multiplied back by
+    the plant's seasonal profile for the target ISO week.
+
+    Horizons count from the week containing `today` (on each plant's
+    week_start grid), so a plant whose history stopped weeks ago is
+    projected across the gap instead of forecasting weeks already past.
+    """
+    if not rows:
+        return []
+
+    plant_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    ordinals = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    iso_weeks = np.fromiter((row[1].isocalendar()[1] for row in rows), dtype=np.int64, count=len(rows))
+    demand = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    supply = np.array([np.nan if row[3] is None else row[3] for row in rows], dtype=np.float64)
+    factor = np.array([np.nan if row[4] is None else row[4] for row in rows], dtype=np.float64)
+
+    plants, starts, codes = np.unique(plant_ids, return_index=True, return_inverse=True)
+    size = len(plants)
+    ends = np.r_[starts[1:], len(rows)] - 1  # rows are sorted by plant, week
+    history = np.bincount(codes, minlength=size)
+
+    # seasonal profile: mean factor per plant and ISO week, fallback plant mean then 1.0
+    known = ~np.isnan(factor) & (factor > 0)
+    plant_factor = _segment_mean(codes, factor, known, size, 1.0)
+    profile_key = codes * _WEEKS_PER_YEAR + iso_weeks
+    profile_n = np.bincount(profile_key, weights=known.astype(np.float64), minlength=size * _WEEKS_PER_YEAR)
+    profile_sum = np.bincount(profile_key, weights=np.where(known, factor, 0.0), minlength=size * _WEEKS_PER_YEAR)
+    row_factor = np.where(known, factor, plant_factor[codes])
+
+    # weighted least squares on the seasonally adjusted series, t = weeks before the last observation
+    t = (ordinals - ordinals[ends][codes]) / 7.0
+    y = demand / row_factor
+    weights = 0.5 ** (-t / HALF_LIFE_WEEKS)
+    weights *= (history / np.bincount(codes, weights=weights, minlength=size))[codes]  # sum(w) = n
+
+    sw = history.astype(np.float64)
+    st = np.bincount(codes, weights=weights * t, minlength=size)
+    stt = np.bincount(codes, weights=weights * t * t, minlength=size)
+    sy = np.bincount(codes, weights=weights * y, minlength=size)
+    sty = np.bincount(codes, weights=weights * t * y, minlength=size)
+    det = sw * stt - st * st
+
+    trended = (history >= MIN_HISTORY) & (det > 1e-9)
+    safe_det = np.where(trended, det, 1.0)
+    slope = np.where(trended, (sw * sty - st * sy) / safe_det, 0.0)
+    intercept = (sy - slope * st) / sw
+
+    residuals = y - (intercept[codes] + slope[codes] * t)
+    dof = np.maximum(history - 2, 1)
+    variance = np.bincount(codes, weights=weights * residuals ** 2, minlength=size) / dof
+
+    recent = (ends[codes] - np.arange(len(rows))) < RECENT_WEEKS
+    current_demand = _segment_mean(codes, demand, recent, size, 0.0)
+    current_supply = _segment_mean(codes, supply, recent & ~np.isnan(supply) & (supply > 0), size, DEFAULT_SUPPLY)
+
+    generated_at = datetime.now(timezone.utc)
+    today = today or generated_at.date()
+    last_weeks = [date.fromordinal(int(ordinal)) for ordinal in ordinals[ends]]
+    # สัปดาห์ที่ผ่านไปแล้วตั้งแต่ข้อมูลล่าสุดของแต่ละ plant (0 = ข้อมูลเป็นของสัปดาห์นี้)
+    gap = np.maximum((today.toordinal() - ordinals[ends]) // 7, 0)
+    records = []
+    for h in range(1, horizon + 1):
+        steps = gap + h  # t ของสัปดาห์เป้าหมายนับจากข้อมูลล่าสุด
+        weeks = [last + timedelta(weeks=int(step)) for last, step in zip(last_weeks, steps)]
+        target_iso = np.fromiter((week.isocalendar()[1] for week in weeks), dtype=np.int64, count=size)
+        key = np.arange(size) * _WEEKS_PER_YEAR + target_iso
+        with np.errstate(invalid="ignore", divide="ignore"):
+            target_factor = np.where(profile_n[key] > 0, profile_sum[key] / np.maximum(profile_n[key], 1), plant_factor)
+
+        projected = (intercept + slope * steps) * target_factor
+        leverage = (stt - 2 * steps * st + steps * steps * sw) / safe_det
+        spread = Z_95 * np.sqrt(variance * (1 + leverage)) * target_factor
+
+        for i in range(size):
+            records.append({
+                "plant_id": int(plants[i]),
+                "horizon": h,
+                "forecast_week": weeks[i],
+                "projected_demand": float(np.clip(projected[i], 0, 100)),
+                "lower_bound": float(np.clip(projected[i] - spread[i], 0, 100)) if trended[i] else None,
+                "upper_bound": float(np.clip(projected[i] + spread[i], 0, 100)) if trended[i] else None,
+                "seasonal_factor": float(target_factor[i]),
+                "current_demand": float(current_demand[i]),
+                "current_supply": float(current_supply[i]),
+                "trend_slope": float(slope[i]),
+                "model": "weighted_trend" if trended[i] else "mean",
+                "history_weeks": int(history[i]),
+                "generated_at": generated_at,
+            })
+    return records
+
+
+def generate_demand_forecasts(db: Session, today: Optional[date] = None) -> int:
+    """Replace demand_forecasts with a fresh fit over all plants; caller commits"""
+    records = fit_demand_forecasts(_load_history(db), today=today)
+    db.execute(delete(DemandForecast))
+    for i in range(0, len(records), INSERT_CHUNK):
+        db.execute(insert(DemandForecast), records[i:i + INSERT_CHUNK])
+    return len(records)
+
+
+def trend_direction(slope: float) -> str:
+    if slope > STABLE_SLOPE:
+        return "increasing"
+    if slope < -STABLE_SLOPE:
+        return "decreasing"
+    return "stable"
+
+
+def load_demand_forecast(db: Session, plant_id: int, weeks_ahead: int) -> Optional[Dict[str, Any]]:
+    """Stored forecast for one plant (one indexed range read), or None"""
+    forecasts = db.query(DemandForecast).filter(
+        DemandForecast.plant_id == plant_id,
+        DemandForecast.horizon <= weeks_ahead,
+    ).order_by(DemandForecast.horizon).all()
+    if not forecasts:
+        return None
+
+    first = forecasts[0]
+    supply = first.current_supply
+    return {
+        "plant_id": plant_id,
+        "forecast_periods": len(forecasts),
+        "current_demand": first.current_demand,
+        "current_supply": supply,
+        "trend_direction": trend_direction(first.trend_slope),
+        "trend_slope": round(first.trend_slope, 3),
+        "model": first.model,
+        "history_weeks": first.history_weeks,
+        "generated_at": first.generated_at,
+        "forecast": [
+            {
+                "week": forecast.forecast_week,
+                "projected_demand": round(forecast.projected_demand, 1),
+                "lower_bound": round(forecast.lower_bound, 1) if forecast.lower_bound is not None else None,
+                "upper_bound": round(forecast.upper_bound, 1) if forecast.upper_bound is not None else None,
+                "seasonal_factor": round(forecast.seasonal_factor, 3),
+                "supply_score": supply,
+                "demand_supply_ratio": round(forecast.projected_demand / supply, 2) if supply else 0,
+            }
+            for forecast in forecasts
+        ],
+    }
@@ -0,0 +1,173 @@
+"""
+Import Jobs for PlantDex
+Run CSV imports on a background worker pool and expose their progress
+"""
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.csv_import import CHUNK_SIZE, ImportReport
+from app.services.csv_types import import_csv
+
+MAX_FINISHED_JOBS = 100  # เก็บงานที่จบแล้วไว้ให้ poll ได้สูงสุดเท่านี้
+PROGRESS_ERRORS = 20  # error ที่แสดงระหว่างรัน (ครบทั้งหมดตอนจบ)
+
+
+@dataclass
+class ImportJob:
+    id: str
+    csv_type: str
+    filename: str
+    on_conflict: str
+    chunk_size: int
+    total_bytes: int
+    status: str = "queued"  # queued, running, success, failed
+    bytes_read: int = 0
+    report: ImportReport = field(default_factory=ImportReport)
+    error: Optional[str] = None
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    _started: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("success", "failed")
+
+    def eta_seconds(self) -> Optional[float]:
+        # ประมาณจากจำนวน byte ที่อ่านไปแล้ว (แถวแต่ละไฟล์ยาวไม่เท่ากัน แต่ใกล้เคียงพอ)
+        if self.status != "running" or not self.bytes_read or not self._started:
+            return None
+        elapsed = time.perf_counter() - self._started
+        return elapsed * max(self.total_bytes - self.bytes_read, 0) / self.bytes_read
+
+    def as_dict(self) -> Dict[str, Any]:
+        report = self.report.as_dict()
+        if not self.finished:
+            report["errors"] = report["errors"][:PROGRESS_ERRORS]
+        eta = self.eta_seconds()
+        return {
+            "id": self.id,
+            "csv_type": self.csv_type,
+            "filename": self.filename,
+            "on_conflict": self.on_conflict,
+            "status": self.status,
+            "progress": {
+                "rows_parsed": report["rows_read"],
+                "inserted": report["inserted"],
+                "updated": report["updated"],
+                "skipped": report["skipped"],
+                "failed": report["failed"],
+                "rows_per_second": report["rows_per_second"],
+                "bytes_read": self.bytes_read,
+                "total_bytes": self.total_bytes,
+                "percent": round(100.0 * self.bytes_read / self.total_bytes, 1) if self.total_bytes else None,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+            },
+            "errors": report["errors"],
+            "errors_truncated": report["errors_truncated"] or len(report["errors"]) < self.report.failed,
+            "error": self.error,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": report["elapsed_seconds"],
+        }
+
+
+class ImportJobManager:
+    """Thread pool running import jobs; job state is kept in this process"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(
+        self, csv_type: str, path: str, filename: str, on_conflict: str = "skip", chunk_size: int = CHUNK_SIZE
+    ) -> ImportJob:
+        """Queue an import of the CSV at `path`; the file is deleted when the job ends"""
+        job = ImportJob(
+            id=uuid.uuid4().hex,
+            csv_type=csv_type,
+            filename=filename,
+            on_conflict=on_conflict,
+            chunk_size=chunk_size,
+            total_bytes=os.path.getsize(path),
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="import-job")
+            executor = self._executor
+        executor.submit(self._run, job, path)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job else None
+
+    def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [job for job in reversed(self._jobs.values()) if status is None or job.status == status]
+            return [job.as_dict() for job in jobs]
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ImportJob, path: str):
+        db = SessionLocal()
+        with self._lock:
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job._started = time.perf_counter()
+        try:
+            with open(path, "rb") as raw:
+                stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+                def progress(report: ImportReport):
+                    with self._lock:
+                        job.report = report
+                        job.bytes_read = raw.tell()
+
+                report = import_csv(db, job.csv_type, stream, job.on_conflict, job.chunk_size, progress)
+                db.commit()
+            with self._lock:
+                job.report = report
+                job.bytes_read = job.total_bytes
+                job.status = "success"
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+        finally:
+            db.close()
+            with self._lock:
+                job.finished_at = datetime.utcnow()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+import_jobs = ImportJobManager(settings.IMPORT_JOB_WORKERS)
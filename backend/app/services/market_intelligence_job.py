@@ -0,0 +1,385 @@
+"""
+Market Intelligence Batch for PlantDex
+Recompute the PlantDx index, investment scores and opportunities from Shopee prices
+
+plant_id in the market-intelligence tables is shopee_products.id (the API
+joins on it). Everything is computed in NumPy over a product x day matrix of
+daily closing prices and written by the caller in one transaction.
+"""
+import warnings
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+JOB_NAME = "market_intelligence"
+LOOKBACK_DAYS = 90
+BASE_INDEX = 1000.0
+TREND_THRESHOLD_PCT = 2.0  # 30-day change beyond +/- this -> UP / DOWN
+MIN_RETURNS_FOR_VOLATILITY = 5
+OPPORTUNITIES_PER_TYPE = 50
+PCT_LIMIT = 999.99  # DECIMAL(5,2)
+
+PRODUCTS_SQL = """
+SELECT id, item_id, price, sold_count, rating, category, like_count, view_count
+FROM shopee_products
+WHERE price > 0
+ORDER BY item_id
+"""
+
+# ราคาปิดรายวัน: เดือนเก่าจาก price_history_daily, เดือนล่าสุดจาก partition ดิบ
+# คืน offset เป็นจำนวนวันและราคาเป็น float8 เพื่อไม่ต้องแปลง date/Decimal ทีละแถวใน Python
+DAILY_CLOSES_SQL = """
+SELECT item_id, day - %(start)s::date, close_price::float8
+FROM price_history_daily
+WHERE day >= %(start)s
+UNION ALL
+SELECT item_id, recorded_at::date - %(start)s::date, ((array_agg(price ORDER BY recorded_at DESC, id DESC))[1])::float8
+FROM price_history
+WHERE recorded_at >= %(start)s
+GROUP BY item_id, recorded_at::date
+"""
+
+DAILY_VOLUME_SQL = """
+SELECT (SELECT COUNT(*) FROM price_history WHERE recorded_at >= %(day)s AND recorded_at < %(next_day)s)
+     + (SELECT COUNT(*) FROM plant_prices WHERE data_collected_at >= %(day)s AND data_collected_at < %(next_day)s)
+"""
+
+PREVIOUS_DAY_SQL = """
+SELECT date, plantdx_index, total_market_value
+FROM market_intelligence_daily
+WHERE date < %s
+ORDER BY date DESC
+LIMIT 1
+"""
+
+UPSERT_DAILY_SQL = """
+INSERT INTO market_intelligence_daily (
+    date, plantdx_index, total_market_value, daily_volume, sentiment_score,
+    top_mover_plant_id, top_mover_change_pct, market_cap_change_pct, volatility_index
+) VALUES (%(date)s, %(plantdx_index)s, %(total_market_value)s, %(daily_volume)s, %(sentiment_score)s,
+          %(top_mover_plant_id)s, %(top_mover_change_pct)s, %(market_cap_change_pct)s, %(volatility_index)s)
+ON CONFLICT (date) DO UPDATE SET
+    plantdx_index = EXCLUDED.plantdx_index,
+    total_market_value = EXCLUDED.total_market_value,
+    daily_volume = EXCLUDED.daily_volume,
+    sentiment_score = EXCLUDED.sentiment_score,
+    top_mover_plant_id = EXCLUDED.top_mover_plant_id,
+    top_mover_change_pct = EXCLUDED.top_mover_change_pct,
+    market_cap_change_pct = EXCLUDED.market_cap_change_pct,
+    volatility_index = EXCLUDED.volatility_index,
+    updated_at = NOW()
+"""
+
+UPSERT_SCORES_SQL = """
+INSERT INTO plant_investment_scores (
+    plant_id, investment_score, roi_potential_12m, risk_level, liquidity_score,
+    trend_direction, market_cap, price_volatility, demand_score, supply_score, last_updated
+) VALUES %s
+ON CONFLICT (plant_id) DO UPDATE SET
+    investment_score = EXCLUDED.investment_score,
+    roi_potential_12m = EXCLUDED.roi_potential_12m,
+    risk_level = EXCLUDED.risk_level,
+    liquidity_score = EXCLUDED.liquidity_score,
+    trend_direction = EXCLUDED.trend_direction,
+    market_cap = EXCLUDED.market_cap,
+    price_volatility = EXCLUDED.price_volatility,
+    demand_score = EXCLUDED.demand_score,
+    supply_score = EXCLUDED.supply_score,
+    last_updated = EXCLUDED.last_updated
+"""
+SCORES_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+
+INSERT_OPPORTUNITIES_SQL = """
+INSERT INTO market_opportunities (
+    plant_id, opportunity_type, confidence_score, potential_upside_pct, time_horizon_days,
+    risk_assessment, market_conditions, detected_at, expires_at, is_active
+) VALUES %s
+"""
+OPPORTUNITIES_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW() + make_interval(days => %s), TRUE)"
+
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Percentile rank in [0, 1]; NaN ranks lowest"""
+    if len(values) < 2:
+        return np.ones(len(values))
+    order = np.argsort(np.where(np.isnan(values), -np.inf, values), kind="stable")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks / (len(values) - 1)
+
+
+def _clip_pct(value: float) -> float:
+    return round(float(np.clip(value, -PCT_LIMIT, PCT_LIMIT)), 2)
+
+
+def _optional(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def load_price_matrix(cursor, today: date, lookback_days: int = LOOKBACK_DAYS) -> Tuple[Dict[str, np.ndarray], np.ndarray, int]:
+    """Products (column arrays) and a products x days matrix of forward-filled closes"""
+    cursor.execute(PRODUCTS_SQL)
+    products = cursor.fetchall()
+    columns = {
+        "id": np.array([row[0] for row in products], dtype=np.int64),
+        "item_id": np.array([row[1] for row in products], dtype=np.int64),
+        "price": _floats(row[2] for row in products),
+        "sold": np.nan_to_num(_floats(row[3] for row in products)),
+        "rating": _floats(row[4] for row in products),
+        "category": np.array([row[5] or "" for row in products], dtype=object),
+        "likes": np.nan_to_num(_floats(row[6] for row in products)),
+        "views": np.nan_to_num(_floats(row[7] for row in products)),
+    }
+
+    days = lookback_days + 1
+    start = today - timedelta(days=lookback_days)
+    closes = np.full((len(products), days), np.nan)
+    cursor.execute(DAILY_CLOSES_SQL, {"start": start})
+    history = cursor.fetchall()
+    observations = len(history)
+    if history and len(products):
+        item_ids, offsets, prices = (np.array(values) for values in zip(*history))
+        item_ids, offsets, prices = item_ids.astype(np.int64), offsets.astype(np.int64), prices.astype(np.float64)
+        rows = np.searchsorted(columns["item_id"], item_ids)  # products are ordered by item_id
+        rows = np.minimum(rows, len(products) - 1)
+        keep = (columns["item_id"][rows] == item_ids) & (offsets >= 0) & (offsets < days)
+        closes[rows[keep], offsets[keep]] = prices[keep]
+
+    # ราคาปัจจุบันใน shopee_products คือราคาปิดของวันนี้ถ้ายังไม่มีใน history
+    # (รันย้อนหลังใช้ราคาปิดล่าสุดก่อนวันนั้นจาก forward fill แทน)
+    if today == date.today():
+        closes[:, -1] = np.where(np.isnan(closes[:, -1]), columns["price"], closes[:, -1])
+
+    # forward fill ตามแกนวัน
+    if len(products):
+        positions = np.where(~np.isnan(closes), np.arange(days), 0)
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        closes = closes[np.arange(len(products))[:, None], positions]
+    return columns, closes, observations
+
+
+def _change_pct(closes: np.ndarray, days_back: int) -> np.ndarray:
+    days_back = min(days_back, closes.shape[1] - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (closes[:, -1] / closes[:, -1 - days_back] - 1) * 100
+
+
+def _annualised_trend_pct(closes: np.ndarray) -> np.ndarray:
+    """Log-linear least squares slope per product, as an expected 12-month change"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logs = np.log(closes)
+    valid = ~np.isnan(logs)
+    t = np.where(valid, np.arange(closes.shape[1]), 0.0)
+    n = valid.sum(axis=1)
+    y = np.where(valid, logs, 0.0)
+    st, sy = t.sum(axis=1), y.sum(axis=1)
+    stt, sty = (t * t).sum(axis=1), (t * y).sum(axis=1)
+    det = n * stt - st * st
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        slope = np.where((n >= 2) & (det > 0), (n * sty - st * sy) / det, np.nan)
+        return np.expm1(slope * 365) * 100
+
+
+def _category_medians(categories: np.ndarray, prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Median price and product count of each product's category"""
+    labels, codes = np.unique(categories.astype(str), return_inverse=True)
+    order = np.lexsort((prices, codes))
+    sorted_codes, sorted_prices = codes[order], prices[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(labels) + 1))
+    lower = sorted_prices[(bounds[:-1] + bounds[1:] - 1) // 2]
+    upper = sorted_prices[(bounds[:-1] + bounds[1:]) // 2]
+    counts = np.diff(bounds)
+    return ((lower + upper) / 2)[codes], counts[codes]
+
+
+def compute_market_intelligence(columns: Dict[str, np.ndarray], closes: np.ndarray,
+                                return_days: int = 1) -> Dict[str, Any]:
+    """Per-product metrics and market aggregates (pure NumPy, no database access).
+
+    market_return is the cap-weighted change over the last `return_days`
+    days, i.e. since the previous index value.
+    """
+    size = len(columns["id"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.log(closes[:, 1:] / closes[:, :-1])
+    return_counts = (~np.isnan(returns)).sum(axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # สินค้าที่มีราคาเดียว -> ddof warning
+        daily_vol = np.nanstd(returns, axis=1, ddof=1)
+    daily_vol = np.where(return_counts >= MIN_RETURNS_FOR_VOLATILITY, daily_vol, np.nan)
+    volatility = daily_vol * np.sqrt(30) * 100  # ความผันผวนราย 30 วัน (%)
+
+    change_1d = _change_pct(closes, 1)
+    change_7d = _change_pct(closes, 7)
+    change_30d = _change_pct(closes, 30)
+    roi_12m = _annualised_trend_pct(closes)
+
+    price = closes[:, -1]
+    market_cap = np.nan_to_num(price * columns["sold"])
+    category_median, category_size = _category_medians(columns["category"], price)
+
+    sold_rank = _rank(columns["sold"])
+    demand_rank = _rank(columns["likes"] + columns["views"] / 10 + columns["sold"])
+    supply_rank = _rank(category_size.astype(np.float64))
+    momentum_rank = _rank(change_30d)
+    stability_rank = 1 - _rank(np.where(np.isnan(volatility), np.nanmedian(volatility) if np.any(~np.isnan(volatility)) else 0, volatility))
+
+    investment = 10 * (0.3 * demand_rank + 0.25 * sold_rank + 0.25 * momentum_rank + 0.2 * stability_rank)
+    trend = np.where(change_30d > TREND_THRESHOLD_PCT, "UP", np.where(change_30d < -TREND_THRESHOLD_PCT, "DOWN", "STABLE"))
+    risk = np.where(np.isnan(volatility), "MEDIUM", np.where(volatility < 10, "LOW", np.where(volatility < 25, "MEDIUM", "HIGH")))
+
+    scores = [
+        (
+            int(columns["id"][i]),
+            round(float(investment[i]), 1),
+            None if np.isnan(roi_12m[i]) else _clip_pct(roi_12m[i]),
+            str(risk[i]),
+            round(float(10 * sold_rank[i]), 1),
+            str(trend[i]),
+            int(market_cap[i]),
+            None if np.isnan(volatility[i]) else _clip_pct(volatility[i]),
+            round(float(10 * demand_rank[i]), 1),
+            round(float(10 * supply_rank[i]), 1),
+        )
+        for i in range(size)
+    ]
+
+    # ---- market aggregates ----
+    valid_1d = ~np.isnan(change_1d)
+    change_since = change_1d if return_days == 1 else _change_pct(closes, return_days)
+    valid_since = ~np.isnan(change_since)
+    weights = np.where(valid_since, market_cap, 0.0)
+    if weights.sum() > 0:
+        market_return = float(np.dot(weights, np.nan_to_num(change_since)) / weights.sum() / 100)
+    elif valid_since.any():
+        market_return = float(np.nanmean(change_since) / 100)
+    else:
+        market_return = 0.0
+
+    top_mover = None
+    if valid_1d.any():
+        i = int(np.nanargmax(np.abs(np.where(valid_1d, change_1d, np.nan))))
+        if change_1d[i] != 0:
+            top_mover = (int(columns["id"][i]), _clip_pct(change_1d[i]))
+
+    up, down = int((trend == "UP").sum()), int((trend == "DOWN").sum())
+    vol_weights = np.where(np.isnan(volatility), 0.0, market_cap)
+    volatility_index = (
+        float(np.dot(vol_weights, np.nan_to_num(volatility)) / vol_weights.sum()) if vol_weights.sum() > 0 else np.nan
+    )
+
+    return {
+        "scores": scores,
+        "opportunities": detect_opportunities(
+            columns, price, category_median, category_size, sold_rank, demand_rank,
+            change_7d, change_30d, daily_vol, risk,
+        ),
+        "market_return": market_return,
+        "total_market_value": int(market_cap.sum()),
+        "sentiment_score": round((up - down) / size, 2) if size else 0.0,
+        "top_mover": top_mover,
+        "volatility_index": volatility_index,
+    }
+
+
+def detect_opportunities(columns, price, category_median, category_size, sold_rank, demand_rank,
+                         change_7d, change_30d, daily_vol, risk) -> List[tuple]:
+    opportunities: List[tuple] = []
+
+    # UNDERVALUED: ถูกกว่า median ของหมวดมาก แต่รีวิวดีและขายได้
+    rating = np.nan_to_num(columns["rating"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discount = 1 - price / category_median
+    undervalued = (discount >= 0.25) & (category_size >= 5) & (rating >= 4.5) & (sold_rank >= 0.5)
+    confidence = np.clip(0.5 + 0.25 * sold_rank + 0.5 * (rating - 4.5), 0, 0.99)
+    for i in _top(undervalued, confidence):
+        upside = (category_median[i] / price[i] - 1) * 100
+        opportunities.append((
+            int(columns["id"][i]), "UNDERVALUED", round(float(confidence[i]), 2), _clip_pct(upside), 90,
+            f"{risk[i].capitalize()} risk, rated {rating[i]:.1f}",
+            f"Priced {discount[i] * 100:.0f}% below the {columns['category'][i] or 'uncategorised'} median "
+            f"of {category_median[i]:,.0f} THB", 90,
+        ))
+
+    # BREAKOUT: ราคาขึ้นใน 7 วันเกิน 2 เท่าของความผันผวนปกติ และมีความต้องการสูง
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected_move = np.where(np.isnan(daily_vol), np.nan, daily_vol * np.sqrt(7) * 100)
+        strength = change_7d / np.maximum(expected_move, 1.0)
+    breakout = (change_7d >= 5) & (strength >= 2) & (demand_rank >= 0.5)
+    confidence = np.clip(0.4 + 0.1 * np.nan_to_num(strength), 0, 0.95)
+    for i in _top(breakout, confidence):
+        opportunities.append((
+            int(columns["id"][i]), "BREAKOUT", round(float(confidence[i]), 2), _clip_pct(change_7d[i]), 30,
+            f"{risk[i].capitalize()} risk, momentum {strength[i]:.1f}x normal volatility",
+            f"Up {change_7d[i]:.1f}% in 7 days ({np.nan_to_num(change_30d[i]):.1f}% in 30 days)", 30,
+        ))
+    return opportunities
+
+
+def _top(mask: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+    candidates = np.flatnonzero(mask)
+    order = np.argsort(-confidence[candidates], kind="stable")
+    return candidates[order[:OPPORTUNITIES_PER_TYPE]]
+
+
+def run_market_intelligence(cursor, today: Optional[date] = None, lookback_days: int = LOOKBACK_DAYS) -> Dict[str, int]:
+    """Compute and write one day of market intelligence; caller commits or rolls back"""
+    today = today or date.today()
+    cursor.execute(PREVIOUS_DAY_SQL, (today,))
+    previous = cursor.fetchone()
+    # วันก่อนหน้าอาจไม่ได้รัน - ผลตอบแทนต้องนับจากวันที่ของค่า index ล่าสุด
+    return_days = (today - previous[0]).days if previous else 1
+
+    columns, closes, observations = load_price_matrix(cursor, today, lookback_days)
+    result = compute_market_intelligence(columns, closes, return_days)
+
+    if previous:
+        index = float(previous[1]) * (1 + result["market_return"])  # chain-linked
+        cap_change = (
+            (result["total_market_value"] - previous[2]) / previous[2] * 100 if previous[2] else None
+        )
+    else:
+        index = BASE_INDEX
+        cap_change = None
+
+    cursor.execute(DAILY_VOLUME_SQL, {"day": today, "next_day": today + timedelta(days=1)})
+    daily_volume = cursor.fetchone()[0]
+
+    top_mover = result["top_mover"]
+    cursor.execute(UPSERT_DAILY_SQL, {
+        "date": today,
+        "plantdx_index": round(index, 2),
+        "total_market_value": result["total_market_value"],
+        "daily_volume": daily_volume,
+        "sentiment_score": result["sentiment_score"],
+        "top_mover_plant_id": top_mover[0] if top_mover else None,
+        "top_mover_change_pct": top_mover[1] if top_mover else None,
+        "market_cap_change_pct": None if cap_change is None else _clip_pct(cap_change),
+        "volatility_index": _optional(min(result["volatility_index"], PCT_LIMIT)),
+    })
+
+    # คะแนนใหม่ทั้งชุด - สินค้าที่หายไปจาก shopee_products ถูกลบ
+    if result["scores"]:
+        execute_values(cursor, UPSERT_SCORES_SQL, result["scores"], template=SCORES_TEMPLATE, page_size=1000)
+    cursor.execute("DELETE FROM plant_investment_scores WHERE last_updated < NOW()")
+    removed_scores = cursor.rowcount
+
+    cursor.execute("UPDATE market_opportunities SET is_active = FALSE WHERE is_active = TRUE")
+    if result["opportunities"]:
+        execute_values(cursor, INSERT_OPPORTUNITIES_SQL, result["opportunities"],
+                       template=OPPORTUNITIES_TEMPLATE, page_size=1000)
+
+    return {
+        "products": len(columns["id"]),
+        "price_observations": observations,
+        "scores_written": len(result["scores"]),
+        "scores_removed": removed_scores,
+        "opportunities": len(result["opportunities"]),
+        "plantdx_index": round(index, 2),
+    }
@@ -0,0 +1,146 @@
+"""
+Plant Detail Documents for PlantDex
+A plant plus its detailed data (images, propagation, pests, seasons, shipping, detailed prices)
+loaded with one SELECT per section and cached per plant in response_cache
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, raiseload, selectinload
+
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.events import ChangeSet, on_change
+from app.models.plant import Plant, PlantScore
+from app.models.plant_detailed import (
+    PlantImage, PlantPestDisease, PlantPriceDetailed, PlantPropagation, PlantSeasonalInfo, PlantShippingInfo
+)
+from app.services.plant_scores import with_scores
+
+# section -> (relationship, model, sort key ของ row ใน section)
+SECTIONS = {
+    "images": (Plant.images, PlantImage, lambda row: (not row.is_primary, row.image_order or 0, row.id)),
+    "propagations": (Plant.propagations, PlantPropagation, lambda row: row.id),
+    "pest_diseases": (Plant.pest_diseases, PlantPestDisease, lambda row: row.id),
+    "seasonal_infos": (Plant.seasonal_infos, PlantSeasonalInfo, lambda row: row.id),
+    "shipping_infos": (Plant.shipping_infos, PlantShippingInfo, lambda row: row.id),
+    "prices_detailed": (Plant.prices_detailed, PlantPriceDetailed, lambda row: (row.base_price, row.id)),
+}
+PLANT_SECTION = "plant"
+ALL_SECTIONS = (PLANT_SECTION, *SECTIONS)
+
+# query สูงสุดต่อ request: plants 1 ครั้ง + selectin 1 ครั้งต่อ section
+MAX_QUERIES = 1 + len(SECTIONS)
+MAX_BATCH_IDS = 100
+PLANT_DETAIL_CACHE_TTL = 300  # writer จาก process อื่นเห็นผลภายในเวลานี้ (เมื่อไม่มี Redis)
+PLANT_DETAIL_CACHE_TAG = "plant-detail"
+
+
+def parse_sections(fields: Optional[str]) -> Tuple[str, ...]:
+    """Comma-separated section names -> tuple in canonical order (all sections when empty)"""
+    if not fields or not fields.strip():
+        return ALL_SECTIONS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(ALL_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} (available: {', '.join(ALL_SECTIONS)})")
+    return tuple(name for name in ALL_SECTIONS if name in requested)
+
+
+def _columns(obj) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _load_sections(db: Session, plant_ids: Sequence[int], sections: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+    """Plant columns plus `sections` for each existing id - one query for plants, one per section"""
+    options = [selectinload(SECTIONS[name][0]) for name in sections if name in SECTIONS]
+    query = db.query(Plant).options(*options, raiseload("*")).filter(Plant.id.in_(plant_ids))
+    plants = with_scores(query).all()
+
+    documents = {}
+    for plant in plants:
+        document = {PLANT_SECTION: _columns(plant)}
+        for name in sections:
+            if name in SECTIONS:
+                relationship, _, sort_key = SECTIONS[name]
+                rows = sorted(getattr(plant, relationship.key), key=sort_key)
+                document[name] = [_columns(row) for row in rows]
+        documents[plant.id] = document
+    return documents
+
+
+def _cache_key(plant_id: int) -> str:
+    return f"{settings.CACHE_KEY_PREFIX}:cache:plant-detail:{plant_id}"
+
+
+def fetch_plant_details(
+    db: Session, plant_ids: Iterable[int], sections: Sequence[str] = ALL_SECTIONS
+) -> Dict[int, Dict[str, Any]]:
+    """Documents for the plants that exist, restricted to `sections`"""
+    plant_ids = list(dict.fromkeys(plant_ids))
+    if not settings.CACHE_ENABLED:
+        documents = _load_sections(db, plant_ids, sections)
+    else:
+        keys = {plant_id: _cache_key(plant_id) for plant_id in plant_ids}
+        cached = response_cache.get_many(keys.values())
+        documents = {plant_id: cached[key] for plant_id, key in keys.items() if key in cached}
+        missing = {
+            plant_id: [name for name in sections if name not in documents.get(plant_id, {})]
+            for plant_id in plant_ids
+        }
+        missing = {plant_id: absent for plant_id, absent in missing.items() if absent}
+        if missing:
+            # โหลดเฉพาะ section ที่ยังไม่มี - รวมเป็นชุดเดียวเพื่อให้จำนวน query คงที่
+            needed = [name for name in ALL_SECTIONS if any(name in absent for absent in missing.values())]
+            loaded = _load_sections(db, list(missing), needed)
+            for plant_id in missing:
+                if plant_id not in loaded:
+                    documents.pop(plant_id, None)
+                    continue
+                # เขียนระหว่างโหลดอาจค้างใน cache ได้ไม่เกิน TTL
+                documents[plant_id] = response_cache.put(
+                    keys[plant_id], {**documents.get(plant_id, {}), **loaded[plant_id]},
+                    PLANT_DETAIL_CACHE_TTL, (PLANT_DETAIL_CACHE_TAG, f"plant:{plant_id}"),
+                )
+
+    return {
+        plant_id: {name: documents[plant_id][name] for name in sections}
+        for plant_id in plant_ids if plant_id in documents
+    }
+
+
+def fetch_plant_detail(
+    db: Session, plant_id: int, sections: Sequence[str] = ALL_SECTIONS
+) -> Optional[Dict[str, Any]]:
+    return fetch_plant_details(db, [plant_id], sections).get(plant_id)
+
+
+def invalidate_plant_details(plant_ids: Optional[Iterable[int]] = None):
+    """Drop the given plants (everything when None)"""
+    if plant_ids is None:
+        response_cache.invalidate_tags(PLANT_DETAIL_CACHE_TAG)
+    else:
+        tags = [f"plant:{plant_id}" for plant_id in plant_ids]
+        if tags:
+            response_cache.invalidate_tags(*tags)
+
+
+@on_change(Plant)
+def _invalidate_changed_plants(changeset: ChangeSet):
+    invalidate_plant_details(None if changeset.bulk else changeset.ids)
+
+
+@on_change(PlantScore)
+def _invalidate_rescored_plants(changeset: ChangeSet):
+    # investment_score อยู่ใน section "plant"
+    invalidate_plant_details(None if changeset.bulk else changeset.ids)
+
+
+@on_change(*[model for _, model, _ in SECTIONS.values()])
+def _invalidate_changed_sections(changeset: ChangeSet):
+    plant_ids = {values.get("plant_id") for values in changeset.upserted.values()}
+    if changeset.bulk or changeset.deleted or None in plant_ids:
+        # ลบแล้วไม่รู้ว่าเป็นของ plant ไหน - ล้างทั้งหมด
+        invalidate_plant_details()
+    else:
+        invalidate_plant_details(plant_ids)
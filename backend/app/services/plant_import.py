@@ -0,0 +1,135 @@
+"""
+Plant CSV Import for PlantDex
+Plant master CSV (and the older plants.csv seed layout) mapped onto plants
+for the chunked import engine in app/services/csv_import.py
+"""
+import csv
+from typing import Any, Callable, Dict, Iterable, Optional, TextIO
+
+from sqlalchemy.orm import Session
+
+from app.models.plant import CareLevel, Plant, PlantCategory
+from app.services.csv_import import (
+    CHUNK_SIZE, CsvTable, ImportReport, Row, boolean_value, float_value, import_table, int_value,
+    required_int, required_text, text_value,
+)
+from app.services.plant_scores import refresh_plant_scores
+from app.services.search import postgres_search_enabled, reindex_plants
+
+TEXT_COLUMNS = (
+    "origin_country", "description_th", "description_en", "care_instructions",
+    "water_needs", "light_needs", "humidity_needs", "growth_rate",
+)
+FLOAT_COLUMNS = ("temperature_min", "temperature_max", "max_height", "max_width")
+BOOLEAN_COLUMNS = ("is_poisonous", "is_rare", "is_trending")
+
+# ค่าใน CSV -> enum (ค่าที่ไม่รู้จักใช้ default เหมือน importer เดิม)
+CATEGORY_MAPPING = {category.value: category for category in PlantCategory}
+CARE_LEVEL_MAPPING = {level.value: level for level in CareLevel}
+DEFAULT_CATEGORY = PlantCategory.OTHER
+DEFAULT_CARE_LEVEL = CareLevel.MODERATE
+
+# plants.csv (seed) - ค่า default เดียวกับ import_to_railway.py
+SEED_RARE_THRESHOLD = 7
+SEED_TRENDING_THRESHOLD = 7
+
+
+def parse_plant_row(row: Row) -> Dict[str, Any]:
+    """Master CSV row -> plants column values (raises RowError)"""
+    values: Dict[str, Any] = {
+        name: required_text(row, name) for name in ("scientific_name", "common_name_th", "common_name_en")
+    }
+    values["category"] = CATEGORY_MAPPING.get((row.get("category") or "").strip().lower(), DEFAULT_CATEGORY)
+    values["care_level"] = CARE_LEVEL_MAPPING.get((row.get("care_level") or "").strip().lower(), DEFAULT_CARE_LEVEL)
+    for name in TEXT_COLUMNS:
+        values[name] = text_value(row, name)
+    if not values["description_en"]:
+        values["description_en"] = values["description_th"]
+    for name in FLOAT_COLUMNS:
+        values[name] = float_value(row, name)
+    for name in BOOLEAN_COLUMNS:
+        values[name] = boolean_value(row, name)
+    return values
+
+
+def parse_seed_plant_row(row: Row) -> Dict[str, Any]:
+    """plants.csv seed row -> plants column values; keeps the id the detailed CSVs refer to"""
+    common_name = required_text(row, "common_name")
+    notes = text_value(row, "notes")
+    temperature_min = float_value(row, "temp_min_c")
+    temperature_max = float_value(row, "temp_max_c")
+    return {
+        "id": required_int(row, "id"),
+        "scientific_name": required_text(row, "scientific_name"),
+        "common_name_th": common_name,
+        "common_name_en": common_name,
+        "category": PlantCategory.TROPICAL,
+        "care_level": DEFAULT_CARE_LEVEL,
+        "origin_country": "Thailand",
+        "description_th": notes,
+        "description_en": notes,
+        "care_instructions": (
+            f"แสง: {row.get('light')}, น้ำ: {row.get('water')}, ความชื้น: {row.get('humidity')}, "
+            f"อุณหภูมิ: {row.get('temp_min_c')}-{row.get('temp_max_c')}°C, ดิน: {row.get('soil')}"
+        ),
+        "water_needs": text_value(row, "water"),
+        "light_needs": text_value(row, "light"),
+        "humidity_needs": text_value(row, "humidity"),
+        "temperature_min": temperature_min,
+        "temperature_max": temperature_max,
+        "growth_rate": "moderate",
+        "max_height": 100.0,
+        "max_width": 50.0,
+        "is_poisonous": False,
+        "is_rare": (int_value(row, "rarity_score") or 0) >= SEED_RARE_THRESHOLD,
+        "is_trending": (int_value(row, "trending_score") or 0) >= SEED_TRENDING_THRESHOLD,
+    }
+
+
+PLANTS = CsvTable(
+    name="plants",
+    model=Plant,
+    parse=parse_plant_row,
+    required_columns=("scientific_name", "common_name_th", "common_name_en", "category", "care_level"),
+    key_column="scientific_name",
+    upsert=True,
+)
+SEED_PLANTS = CsvTable(
+    name="plants (seed layout)",
+    model=Plant,
+    parse=parse_seed_plant_row,
+    required_columns=("id", "scientific_name", "common_name"),
+    key_column="scientific_name",
+    upsert=True,
+)
+
+
+def plant_table_for(fieldnames: Optional[Iterable[str]]) -> CsvTable:
+    """Master layout unless the header looks like plants.csv (common_name, no common_name_th)"""
+    present = {name.strip() for name in (fieldnames or [])}
+    if "common_name_th" not in present and "common_name" in present:
+        return SEED_PLANTS
+    return PLANTS
+
+
+def import_plants(
+    db: Session,
+    stream: TextIO,
+    on_conflict: str = "skip",
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Import plants from a CSV text stream (matched by scientific_name); caller commits"""
+    reader = csv.DictReader(stream)
+    spec = plant_table_for(reader.fieldnames)
+    return import_table(db, spec, stream, on_conflict, chunk_size, progress, reader=reader)
+
+
+def refresh_plant_indexes(db: Session, plant_ids: Optional[Iterable[int]] = None):
+    """Rewrite search vectors and investment scores of `plant_ids` (every plant when None); caller commits"""
+    # writer แบบ Core ไม่ผ่าน ORM flush - เรียกใน transaction เดียวกับการเขียน plants
+    if plant_ids is not None:
+        plant_ids = sorted(set(plant_ids))
+    if postgres_search_enabled(db):
+        reindex_plants(db, plant_ids)
+    refresh_plant_scores(db, plant_ids)
@@ -0,0 +1,86 @@
+"""
+Plant Investment Scores for PlantDex
+Rule table compiled to one SQL expression; scores are stored in plant_scores
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.orm import Query, Session, with_expression
+
+from app.core.database import SessionLocal
+from app.core.events import ChangeSet, on_change, record_change
+from app.models.plant import CareLevel, Plant, PlantCategory, PlantScore
+
+MODEL_VERSION = "rules-v1"
+BASE_SCORE = 50
+MAX_SCORE = 100
+FLAG_POINTS = {"is_rare": 20, "is_trending": 15}
+CATEGORY_POINTS = {PlantCategory.INDOOR: 10}
+CARE_LEVEL_POINTS = {CareLevel.EASY: 10, CareLevel.MODERATE: 5}  # ดูแลง่าย = คะแนนสูง
+HEIGHT_THRESHOLD_CM = 100
+HEIGHT_POINTS = 5
+
+
+def score_expression():
+    """SQL expression for the investment score of each row of `plants`"""
+    terms = [case((getattr(Plant, flag) == True, points), else_=0) for flag, points in FLAG_POINTS.items()]
+    terms.append(case(*[(Plant.category == category, points) for category, points in CATEGORY_POINTS.items()], else_=0))
+    terms.append(case(*[(Plant.care_level == level, points) for level, points in CARE_LEVEL_POINTS.items()], else_=0))
+    terms.append(case((Plant.max_height > HEIGHT_THRESHOLD_CM, HEIGHT_POINTS), else_=0))
+    total = literal(BASE_SCORE)
+    for term in terms:
+        total = total + term
+    return case((total > MAX_SCORE, MAX_SCORE), else_=total)
+
+
+def refresh_plant_scores(db: Session, plant_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute scores for `plant_ids` (whole catalogue when None) in one INSERT ... SELECT; caller commits"""
+    if plant_ids is not None:
+        plant_ids = sorted(set(plant_ids))
+        if not plant_ids:
+            return 0
+
+    clear = delete(PlantScore)
+    source = select(Plant.id, score_expression(), literal(MODEL_VERSION))
+    if plant_ids is not None:
+        clear = clear.where(PlantScore.plant_id.in_(plant_ids))
+        source = source.where(Plant.id.in_(plant_ids))
+    # ผ่าน connection ตรงๆ - ไม่ให้ DELETE ถูกนับเป็น bulk change ของทั้งตาราง
+    db.connection().execute(clear)
+    result = db.execute(
+        insert(PlantScore).from_select(["plant_id", "investment_score", "model_version"], source)
+    )
+    if plant_ids is None:
+        record_change(db, PlantScore, bulk=True)
+    else:
+        record_change(db, PlantScore, upserted={plant_id: {"plant_id": plant_id} for plant_id in plant_ids})
+    return result.rowcount
+
+
+def score_column():
+    """investment_score for queries that outer-join plant_scores.
+
+    The stored score is the indexed fast path; plants without a row (written
+    by scripts / imports that do not run the listener) are scored inline.
+    """
+    return func.coalesce(PlantScore.investment_score, score_expression()).label("investment_score")
+
+
+def with_scores(query: Query) -> Query:
+    """Join plant_scores and populate Plant.investment_score on the loaded plants"""
+    return query.outerjoin(PlantScore, PlantScore.plant_id == Plant.id).options(
+        with_expression(Plant.investment_score, score_column())
+    )
+
+
+@on_change(Plant)
+def _rescore_changed_plants(changeset: ChangeSet):
+    db = SessionLocal()
+    try:
+        refresh_plant_scores(db, None if changeset.bulk else changeset.ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
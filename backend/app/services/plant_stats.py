@@ -0,0 +1,141 @@
+"""
+Plant Catalogue Statistics for PlantDex
+Single-pass aggregates behind the homepage and market-data widgets
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.events import ChangeSet, on_change
+from app.models.plant import Plant, PlantCategory
+
+LIST_LIMIT = 10
+
+
+def _flag_sum(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compute_plant_stats(db: Session) -> Dict[str, Any]:
+    """Compute every homepage counter in two round-trips"""
+    # 1) ทุก count / distribution จาก GROUP BY เดียว
+    rows = db.query(
+        Plant.category,
+        Plant.care_level,
+        func.count(Plant.id),
+        _flag_sum(Plant.is_trending == True),
+        _flag_sum(Plant.is_rare == True),
+    ).group_by(Plant.category, Plant.care_level).all()
+
+    total = trending = rare = 0
+    category_distribution: Dict[str, int] = {}
+    care_level_distribution: Dict[str, int] = {}
+    for category, care_level, count, trending_count, rare_count in rows:
+        total += count
+        trending += trending_count
+        rare += rare_count
+        category_distribution[str(category)] = category_distribution.get(str(category), 0) + count
+        care_level_distribution[str(care_level)] = care_level_distribution.get(str(care_level), 0) + count
+
+    # 2) top-N trending และ rare ด้วย window function ใน query เดียว
+    ranked = db.query(
+        Plant.id,
+        Plant.scientific_name,
+        Plant.common_name_th,
+        Plant.category,
+        Plant.is_trending,
+        Plant.is_rare,
+        func.row_number().over(partition_by=Plant.is_trending, order_by=Plant.id).label("trending_rank"),
+        func.row_number().over(partition_by=Plant.is_rare, order_by=Plant.id).label("rare_rank"),
+    ).filter(or_(Plant.is_trending == True, Plant.is_rare == True)).subquery()
+
+    trending_list: List[Dict[str, Any]] = []
+    rare_list: List[Dict[str, Any]] = []
+    for row in db.query(ranked).filter(or_(
+        and_(ranked.c.is_trending == True, ranked.c.trending_rank <= LIST_LIMIT),
+        and_(ranked.c.is_rare == True, ranked.c.rare_rank <= LIST_LIMIT),
+    )).order_by(ranked.c.id).all():
+        item = {
+            "id": row.id,
+            "scientific_name": row.scientific_name,
+            "common_name_th": row.common_name_th,
+            "category": row.category.value if row.category else None,
+        }
+        if row.is_trending and row.trending_rank <= LIST_LIMIT:
+            trending_list.append(item)
+        if row.is_rare and row.rare_rank <= LIST_LIMIT:
+            rare_list.append(item)
+
+    return {
+        "total_plants": total,
+        "trending_plants": trending,
+        "rare_plants": rare,
+        "indoor_plants": category_distribution.get(str(PlantCategory.INDOOR), 0),
+        "outdoor_plants": category_distribution.get(str(PlantCategory.OUTDOOR), 0),
+        "category_distribution": category_distribution,
+        "care_level_distribution": care_level_distribution,
+        "trending_list": trending_list,
+        "rare_list": rare_list,
+        "computed_at": datetime.now(timezone.utc),
+    }
+
+
+class PlantStatsCache:
+    """Precomputed stats snapshot, dropped whenever a Plant row is committed.
+
+    The TTL only matters for writes made by other processes (import scripts,
+    other workers); in-process writes invalidate immediately.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._version = 0
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """Cached snapshot or None, without touching the database"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires_at:
+            return snapshot
+        return None
+
+    def get(self, db: Session) -> Dict[str, Any]:
+        snapshot = self.peek()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            # อีก thread อาจคำนวณเสร็จแล้วระหว่างรอ lock
+            snapshot = self.peek()
+            if snapshot is not None:
+                return snapshot
+            version = self._version
+
+        snapshot = compute_plant_stats(db)
+
+        with self._lock:
+            # ถ้ามีการเขียนระหว่างคำนวณ ไม่ cache ผลที่อาจล้าสมัย
+            if version == self._version:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.ttl
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+
+plant_stats_cache = PlantStatsCache(ttl=settings.PLANT_STATS_CACHE_TTL)
+
+
+@on_change(Plant)
+def _invalidate_plant_stats(changeset: ChangeSet):
+    plant_stats_cache.invalidate()
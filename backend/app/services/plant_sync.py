@@ -0,0 +1,225 @@
+"""
+Plant Master Sync for PlantDex
+Differential sync of the plant master CSV: hash every parsed row, compare
+with plant_master_hashes in one query and write only the rows that changed
+"""
+import csv
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.events import record_change
+from app.models.plant import Plant, PlantMasterHash
+from app.services.csv_import import (
+    CHUNK_SIZE, ImportReport, RowError, dialect_insert, insert_statement, iter_chunks, text_value,
+)
+from app.services.plant_import import PLANTS, refresh_plant_indexes
+
+HASH_VERSION = "v1"  # เปลี่ยนเมื่อ parse_plant_row เปลี่ยน - ทุกแถวจะถูกเขียนใหม่หนึ่งรอบ
+MAX_SAMPLES = 10
+# เปลี่ยนมากกว่านี้แจ้ง listener แบบ bulk (rebuild ทั้งหมดถูกกว่า IN list ยาวๆ)
+PRECISE_CHANGE_LIMIT = 1000
+
+# (CSV line, "insert" / "update", parsed values, hash)
+PendingRow = Tuple[int, str, Dict[str, Any], str]
+
+
+@dataclass
+class PlantSyncReport(ImportReport):
+    unchanged: int = 0
+    deleted: int = 0
+    dry_run: bool = False
+    samples: Dict[str, List[str]] = field(default_factory=lambda: {"insert": [], "update": [], "delete": []})
+
+    def sample(self, kind: str, key: str):
+        if len(self.samples[kind]) < MAX_SAMPLES:
+            self.samples[kind].append(key)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **super().as_dict(),
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "dry_run": self.dry_run,
+            "samples": self.samples,
+        }
+
+
+def row_hash(values: Dict[str, Any]) -> str:
+    """Stable hash of parsed plant values"""
+    payload = json.dumps([HASH_VERSION, *(values[name] for name in sorted(values))], default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stored_state(db: Session) -> Dict[str, Tuple[int, Optional[str]]]:
+    """scientific_name -> (plant id, stored hash or None) for the whole catalogue in one query"""
+    rows = db.execute(
+        select(Plant.scientific_name, Plant.id, PlantMasterHash.row_hash)
+        .outerjoin(PlantMasterHash, PlantMasterHash.plant_id == Plant.id)
+    )
+    return {name: (plant_id, stored) for name, plant_id, stored in rows}
+
+
+def _upsert(db: Session, rows: List[PendingRow]) -> Dict[str, int]:
+    """Write plants and their hashes in one savepoint; returns scientific_name -> id"""
+    plants = [values for _, _, values, _ in rows]
+    statement = insert_statement(db, PLANTS, list(plants[0]), "update").returning(Plant.scientific_name)
+    table = PlantMasterHash.__table__
+    hashes = dialect_insert(db, table)
+    hashes = hashes.on_conflict_do_update(
+        index_elements=[table.c.plant_id],
+        set_={
+            "scientific_name": hashes.excluded.scientific_name,
+            "row_hash": hashes.excluded.row_hash,
+            "synced_at": func.now(),
+        },
+    )
+    with db.begin_nested():
+        ids = {name: plant_id for plant_id, name in db.connection().execute(statement, plants)}
+        # ชื่อนี้อาจค้างอยู่กับ plant อื่นที่ถูกเปลี่ยนชื่อผ่าน API - ล้างก่อน upsert ตาม plant_id
+        db.execute(delete(PlantMasterHash).where(PlantMasterHash.scientific_name.in_(ids.keys())))
+        db.connection().execute(hashes, [
+            {"scientific_name": values["scientific_name"], "plant_id": ids[values["scientific_name"]], "row_hash": digest}
+            for _, _, values, digest in rows
+        ])
+    return ids
+
+
+def _apply_upserts(db: Session, rows: List[PendingRow], report: PlantSyncReport, changed: Dict[int, Dict[str, Any]]):
+    try:
+        batches = [(rows, _upsert(db, rows))]
+    except DBAPIError:
+        # batch ล้ม - เขียนทีละแถวเพื่อรายงานแถวที่ผิด
+        batches = []
+        for row in rows:
+            try:
+                batches.append(([row], _upsert(db, [row])))
+            except DBAPIError as e:
+                report.add_error(row[0], row[2]["scientific_name"], str(e.orig).strip().splitlines()[0])
+
+    for written, ids in batches:
+        for _, kind, values, _ in written:
+            plant_id = ids[values["scientific_name"]]
+            changed[plant_id] = {**values, "id": plant_id}
+            if kind == "insert":
+                report.inserted += 1
+            else:
+                report.updated += 1
+            report.sample(kind, values["scientific_name"])
+
+
+def _delete(db: Session, plants: List[Tuple[str, int]]):
+    plant_ids = [plant_id for _, plant_id in plants]
+    with db.begin_nested():
+        db.execute(delete(PlantMasterHash).where(PlantMasterHash.plant_id.in_(plant_ids)))
+        db.execute(delete(Plant).where(Plant.id.in_(plant_ids)))
+
+
+def _apply_deletes(db: Session, plants: List[Tuple[str, int]], report: PlantSyncReport, deleted: Set[int]):
+    try:
+        _delete(db, plants)
+        done = plants
+    except DBAPIError:
+        # มีตารางอื่นอ้างถึง (ราคา, listing, ...) - ลบทีละแถวและเก็บแถวที่ลบไม่ได้ไว้
+        done = []
+        for plant in plants:
+            try:
+                _delete(db, [plant])
+                done.append(plant)
+            except DBAPIError as e:
+                report.add_error(None, plant[0], f"not deleted: {str(e.orig).strip().splitlines()[0]}")
+    for name, plant_id in done:
+        deleted.add(plant_id)
+        report.deleted += 1
+        report.sample("delete", name)
+
+
+def sync_plant_master(
+    db: Session,
+    stream: TextIO,
+    apply: bool = True,
+    delete_missing: bool = True,
+    batch_size: int = CHUNK_SIZE,
+) -> PlantSyncReport:
+    """Bring plants in line with a master CSV stream, writing only the difference; caller commits.
+
+    Rows are matched on scientific_name. New names are inserted, rows whose
+    hash differs from plant_master_hashes are updated (plants imported before
+    the first sync count as updated once), and plants synced earlier whose
+    name left the file are deleted when `delete_missing`. With apply=False
+    nothing is written and the report shows what would change.
+    """
+    started = time.perf_counter()
+    report = PlantSyncReport(dry_run=not apply)
+    reader = csv.DictReader(stream)
+    missing = PLANTS.missing_columns(reader.fieldnames)
+    if missing:
+        raise ValueError(f"CSV is missing required columns for plants: {', '.join(missing)}")
+
+    stored = _stored_state(db)
+    seen: Set[str] = set()
+    pending: List[PendingRow] = []
+    changed: Dict[int, Dict[str, Any]] = {}
+    deleted: Set[int] = set()
+
+    for chunk in iter_chunks(reader, batch_size):
+        report.rows_read += len(chunk)
+        for line, row in chunk:
+            key = text_value(row, "scientific_name")
+            if key in seen:
+                report.skipped += 1  # ชื่อซ้ำในไฟล์ - ใช้แถวแรก
+                continue
+            if key:
+                # แถวที่ parse ไม่ผ่านยังนับว่าอยู่ในไฟล์ (ไม่ลบพืชนั้น)
+                seen.add(key)
+            try:
+                values = PLANTS.parse(row)
+            except RowError as e:
+                report.add_error(line, key, str(e))
+                continue
+
+            digest = row_hash(values)
+            plant_id, stored_hash = stored.get(key, (None, None))
+            if stored_hash == digest:
+                report.unchanged += 1
+                continue
+            kind = "insert" if plant_id is None else "update"
+            if apply:
+                pending.append((line, kind, values, digest))
+            else:
+                report.inserted += kind == "insert"
+                report.updated += kind == "update"
+                report.sample(kind, key)
+
+        if pending:
+            _apply_upserts(db, pending, report, changed)
+            pending = []
+
+    if delete_missing:
+        gone = [(name, plant_id) for name, (plant_id, stored_hash) in stored.items()
+                if stored_hash is not None and name not in seen]
+        for start in range(0, len(gone), batch_size):
+            batch = gone[start:start + batch_size]
+            if apply:
+                _apply_deletes(db, batch, report, deleted)
+            else:
+                report.deleted += len(batch)
+                for name, _ in batch:
+                    report.sample("delete", name)
+
+    if changed or deleted:
+        bulk = len(changed) + len(deleted) > PRECISE_CHANGE_LIMIT
+        if changed:
+            refresh_plant_indexes(db, None if bulk else changed)
+        if bulk:
+            record_change(db, Plant, bulk=True)
+        else:
+            record_change(db, Plant, upserted=changed, deleted=deleted)
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,126 @@
+"""
+Price Analysis for PlantDex
+Price distribution statistics (overall and per source) without loading ORM objects
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.core.enums import coerce_enum
+from app.models.plant import Plant, PlantCategory
+from app.models.price import PlantPrice
+
+PERCENTILES = (10, 50, 90)
+
+
+def _filtered(statement, plant_id: Optional[int], category: Optional[PlantCategory], location: Optional[str]):
+    if plant_id:
+        statement = statement.where(PlantPrice.plant_id == plant_id)
+    if category is not None:
+        statement = statement.join(Plant, Plant.id == PlantPrice.plant_id).where(Plant.category == category)
+    if location:
+        statement = statement.where(PlantPrice.seller_location.ilike(f"%{location}%"))
+    return statement
+
+
+def _stats(count, avg, low, high, p10, median, p90, stddev) -> Dict[str, Any]:
+    def rounded(value):
+        return None if value is None or value != value else round(float(value), 2)  # NaN -> None
+
+    return {
+        "count": int(count),
+        "avg_price": float(avg),
+        "min_price": float(low),
+        "max_price": float(high),
+        "median_price": rounded(median),
+        "p10_price": rounded(p10),
+        "p90_price": rounded(p90),
+        "stddev": rounded(stddev),  # sample stddev; None for a single price
+    }
+
+
+def _postgres_stats(db: Session, plant_id, category, location):
+    """One pass in the database: GROUPING SETS gives the overall row and one row per source"""
+    quantiles = func.percentile_cont(literal_column("ARRAY[0.1, 0.5, 0.9]")).within_group(PlantPrice.price)
+    statement = _filtered(
+        select(
+            PlantPrice.source,
+            func.grouping(PlantPrice.source).label("is_total"),
+            func.count(),
+            func.avg(PlantPrice.price),
+            func.min(PlantPrice.price),
+            func.max(PlantPrice.price),
+            quantiles,
+            func.stddev_samp(PlantPrice.price),
+        ),
+        plant_id, category, location,
+    ).group_by(func.grouping_sets(literal_column("()"), PlantPrice.source))
+
+    overall = None
+    by_source = {}
+    for source, is_total, count, avg, low, high, quantile_values, stddev in db.execute(statement):
+        if not count:
+            continue  # grouping set () ยังคืนหนึ่งแถวแม้ไม่มีข้อมูล
+        p10, median, p90 = quantile_values
+        stats = _stats(count, avg, low, high, p10, median, p90, stddev)
+        if is_total:
+            overall = stats
+        else:
+            by_source[source] = stats
+    return overall, by_source
+
+
+def _numpy_stats(db: Session, plant_id, category, location):
+    """Fetch (source, price) tuples straight off the DBAPI cursor and reduce with NumPy per source"""
+    statement = _filtered(select(PlantPrice.source, PlantPrice.price), plant_id, category, location)
+    # Core execution + cursor.fetchall() - ไม่สร้าง Row/ORM object ทีละแถว
+    result = db.connection().execute(statement)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    if not rows:
+        return None, {}
+
+    prices = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    labels: Dict[str, int] = {}
+    codes = np.fromiter((labels.setdefault(row[0], len(labels)) for row in rows), dtype=np.int32, count=len(rows))
+
+    def describe(values: np.ndarray) -> Dict[str, Any]:
+        p10, median, p90 = np.percentile(values, PERCENTILES)  # linear = percentile_cont
+        stddev = values.std(ddof=1) if len(values) > 1 else None
+        return _stats(len(values), values.mean(), values.min(), values.max(), p10, median, p90, stddev)
+
+    # เรียงตาม source ครั้งเดียวแล้วตัดเป็นช่วง แทนการ mask ทีละ source
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    sorted_prices = prices[order]
+    by_source = {
+        label: describe(sorted_prices[bounds[code]:bounds[code + 1]])
+        for label, code in sorted(labels.items())
+    }
+    return describe(prices), by_source
+
+
+def analyze_prices(
+    db: Session,
+    plant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Overall and per-source price statistics, or None when nothing matches"""
+    try:
+        category = coerce_enum(PlantCategory, category)
+    except ValueError:
+        return None
+
+    if db.get_bind().dialect.name == "postgresql":
+        overall, by_source = _postgres_stats(db, plant_id, category, location)
+    else:
+        overall, by_source = _numpy_stats(db, plant_id, category, location)
+
+    if overall is None:
+        return None
+    return {"overall": overall, "by_source": by_source}
@@ -0,0 +1,309 @@
+"""
+Price History Storage for PlantDex
+Monthly-partitioned Shopee price_history with daily OHLC rollups of old months
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+PARTITION_PREFIX = "price_history_p"
+DEFAULT_PARTITION = "price_history_default"
+RAW_RETENTION_MONTHS = 6  # เดือนที่เก็บราคาดิบ ก่อนย่อเป็น OHLC รายวัน
+
+CREATE_PRICE_HISTORY_SQL = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id BIGSERIAL,
+    item_id BIGINT NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    original_price DECIMAL(10,2),
+    discount_percentage DECIMAL(5,2),
+    recorded_at TIMESTAMP NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (id, recorded_at),
+    FOREIGN KEY (item_id) REFERENCES shopee_products(item_id)
+) PARTITION BY RANGE (recorded_at);
+
+CREATE INDEX IF NOT EXISTS idx_price_history_item ON price_history(item_id, recorded_at);
+
+CREATE TABLE IF NOT EXISTS price_history_default PARTITION OF price_history DEFAULT;
+
+CREATE TABLE IF NOT EXISTS price_history_daily (
+    item_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    open_price DECIMAL(10,2) NOT NULL,
+    high_price DECIMAL(10,2) NOT NULL,
+    low_price DECIMAL(10,2) NOT NULL,
+    close_price DECIMAL(10,2) NOT NULL,
+    price_sum NUMERIC(14,2) NOT NULL,  -- avg = price_sum / samples (ไม่ปัดเศษซ้ำตอนรวมหลายวัน)
+    close_original_price DECIMAL(10,2),
+    samples INTEGER NOT NULL,
+
+    PRIMARY KEY (item_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_daily_day ON price_history_daily(day);
+"""
+
+# OHLC ต่อ item ต่อวัน จากราคาดิบในช่วง [start, end)
+ROLLUP_SQL = """
+INSERT INTO price_history_daily
+    (item_id, day, open_price, high_price, low_price, close_price, price_sum, close_original_price, samples)
+SELECT item_id,
+       recorded_at::date,
+       (array_agg(price ORDER BY recorded_at, id))[1],
+       MAX(price),
+       MIN(price),
+       (array_agg(price ORDER BY recorded_at DESC, id DESC))[1],
+       SUM(price),
+       (array_agg(original_price ORDER BY recorded_at DESC, id DESC))[1],
+       COUNT(*)
+FROM {table}
+WHERE recorded_at >= %s AND recorded_at < %s
+GROUP BY item_id, recorded_at::date
+ON CONFLICT (item_id, day) DO UPDATE SET
+    open_price = EXCLUDED.open_price,
+    high_price = EXCLUDED.high_price,
+    low_price = EXCLUDED.low_price,
+    close_price = EXCLUDED.close_price,
+    price_sum = EXCLUDED.price_sum,
+    close_original_price = EXCLUDED.close_original_price,
+    samples = EXCLUDED.samples
+"""
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _as_datetime(value: date) -> datetime:
+    return value if isinstance(value, datetime) else datetime(value.year, value.month, value.day)
+
+
+def list_partitions(cursor) -> List[Tuple[str, date]]:
+    """Monthly partitions of price_history as (name, first day of month), oldest first"""
+    cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'price_history' AND child.relname LIKE %s
+        ORDER BY child.relname
+    """, (PARTITION_PREFIX + "%",))
+    partitions = []
+    for (name,) in cursor.fetchall():
+        suffix = name[len(PARTITION_PREFIX):]
+        if len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return partitions
+
+
+def is_partitioned(cursor) -> bool:
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('price_history')")
+    row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def ensure_partitions(cursor, start: Optional[date] = None, months_ahead: int = 2) -> List[str]:
+    """Create monthly partitions from `start` (default: this month) through `months_ahead` months on.
+
+    Rows already sitting in the default partition for a new month are moved
+    into it, since PostgreSQL refuses to attach over overlapping rows.
+    """
+    first = month_start(start or date.today())
+    last = add_months(month_start(date.today()), months_ahead)
+    existing = {name for name, _ in list_partitions(cursor)}
+    created = []
+
+    month = first
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            lower, upper = month, add_months(month, 1)
+            cursor.execute(f"""
+                CREATE TABLE {name} (LIKE price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            """)
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE recorded_at >= %s AND recorded_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, (lower, upper))
+            cursor.execute(
+                f"ALTER TABLE price_history ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                (lower, upper),
+            )
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def migrate_to_partitioned(cursor) -> int:
+    """Convert a plain price_history table into the partitioned layout; returns rows moved"""
+    cursor.execute("SELECT to_regclass('price_history') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        cursor.execute(CREATE_PRICE_HISTORY_SQL)
+        return 0
+    if is_partitioned(cursor):
+        cursor.execute(CREATE_PRICE_HISTORY_SQL)  # ตาราง daily / index ที่อาจยังไม่มี
+        return 0
+
+    cursor.execute("LOCK TABLE price_history IN ACCESS EXCLUSIVE MODE")
+    cursor.execute("ALTER TABLE price_history RENAME TO price_history_legacy")
+    cursor.execute("ALTER INDEX IF EXISTS idx_price_history_item RENAME TO idx_price_history_legacy_item")
+    cursor.execute("ALTER SEQUENCE IF EXISTS price_history_id_seq RENAME TO price_history_legacy_id_seq")
+    cursor.execute(CREATE_PRICE_HISTORY_SQL)
+
+    cursor.execute("SELECT MIN(recorded_at) FROM price_history_legacy")
+    oldest = cursor.fetchone()[0]
+    ensure_partitions(cursor, start=oldest.date() if oldest else None)
+
+    cursor.execute("""
+        INSERT INTO price_history (id, item_id, price, original_price, discount_percentage, recorded_at)
+        SELECT id, item_id, price, original_price, discount_percentage, COALESCE(recorded_at, NOW())
+        FROM price_history_legacy
+    """)
+    moved = cursor.rowcount
+    cursor.execute("SELECT setval('price_history_id_seq', GREATEST((SELECT MAX(id) FROM price_history), 1))")
+    cursor.execute("DROP TABLE price_history_legacy")
+    return moved
+
+
+def rollup_old_partitions(cursor, retain_months: int = RAW_RETENTION_MONTHS) -> List[Tuple[str, int]]:
+    """Fold partitions older than `retain_months` into price_history_daily and drop them"""
+    cutoff = add_months(month_start(date.today()), -retain_months)
+    rolled = []
+    for name, month in list_partitions(cursor):
+        if month >= cutoff:
+            break
+        cursor.execute(f"ALTER TABLE price_history DETACH PARTITION {name}")
+        cursor.execute(ROLLUP_SQL.format(table=name), (month, add_months(month, 1)))
+        rolled.append((name, cursor.rowcount))
+        cursor.execute(f"DROP TABLE {name}")
+
+    # แถวเก่าที่หลุดไปอยู่ใน default partition
+    cursor.execute(ROLLUP_SQL.format(table=DEFAULT_PARTITION), (date(1970, 1, 1), cutoff))
+    if cursor.rowcount:
+        rolled.append((DEFAULT_PARTITION, cursor.rowcount))
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE recorded_at < %s", (cutoff,))
+    return rolled
+
+
+# ---- query helpers (recorded_at bounds keep the planner on the relevant partitions) ----
+
+DAILY_SERIES_SQL = """
+SELECT day, open_price, high_price, low_price, close_price, ROUND(price_sum / samples, 2), samples
+FROM price_history_daily
+WHERE item_id = %(item_id)s AND day >= %(date_from)s AND day < %(date_to)s
+UNION ALL
+SELECT recorded_at::date,
+       (array_agg(price ORDER BY recorded_at, id))[1],
+       MAX(price),
+       MIN(price),
+       (array_agg(price ORDER BY recorded_at DESC, id DESC))[1],
+       ROUND(AVG(price), 2),
+       COUNT(*)
+FROM price_history
+WHERE item_id = %(item_id)s AND recorded_at >= %(date_from)s AND recorded_at < %(date_to)s
+GROUP BY recorded_at::date
+ORDER BY 1
+"""
+
+RAW_SERIES_SQL = """
+SELECT recorded_at, price, original_price, discount_percentage
+FROM price_history
+WHERE item_id = %(item_id)s AND recorded_at >= %(date_from)s AND recorded_at < %(date_to)s
+ORDER BY recorded_at
+"""
+
+MARKET_DAILY_SQL = """
+WITH points AS (
+    SELECT d.item_id, d.day, d.price_sum AS price_total, d.samples,
+           d.low_price, d.high_price
+    FROM price_history_daily d
+    WHERE d.day >= %(date_from)s AND d.day < %(date_to)s
+    UNION ALL
+    SELECT h.item_id, h.recorded_at::date, SUM(h.price), COUNT(*), MIN(h.price), MAX(h.price)
+    FROM price_history h
+    WHERE h.recorded_at >= %(date_from)s AND h.recorded_at < %(date_to)s
+    GROUP BY h.item_id, h.recorded_at::date
+)
+SELECT p.day,
+       ROUND(SUM(p.price_total) / SUM(p.samples), 2),
+       MIN(p.low_price),
+       MAX(p.high_price),
+       COUNT(DISTINCT p.item_id),
+       SUM(p.samples)
+FROM points p
+{category_join}
+GROUP BY p.day
+ORDER BY p.day
+"""
+
+
+def _date_bounds(date_from: date, date_to: date) -> Dict[str, datetime]:
+    # date_to รวมทั้งวัน -> ขอบบนแบบ exclusive
+    return {"date_from": _as_datetime(date_from), "date_to": _as_datetime(date_to) + timedelta(days=1)}
+
+
+def _money(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def item_price_series(cursor, item_id: int, date_from: date, date_to: date, interval: str = "day") -> List[Dict[str, Any]]:
+    """One item's prices: daily OHLC (rolled-up + recent raw) or the raw points"""
+    params = {"item_id": item_id, **_date_bounds(date_from, date_to)}
+    if interval == "raw":
+        cursor.execute(RAW_SERIES_SQL, params)
+        return [
+            {
+                "recorded_at": recorded_at.isoformat(),
+                "price": _money(price),
+                "original_price": _money(original_price),
+                "discount_percentage": _money(discount),
+            }
+            for recorded_at, price, original_price, discount in cursor.fetchall()
+        ]
+
+    cursor.execute(DAILY_SERIES_SQL, params)
+    return [
+        {
+            "date": day.isoformat(),
+            "open": _money(open_price),
+            "high": _money(high),
+            "low": _money(low),
+            "close": _money(close),
+            "average": _money(average),
+            "samples": samples,
+        }
+        for day, open_price, high, low, close, average, samples in cursor.fetchall()
+    ]
+
+
+def market_daily_prices(cursor, date_from: date, date_to: date, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Market-wide daily price level across all items (optionally one category)"""
+    params = _date_bounds(date_from, date_to)
+    category_join = ""
+    if category:
+        category_join = "JOIN shopee_products sp ON sp.item_id = p.item_id AND sp.category = %(category)s"
+        params["category"] = category
+    cursor.execute(MARKET_DAILY_SQL.format(category_join=category_join), params)
+    return [
+        {
+            "date": day.isoformat(),
+            "average_price": _money(average),
+            "min_price": _money(low),
+            "max_price": _money(high),
+            "items": items,
+            "samples": int(samples),
+        }
+        for day, average, low, high, items, samples in cursor.fetchall()
+    ]
@@ -0,0 +1,127 @@
+"""
+Plant Price Summaries for PlantDex
+Per plant and source min/max/avg/median kept in plant_price_summaries
+"""
+from collections import defaultdict
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.events import ChangeSet, on_change, track_previous
+from app.models.price import PlantPrice, PlantPriceSummary
+
+
+def _summary_rows(db: Session, plant_ids: Optional[List[int]]) -> List[Dict[str, Any]]:
+    columns = [
+        PlantPrice.plant_id,
+        PlantPrice.source,
+        func.count().label("price_count"),
+        func.min(PlantPrice.price).label("min_price"),
+        func.max(PlantPrice.price).label("max_price"),
+        func.avg(PlantPrice.price).label("avg_price"),
+        func.max(PlantPrice.data_collected_at).label("last_seen_at"),
+    ]
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        columns.append(func.percentile_cont(0.5).within_group(PlantPrice.price).label("median_price"))
+
+    statement = select(*columns).group_by(PlantPrice.plant_id, PlantPrice.source)
+    if plant_ids is not None:
+        statement = statement.where(PlantPrice.plant_id.in_(plant_ids))
+    rows = [dict(row._mapping) for row in db.execute(statement)]
+
+    if not postgres and rows:
+        # ฐานข้อมูลอื่นไม่มี percentile_cont - หา median จากราคาดิบ
+        prices = defaultdict(list)
+        raw = select(PlantPrice.plant_id, PlantPrice.source, PlantPrice.price)
+        if plant_ids is not None:
+            raw = raw.where(PlantPrice.plant_id.in_(plant_ids))
+        for plant_id, source, price in db.execute(raw):
+            prices[(plant_id, source)].append(price)
+        for row in rows:
+            row["median_price"] = median(prices[(row["plant_id"], row["source"])])
+    return rows
+
+
+def refresh_price_summaries(db: Session, plant_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute summaries for `plant_ids` (all plants when None); caller commits"""
+    if plant_ids is not None:
+        plant_ids = sorted(set(plant_ids))
+        if not plant_ids:
+            return 0
+
+    rows = _summary_rows(db, plant_ids)
+    clear = delete(PlantPriceSummary)
+    if plant_ids is not None:
+        clear = clear.where(PlantPriceSummary.plant_id.in_(plant_ids))
+    db.execute(clear)
+    if rows:
+        db.execute(insert(PlantPriceSummary), rows)
+    return len(rows)
+
+
+def get_price_summary(db: Session, plant_id: int) -> Dict[str, Any]:
+    """Overall and per-source summary for one plant from the precomputed rows"""
+    rows = [
+        {column.key: getattr(row, column.key) for column in PlantPriceSummary.__table__.columns}
+        for row in db.query(PlantPriceSummary).filter(
+            PlantPriceSummary.plant_id == plant_id
+        ).order_by(PlantPriceSummary.source)
+    ]
+    if not rows:
+        # ราคาที่เขียนจากนอก app (script / import) อาจยังไม่มี summary - คำนวณสดแทนการตอบว่าง
+        rows = sorted(_summary_rows(db, [plant_id]), key=lambda row: row["source"])
+
+    total = sum(row["price_count"] for row in rows)
+    return {
+        "min_price": min((row["min_price"] for row in rows), default=None),
+        "max_price": max((row["max_price"] for row in rows), default=None),
+        "avg_price": sum(row["avg_price"] * row["price_count"] for row in rows) / total if total else None,
+        "total_sources": total,  # จำนวนราคาทั้งหมด (ชื่อเดิมของ response)
+        "source_count": len(rows),
+        "last_seen_at": max((row["last_seen_at"] for row in rows if row["last_seen_at"]), default=None),
+        "by_source": [
+            {
+                "source": row["source"],
+                "count": row["price_count"],
+                "min_price": row["min_price"],
+                "max_price": row["max_price"],
+                "avg_price": row["avg_price"],
+                "median_price": row["median_price"],
+                "last_seen_at": row["last_seen_at"],
+            }
+            for row in rows
+        ],
+    }
+
+
+# ย้ายราคาไป plant อื่นต้องคำนวณ plant เดิมด้วย
+track_previous(PlantPrice.plant_id)
+
+
+@on_change(PlantPrice)
+def _refresh_changed_summaries(changeset: ChangeSet):
+    known = {pk for pk, values in changeset.previous.items() if values.get("plant_id")}
+    if changeset.bulk or changeset.deleted - known:
+        # bulk update / ลบแถวที่ไม่รู้ plant_id - คำนวณใหม่ทั้งตาราง
+        plant_ids = None
+    else:
+        plant_ids = {
+            values["plant_id"]
+            for values in (*changeset.upserted.values(), *changeset.previous.values()) if values.get("plant_id")
+        }
+        if not plant_ids:
+            return
+
+    db = SessionLocal()
+    try:
+        refresh_price_summaries(db, plant_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,504 @@
+"""
+Plant Search Engine for PlantDex
+Thai-aware tokenisation with a Postgres tsvector index and an in-process fallback
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, cast, event, false, func, inspect, literal, literal_column, or_, text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.enums import coerce_enum
+from app.core.events import ChangeSet, on_change
+from app.core.query_profile import unmetered
+from app.models.plant import CareLevel, Plant, PlantCategory
+
+# ภาษาไทยไม่มีช่องว่างระหว่างคำ จึงแตกเป็น character trigram แทนการตัดคำ
+THAI_RUN = re.compile("[\u0e00-\u0e7f]+")
+TOKEN_RUN = re.compile("[\u0e00-\u0e7f]+|[^\\W_\u0e00-\u0e7f]+")
+# วรรณยุกต์/ไม้ไต่คู้/การันต์ มักพิมพ์ผิดหรือตกหล่น - ตัดทิ้งทั้งตอน index และตอนค้น
+THAI_MARKS = re.compile("[\u0e47-\u0e4e]")
+THAI_NGRAM = 3
+
+# field -> (tsvector weight, in-memory score)
+NAME_FIELDS = ("common_name_th", "common_name_en")
+SCIENTIFIC_FIELDS = ("scientific_name",)
+DESCRIPTION_FIELDS = ("description_th", "description_en")
+FIELD_WEIGHTS = (
+    (NAME_FIELDS, "A", 3),
+    (SCIENTIFIC_FIELDS, "B", 2),
+    (DESCRIPTION_FIELDS, "D", 1),
+)
+SEARCH_FIELDS = NAME_FIELDS + SCIENTIFIC_FIELDS + DESCRIPTION_FIELDS
+NAME_MIN_SCORE = 2  # token ต้องอยู่ในชื่อ/ชื่อวิทยาศาสตร์ เมื่อไม่ค้นใน description
+
+EXACT_NAME_BONUS = 6
+NAME_PREFIX_BONUS = 4
+NAME_CONTAINS_BONUS = 2
+TRENDING_BONUS = 1
+
+
+def normalize(value: Optional[str]) -> str:
+    """Canonical form used for both indexing and querying"""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKC", value).casefold()
+    return THAI_MARKS.sub("", value)
+
+
+def _thai_ngrams(run: str) -> List[str]:
+    if len(run) <= THAI_NGRAM:
+        return [run]
+    return [run[i:i + THAI_NGRAM] for i in range(len(run) - THAI_NGRAM + 1)]
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Latin/digit words as-is, Thai runs as overlapping trigrams"""
+    tokens = []
+    for run in TOKEN_RUN.findall(normalize(value)):
+        if THAI_RUN.fullmatch(run):
+            tokens.extend(_thai_ngrams(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+@dataclass(frozen=True)
+class QueryTerm:
+    token: str
+    prefix: bool  # match any indexed token starting with `token`
+
+
+def parse_query(q: str) -> List[QueryTerm]:
+    """Tokenise a user query; short Thai runs and the word being typed match as prefixes"""
+    normalized = normalize(q)
+    runs = TOKEN_RUN.findall(normalized)
+    typing = bool(runs) and not normalized[-1:].isspace()
+
+    terms: Dict[str, QueryTerm] = {}
+    for position, run in enumerate(runs):
+        if THAI_RUN.fullmatch(run):
+            grams = _thai_ngrams(run)
+            for gram in grams:
+                # trigram ที่สั้นกว่า 3 ตัวอักษรจะต้องเป็น prefix ของ trigram ที่ index ไว้
+                prefix = len(gram) < THAI_NGRAM
+                terms.setdefault(gram, QueryTerm(gram, prefix))
+        else:
+            prefix = typing and position == len(runs) - 1
+            existing = terms.get(run)
+            terms[run] = QueryTerm(run, prefix or bool(existing and existing.prefix))
+    return list(terms.values())
+
+
+@dataclass
+class SearchResult:
+    ids: List[int]
+    total: int
+    backend: str
+
+
+def _name_bonus(query: str, names: Sequence[str]) -> int:
+    bonus = 0
+    for name in names:
+        if not name:
+            continue
+        if name == query:
+            bonus = max(bonus, EXACT_NAME_BONUS)
+        elif name.startswith(query):
+            bonus = max(bonus, NAME_PREFIX_BONUS)
+        elif query in name:
+            bonus = max(bonus, NAME_CONTAINS_BONUS)
+    return bonus
+
+
+@dataclass
+class _IndexedPlant:
+    id: int
+    names: Tuple[str, ...]  # normalised common/scientific names สำหรับ bonus
+    category: Optional[PlantCategory]
+    care_level: Optional[CareLevel]
+    is_trending: bool
+    is_rare: bool
+    tokens: Dict[str, int]  # token -> best field score
+
+
+class InMemorySearchIndex:
+    """Inverted index over the plant catalogue (SQLite / non-indexed databases)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: Dict[int, _IndexedPlant] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._built = False
+        self._stale_ids: Set[int] = set()
+        self._needs_rebuild = False
+
+    @property
+    def size(self) -> int:
+        return len(self._docs)
+
+    # ---- maintenance -------------------------------------------------
+
+    def _remove(self, plant_id: int):
+        doc = self._docs.pop(plant_id, None)
+        if doc is None:
+            return
+        for token in doc.tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(plant_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+
+    def add(self, plant_id: int, fields: Dict[str, Optional[str]], category=None, care_level=None,
+            is_trending: bool = False, is_rare: bool = False):
+        tokens: Dict[str, int] = {}
+        for field_names, _, score in FIELD_WEIGHTS:
+            for field_name in field_names:
+                for token in tokenize(fields.get(field_name)):
+                    if tokens.get(token, 0) < score:
+                        tokens[token] = score
+
+        doc = _IndexedPlant(
+            id=plant_id,
+            names=tuple(normalize(fields.get(name)) for name in NAME_FIELDS + SCIENTIFIC_FIELDS),
+            category=category,
+            care_level=care_level,
+            is_trending=bool(is_trending),
+            is_rare=bool(is_rare),
+            tokens=tokens,
+        )
+        with self._lock:
+            self._remove(plant_id)
+            self._docs[plant_id] = doc
+            for token, score in tokens.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    self._vocabulary_dirty = True
+                postings[plant_id] = score
+
+    def remove(self, plant_id: int):
+        with self._lock:
+            self._remove(plant_id)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._vocabulary = []
+            self._vocabulary_dirty = False
+
+    def mark_stale(self, ids: Iterable[int] = (), rebuild: bool = False):
+        """Reload these plants (or everything) before the next search"""
+        with self._lock:
+            self._stale_ids.update(ids)
+            self._needs_rebuild = self._needs_rebuild or rebuild
+
+    def _load(self, db: Session, ids: Optional[Set[int]] = None):
+        query = db.query(
+            Plant.id, Plant.category, Plant.care_level, Plant.is_trending, Plant.is_rare,
+            *[getattr(Plant, name) for name in SEARCH_FIELDS],
+        )
+        if ids is not None:
+            query = query.filter(Plant.id.in_(ids))
+        found = set()
+        for row in query.yield_per(1000):
+            found.add(row.id)
+            self.add(
+                row.id,
+                {name: getattr(row, name) for name in SEARCH_FIELDS},
+                category=row.category,
+                care_level=row.care_level,
+                is_trending=row.is_trending,
+                is_rare=row.is_rare,
+            )
+        if ids is not None:
+            for missing in ids - found:
+                self.remove(missing)
+
+    def ensure_fresh(self, db: Session):
+        with self._lock:
+            if not self._built or self._needs_rebuild:
+                self._needs_rebuild = False
+                self._stale_ids.clear()
+                self.clear()
+                self._load(db)
+                self._built = True
+            elif self._stale_ids:
+                stale, self._stale_ids = self._stale_ids, set()
+                self._load(db, stale)
+
+    # ---- querying ----------------------------------------------------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
+
+    def _term_postings(self, term: QueryTerm) -> Dict[int, int]:
+        if not term.prefix:
+            return self._postings.get(term.token, {})
+        merged: Dict[int, int] = {}
+        for token in self._expand_prefix(term.token):
+            for plant_id, score in self._postings[token].items():
+                if merged.get(plant_id, 0) < score:
+                    merged[plant_id] = score
+        return merged
+
+    def search(
+        self,
+        q: str,
+        category=None,
+        care_level=None,
+        trending: Optional[bool] = None,
+        include_descriptions: bool = False,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> SearchResult:
+        terms = parse_query(q)
+        if not terms:
+            return SearchResult([], 0, "memory")
+        min_score = 1 if include_descriptions else NAME_MIN_SCORE
+        normalized_query = normalize(q).strip()
+
+        with self._lock:
+            term_postings = sorted((self._term_postings(term) for term in terms), key=len)
+            # AND ทุก token โดยเริ่มจาก posting list ที่สั้นที่สุด
+            scores = {pid: s for pid, s in term_postings[0].items() if s >= min_score}
+            for postings in term_postings[1:]:
+                if not scores:
+                    break
+                next_scores = {}
+                for plant_id, score in scores.items():
+                    term_score = postings.get(plant_id, 0)
+                    if term_score >= min_score:
+                        next_scores[plant_id] = score + term_score
+                scores = next_scores
+
+            ranked = []
+            for plant_id, score in scores.items():
+                doc = self._docs[plant_id]
+                if category is not None and doc.category != category:
+                    continue
+                if care_level is not None and doc.care_level != care_level:
+                    continue
+                if trending is not None and doc.is_trending != trending:
+                    continue
+                score += _name_bonus(normalized_query, doc.names)
+                if doc.is_trending:
+                    score += TRENDING_BONUS
+                ranked.append((-score, plant_id))
+
+        # ต้องเรียงแค่ offset + limit อันดับแรก ไม่ต้อง sort ทั้งหมด
+        top = heapq.nsmallest(offset + limit, ranked)
+        page = [plant_id for _, plant_id in top[offset:]]
+        return SearchResult(page, len(ranked), "memory")
+
+
+memory_index = InMemorySearchIndex()
+
+
+@on_change(Plant)
+def _refresh_memory_index(changeset: ChangeSet):
+    if changeset.bulk:
+        memory_index.mark_stale(rebuild=True)
+    else:
+        memory_index.mark_stale(changeset.ids)
+
+
+# ---- Postgres tsvector path ------------------------------------------
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+_search_vector = literal_column(f"plants.{SEARCH_VECTOR_COLUMN}")
+_pg_enabled: Dict[str, bool] = {}
+
+# array_to_tsvector ไม่ผ่าน text-search parser ของ Postgres - token ไทยจึงไม่ขึ้นกับ locale
+SEARCH_VECTOR_SQL = " || ".join(
+    f"setweight(array_to_tsvector(CAST(:{field_names[0]}_tokens AS text[])), '{weight}')"
+    for field_names, weight, _ in FIELD_WEIGHTS
+)
+
+
+def search_vector_params(values: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+    """Bind parameters for SEARCH_VECTOR_SQL from a plant's text fields"""
+    params = {}
+    for field_names, _, _ in FIELD_WEIGHTS:
+        tokens: Set[str] = set()
+        for field_name in field_names:
+            tokens.update(tokenize(values.get(field_name)))
+        params[f"{field_names[0]}_tokens"] = sorted(tokens)
+    return params
+
+
+def postgres_search_enabled(db: Session) -> bool:
+    """True when plants.search_vector exists (see create_search_indexes.py)"""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _pg_enabled:
+        with unmetered():
+            columns = inspect(db.connection()).get_columns("plants")
+        _pg_enabled[key] = any(column["name"] == SEARCH_VECTOR_COLUMN for column in columns)
+    return _pg_enabled[key]
+
+
+def reindex_plants(db: Session, ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Recompute plants.search_vector for `ids` (or every plant); caller commits"""
+    statement = text(f"UPDATE plants SET {SEARCH_VECTOR_COLUMN} = {SEARCH_VECTOR_SQL} WHERE id = :id")
+    query = db.query(Plant.id, *[getattr(Plant, name) for name in SEARCH_FIELDS]).order_by(Plant.id)
+    if ids is not None:
+        query = query.filter(Plant.id.in_(list(ids)))
+
+    updated = 0
+    batch = []
+    for row in query.yield_per(batch_size):
+        params = search_vector_params({name: getattr(row, name) for name in SEARCH_FIELDS})
+        params["id"] = row.id
+        batch.append(params)
+        if len(batch) >= batch_size:
+            db.execute(statement, batch)
+            updated += len(batch)
+            batch = []
+    if batch:
+        db.execute(statement, batch)
+        updated += len(batch)
+    return updated
+
+
+def _tsquery(terms: List[QueryTerm], include_descriptions: bool) -> str:
+    weights = "" if include_descriptions else "AB"
+    parts = []
+    for term in terms:
+        lexeme = term.token.replace("\\", "\\\\").replace("'", "''")
+        suffix = ("*" if term.prefix else "") + weights
+        parts.append(f"'{lexeme}'" + (f":{suffix}" if suffix else ""))
+    return " & ".join(parts)
+
+
+def _ts_query(terms: List[QueryTerm], include_descriptions: bool):
+    return cast(literal(_tsquery(terms, include_descriptions)), TSQUERY)
+
+
+def _postgres_search(db: Session, q: str, category, care_level, trending, include_descriptions,
+                     offset: int, limit: int) -> SearchResult:
+    terms = parse_query(q)
+    if not terms:
+        return SearchResult([], 0, "postgres")
+
+    ts_query = _ts_query(terms, include_descriptions)
+    # exact/prefix ของชื่อได้คะแนนเพิ่มเหมือน in-memory index
+    typed = unicodedata.normalize("NFKC", q).strip().lower()
+    names = [func.lower(getattr(Plant, name)) for name in NAME_FIELDS + SCIENTIFIC_FIELDS]
+    name_bonus = case(
+        (or_(*[name == typed for name in names]), EXACT_NAME_BONUS),
+        (or_(*[name.startswith(typed, autoescape=True) for name in names]), NAME_PREFIX_BONUS),
+        (or_(*[name.contains(typed, autoescape=True) for name in names]), NAME_CONTAINS_BONUS),
+        else_=0,
+    )
+    score = func.ts_rank(_search_vector, ts_query) + name_bonus
+
+    query = db.query(Plant.id, func.count().over().label("total")).filter(_search_vector.op("@@")(ts_query))
+    if category is not None:
+        query = query.filter(Plant.category == category)
+    if care_level is not None:
+        query = query.filter(Plant.care_level == care_level)
+    if trending is not None:
+        query = query.filter(Plant.is_trending == trending)
+
+    rows = query.order_by(score.desc(), Plant.is_trending.desc(), Plant.id).offset(offset).limit(limit).all()
+    total = rows[0].total if rows else 0
+    if not rows and offset:
+        total = query.order_by(None).count()
+    return SearchResult([row.id for row in rows], total, "postgres")
+
+
+@event.listens_for(Session, "after_flush")
+def _update_search_vectors(session, flush_context):
+    # เขียน search_vector ใน transaction เดียวกับการแก้ไข plant
+    plants = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Plant) and obj.id is not None
+    ]
+    if not plants or not postgres_search_enabled(session):
+        return
+    statement = text(f"UPDATE plants SET {SEARCH_VECTOR_COLUMN} = {SEARCH_VECTOR_SQL} WHERE id = :id")
+    batch = []
+    for plant in plants:
+        params = search_vector_params({name: getattr(plant, name) for name in SEARCH_FIELDS})
+        params["id"] = plant.id
+        batch.append(params)
+    session.connection().execute(statement, batch)
+
+
+@on_change(Plant)
+def _reindex_changed_plants(changeset: ChangeSet):
+    # writer แบบ Core (import CSV, bulk UPDATE) ไม่ผ่าน after_flush ข้างบน - เขียน search_vector หลัง commit
+    db = SessionLocal()
+    try:
+        if postgres_search_enabled(db):
+            reindex_plants(db, None if changeset.bulk else changeset.ids)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---- public API ------------------------------------------------------
+
+def search_plants(
+    db: Session,
+    q: str,
+    category=None,
+    care_level=None,
+    trending: Optional[bool] = None,
+    include_descriptions: bool = False,
+    offset: int = 0,
+    limit: int = 20,
+) -> SearchResult:
+    """Relevance-ranked plant ids matching `q`, plus the total number of matches"""
+    category = coerce_enum(PlantCategory, category)
+    care_level = coerce_enum(CareLevel, care_level)
+
+    if postgres_search_enabled(db):
+        return _postgres_search(db, q, category, care_level, trending, include_descriptions, offset, limit)
+
+    memory_index.ensure_fresh(db)
+    return memory_index.search(q, category, care_level, trending, include_descriptions, offset, limit)
+
+
+def search_filter(db: Session, q: str, include_descriptions: bool = False):
+    """WHERE condition matching the plants search_plants(q) finds, or None without the Postgres index"""
+    if not postgres_search_enabled(db):
+        return None
+    terms = parse_query(q)
+    if not terms:
+        return false()
+    return _search_vector.op("@@")(_ts_query(terms, include_descriptions))
+
+
+def load_plants_in_order(db: Session, ids: List[int], options=None) -> List[Plant]:
+    """Fetch plants by id, preserving the ranked order (`options` may adjust the query, e.g. with_scores)"""
+    if not ids:
+        return []
+    query = db.query(Plant)
+    if options is not None:
+        query = options(query)
+    plants = {plant.id: plant for plant in query.filter(Plant.id.in_(ids)).all()}
+    return [plants[plant_id] for plant_id in ids if plant_id in plants]
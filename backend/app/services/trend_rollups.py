@@ -0,0 +1,254 @@
+"""
+Market Trend Rollups for PlantDex
+Weekly per-category / per-plant aggregates and the trending ranking per week (cached in response_cache)
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, union
+from sqlalchemy.orm import Session
+
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import ChangeSet, on_change, track_previous
+from app.models.market import CategoryTrendWeekly, MarketTrend, PlantTrendWeekly, TrendingPlant
+from app.models.plant import Plant
+
+MOVING_AVERAGE_WEEKS = 4
+# ranking ที่เขียนจาก process อื่น (batch job) เห็นภายใน TTL แม้ cache ไม่ได้ใช้ Redis
+TRENDING_CACHE_TTL = 300
+TRENDING_CACHE_STALE_TTL = 900
+TRENDING_CACHE_TAG = "trending"
+
+
+def _count_where(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def _category_rollup_select(weeks: Optional[List[date]]):
+    statement = select(
+        MarketTrend.week_start,
+        Plant.category,
+        func.count(func.distinct(MarketTrend.plant_id)),
+        func.sum(MarketTrend.search_volume),
+        func.sum(MarketTrend.sales_volume),
+        func.avg(MarketTrend.avg_price),
+        func.avg(MarketTrend.price_change_percent),
+        func.avg(MarketTrend.demand_score),
+        func.avg(MarketTrend.supply_score),
+        _count_where(MarketTrend.trend_direction == "up"),
+        _count_where(MarketTrend.trend_direction == "down"),
+        _count_where(MarketTrend.trend_direction == "stable"),
+    ).join(Plant, Plant.id == MarketTrend.plant_id).group_by(MarketTrend.week_start, Plant.category)
+    if weeks is not None:
+        statement = statement.where(MarketTrend.week_start.in_(weeks))
+    return statement
+
+
+def _plant_rollup_select(plant_ids: Optional[List[int]], since: Optional[date]):
+    window = dict(partition_by=MarketTrend.plant_id, order_by=MarketTrend.week_start)
+    moving = dict(window, rows=(-(MOVING_AVERAGE_WEEKS - 1), 0))
+    previous_sales = func.lag(MarketTrend.sales_volume).over(**window)
+    windowed = select(
+        MarketTrend.plant_id.label("plant_id"),
+        MarketTrend.week_start.label("week_start"),
+        (MarketTrend.demand_score - func.lag(MarketTrend.demand_score).over(**window)).label("demand_change"),
+        case(
+            (previous_sales > 0, (MarketTrend.sales_volume - previous_sales) * 100.0 / previous_sales),
+            else_=None,
+        ).label("sales_change_percent"),
+        func.avg(MarketTrend.demand_score).over(**moving).label("demand_avg_4w"),
+        func.avg(MarketTrend.avg_price).over(**moving).label("price_avg_4w"),
+        func.row_number().over(**window).label("weeks_tracked"),
+    )
+    if plant_ids is not None:
+        # lag / row_number ต้องเห็นประวัติทั้งหมดของ plant - กรองสัปดาห์หลังคำนวณ window
+        windowed = windowed.where(MarketTrend.plant_id.in_(plant_ids))
+    windowed = windowed.subquery()
+
+    statement = select(
+        windowed.c.plant_id, windowed.c.week_start, windowed.c.demand_change, windowed.c.sales_change_percent,
+        windowed.c.demand_avg_4w, windowed.c.price_avg_4w, windowed.c.weeks_tracked,
+    )
+    if since is not None:
+        statement = statement.where(windowed.c.week_start >= since)
+    return statement
+
+
+def refresh_trend_rollups(db: Session, weeks: Optional[Iterable[date]] = None) -> Tuple[int, int]:
+    """Rebuild rollups for `weeks` (every week when None); caller commits.
+
+    Category rollups only depend on their own week. Plant rollups carry
+    lag / row_number across gaps in a plant's history, so every later week
+    of the plants touched by `weeks` is rebuilt as well.
+    """
+    plant_ids = since = None
+    clear_categories = delete(CategoryTrendWeekly)
+    clear_plants = delete(PlantTrendWeekly)
+    if weeks is not None:
+        weeks = sorted(set(weeks))
+        if not weeks:
+            return 0, 0
+        since = weeks[0]
+        # plant ที่มีแถวในสัปดาห์เหล่านี้ทั้งก่อนและหลังการแก้ไข (แถวที่ถูกลบ/ย้ายไป)
+        touched = union(
+            select(MarketTrend.plant_id).where(MarketTrend.week_start.in_(weeks)),
+            select(PlantTrendWeekly.plant_id).where(PlantTrendWeekly.week_start.in_(weeks)),
+        )
+        plant_ids = sorted(db.execute(touched).scalars())
+        clear_categories = clear_categories.where(CategoryTrendWeekly.week_start.in_(weeks))
+        clear_plants = clear_plants.where(
+            PlantTrendWeekly.plant_id.in_(plant_ids), PlantTrendWeekly.week_start >= since
+        )
+    db.execute(clear_categories)
+    db.execute(clear_plants)
+
+    categories = db.execute(insert(CategoryTrendWeekly).from_select(
+        ["week_start", "category", "plant_count", "total_search_volume", "total_sales_volume", "avg_price",
+         "avg_price_change_percent", "avg_demand_score", "avg_supply_score", "up_count", "down_count", "stable_count"],
+        _category_rollup_select(weeks),
+    )).rowcount
+    plants = 0
+    if plant_ids is None or plant_ids:
+        plants = db.execute(insert(PlantTrendWeekly).from_select(
+            ["plant_id", "week_start", "demand_change", "sales_change_percent", "demand_avg_4w", "price_avg_4w",
+             "weeks_tracked"],
+            _plant_rollup_select(plant_ids, since),
+        )).rowcount
+    return categories, plants
+
+
+def category_trends(db: Session, week_start: Optional[date] = None) -> Dict[str, Any]:
+    """Per-category rollup rows for one week (latest rolled-up week by default)"""
+    if week_start is None:
+        week_start = db.query(func.max(CategoryTrendWeekly.week_start)).scalar()
+    rows = db.query(CategoryTrendWeekly).filter(
+        CategoryTrendWeekly.week_start == week_start
+    ).order_by(CategoryTrendWeekly.total_sales_volume.desc(), CategoryTrendWeekly.category).all() if week_start else []
+    return {
+        "week_start": week_start,
+        "categories": [
+            {
+                "category": row.category.value,
+                "plant_count": row.plant_count,
+                "total_search_volume": row.total_search_volume,
+                "total_sales_volume": row.total_sales_volume,
+                "avg_price": row.avg_price,
+                "avg_price_change_percent": row.avg_price_change_percent,
+                "avg_demand_score": row.avg_demand_score,
+                "avg_supply_score": row.avg_supply_score,
+                "up_count": row.up_count,
+                "down_count": row.down_count,
+                "stable_count": row.stable_count,
+            }
+            for row in rows
+        ],
+    }
+
+
+# ---- trending ranking cache ----------------------------------------------
+
+TRENDING_FIELDS = (
+    "rank", "plant_id", "scientific_name", "common_name_th", "common_name_en", "category",
+    "popularity_score", "search_growth", "sales_growth", "price_growth", "social_mentions",
+)
+
+
+def _load_ranking(db: Session, week_start: date) -> List[tuple]:
+    rows = db.query(
+        TrendingPlant.rank,
+        TrendingPlant.plant_id,
+        Plant.scientific_name,
+        Plant.common_name_th,
+        Plant.common_name_en,
+        Plant.category,
+        TrendingPlant.popularity_score,
+        TrendingPlant.search_growth,
+        TrendingPlant.sales_growth,
+        TrendingPlant.price_growth,
+        TrendingPlant.social_mentions,
+    ).join(Plant, Plant.id == TrendingPlant.plant_id).filter(
+        TrendingPlant.week_start == week_start
+    ).order_by(TrendingPlant.rank).all()
+    return [
+        (row[0], row[1], row[2], row[3], row[4], row[5].value if row[5] else None, *row[6:])
+        for row in rows
+    ]
+
+
+def _refresh_ranking(week_start: date) -> List[tuple]:
+    db = SessionLocal()
+    try:
+        return _load_ranking(db, week_start)
+    finally:
+        db.close()
+
+
+def trending_ranking(db: Session, week_start: date, limit: int) -> List[Dict[str, Any]]:
+    """Top `limit` of the week's ranking; the full ranking is cached once per week (any limit is a slice)"""
+    if settings.CACHE_ENABLED:
+        ranking = response_cache.get_or_compute(
+            f"{settings.CACHE_KEY_PREFIX}:cache:trending:{week_start.isoformat()}",
+            lambda: _load_ranking(db, week_start),
+            lambda: _refresh_ranking(week_start),
+            TRENDING_CACHE_TTL, TRENDING_CACHE_STALE_TTL, (TRENDING_CACHE_TAG,),
+        )
+    else:
+        ranking = _load_ranking(db, week_start)
+    return [dict(zip(TRENDING_FIELDS, row)) for row in ranking[:limit]]
+
+
+@on_change(TrendingPlant, Plant)
+def _invalidate_trending(changeset: ChangeSet):
+    response_cache.invalidate_tags(TRENDING_CACHE_TAG)
+
+
+# ย้ายแถวไปสัปดาห์/plant อื่น หรือเปลี่ยน category ต้อง rebuild สัปดาห์เดิมด้วย
+track_previous(MarketTrend.week_start, MarketTrend.plant_id, Plant.category)
+
+
+def _refresh_weeks(weeks: Optional[Iterable[date]] = None, plant_ids: Optional[Iterable[int]] = None):
+    """Rebuild `weeks` (or every week `plant_ids` has trends in) on a session of its own"""
+    db = SessionLocal()
+    try:
+        if plant_ids is not None:
+            weeks = db.execute(
+                select(MarketTrend.week_start).distinct().where(MarketTrend.plant_id.in_(plant_ids))
+            ).scalars().all()
+        refresh_trend_rollups(db, weeks)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@on_change(MarketTrend)
+def _refresh_changed_weeks(changeset: ChangeSet):
+    known = {pk for pk, values in changeset.previous.items() if values.get("week_start")}
+    if changeset.bulk or changeset.deleted - known:
+        # bulk update / ลบแถวที่ไม่รู้สัปดาห์ - rebuild ทุกสัปดาห์
+        _refresh_weeks()
+        return
+    weeks = {
+        values["week_start"]
+        for values in (*changeset.upserted.values(), *changeset.previous.values()) if values.get("week_start")
+    }
+    if weeks:
+        _refresh_weeks(weeks)
+
+
+@on_change(Plant)
+def _refresh_recategorized_weeks(changeset: ChangeSet):
+    if changeset.bulk:
+        _refresh_weeks()
+        return
+    # writer แบบ Core (เช่น plant sync) ไม่ส่งค่าเดิม - ถือว่า category อาจเปลี่ยน
+    plant_ids = {
+        plant_id for plant_id in changeset.ids
+        if plant_id not in changeset.previous or "category" in changeset.previous[plant_id]
+    }
+    if plant_ids:
+        _refresh_weeks(plant_ids=plant_ids)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Price Analysis Benchmark for PlantDex
+Time /market/price-analysis statistics over a synthetic plant_prices table (default 1M rows)
+
+Compares the old ORM + Python loops implementation with analyze_prices
+(SQL percentiles on PostgreSQL, NumPy on other databases).
+
+Usage:
+    # SQLite scratch file (NumPy path)
+    python benchmarks/bench_price_analysis.py --rows 1000000
+
+    # PostgreSQL (SQL path) - use a scratch database, rows are deleted afterwards
+    DATABASE_URL=postgresql://... python benchmarks/bench_price_analysis.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/plantdex_bench_prices.db")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text
+
+from app.core.database import Base, SessionLocal, engine
+from app.models.plant import CareLevel, Plant, PlantCategory
+from app.models.price import PlantPrice
+from app.services.price_analysis import analyze_prices
+
+SOURCES = ["shopee", "lazada", "nursery", "facebook", "jj_market", "line_shop"]
+LOCATIONS = ["Bangkok", "Chiang Mai", "Nonthaburi", "Khon Kaen", "Phuket", "Chonburi"]
+BENCH_SCIENTIFIC_PREFIX = "Pricebench"
+
+
+def legacy_analysis(db, plant_id=None, location=None):
+    """The pre-optimisation endpoint body (ORM objects + Python loops)"""
+    query = db.query(PlantPrice)
+    if plant_id:
+        query = query.filter(PlantPrice.plant_id == plant_id)
+    if location:
+        query = query.filter(PlantPrice.seller_location.ilike(f"%{location}%"))
+    prices = query.all()
+    if not prices:
+        return None
+
+    price_values = [p.price for p in prices]
+    sources = {}
+    for price in prices:
+        sources.setdefault(price.source, []).append(price.price)
+    return {
+        "avg_price": sum(price_values) / len(price_values),
+        "min_price": min(price_values),
+        "max_price": max(price_values),
+        "by_source": {
+            source: {
+                "count": len(values),
+                "avg_price": sum(values) / len(values),
+                "min_price": min(values),
+                "max_price": max(values),
+            }
+            for source, values in sources.items()
+        },
+    }
+
+
+def seed(db, rows: int, plants: int) -> list:
+    print(f"   seeding {plants} plants and {rows:,} prices...")
+    rng = random.Random(9)
+    db.execute(insert(Plant), [
+        {
+            "scientific_name": f"{BENCH_SCIENTIFIC_PREFIX} {i}",
+            "common_name_th": f"ต้นทดสอบ {i}",
+            "common_name_en": f"Bench {i}",
+            "category": rng.choice(list(PlantCategory)),
+            "care_level": CareLevel.EASY,
+        }
+        for i in range(plants)
+    ])
+    plant_ids = [row.id for row in db.query(Plant.id).filter(Plant.scientific_name.like(f"{BENCH_SCIENTIFIC_PREFIX} %"))]
+
+    batch = []
+    for i in range(rows):
+        plant_id = rng.choice(plant_ids)
+        batch.append({
+            "plant_id": plant_id,
+            "source": rng.choice(SOURCES),
+            "price": round(rng.lognormvariate(5.5, 0.8), 2),
+            "seller_location": rng.choice(LOCATIONS),
+        })
+        if len(batch) == 50_000:
+            db.execute(insert(PlantPrice), batch)
+            batch = []
+    if batch:
+        db.execute(insert(PlantPrice), batch)
+    db.commit()
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ANALYZE plant_prices"))
+        db.commit()
+    return plant_ids
+
+
+def cleanup(db, plant_ids):
+    db.rollback()
+    db.query(PlantPrice).filter(PlantPrice.plant_id.in_(plant_ids)).delete(synchronize_session=False)
+    db.query(Plant).filter(Plant.id.in_(plant_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def timed(label, fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"📊 {label:<34} {best * 1000:9.1f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price analysis benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--plants", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the slow ORM implementation")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[Plant.__table__, PlantPrice.__table__])
+    db = SessionLocal()
+    plant_ids = []
+    try:
+        plant_ids = seed(db, args.rows, args.plants)
+        path = "SQL percentiles" if engine.dialect.name == "postgresql" else "NumPy"
+        print(f"🚀 Price analysis over {args.rows:,} rows ({engine.dialect.name}, {path})")
+
+        scenarios = [
+            ("unfiltered", {}),
+            ("one plant", {"plant_id": plant_ids[0]}),
+            ("location 'bang'", {"location": "bang"}),
+        ]
+        for label, filters in scenarios:
+            if not args.skip_legacy:
+                legacy = timed(f"legacy  {label}", lambda: legacy_analysis(db, **filters), args.repeat)
+                db.expunge_all()
+            new = timed(f"new     {label}", lambda: analyze_prices(db, **filters), args.repeat)
+            if not args.skip_legacy:
+                print(f"   -> {legacy / new:.1f}x faster")
+    finally:
+        if plant_ids:
+            cleanup(db, plant_ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Plant Search Benchmark for PlantDex
+Measure search latency over a synthetic catalogue (default 100k plants)
+
+Usage:
+    # in-process index (SQLite / fallback path)
+    python benchmarks/bench_search.py --plants 100000
+
+    # PostgreSQL tsvector path - use a scratch database, synthetic rows are inserted into plants
+    DATABASE_URL=postgresql://... python create_search_indexes.py
+    DATABASE_URL=postgresql://... python benchmarks/bench_search.py --backend postgres --plants 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+THAI_SYLLABLES = [
+    "มอน", "สเต", "อร่า", "ไทร", "ใบ", "สัก", "กุหลาบ", "หิน", "ฟิโล", "เดน", "ดรอน", "ยาง", "อินเดีย",
+    "กวัก", "มรกต", "พลู", "ด่าง", "ลิ้น", "มังกร", "เฟิร์น", "ข้าหลวง", "กระบอง", "เพชร", "ว่าน", "หาง",
+    "จระเข้", "โกสน", "บอน", "สี", "ชวน", "ชม", "แคค", "ตัส", "กล้วย", "ไม้", "ทอง", "เงิน", "ไหล",
+]
+LATIN_WORDS = [
+    "monstera", "ficus", "philodendron", "echeveria", "sansevieria", "calathea", "alocasia", "anthurium",
+    "pothos", "aglaonema", "begonia", "hoya", "peperomia", "dracaena", "zamioculcas", "aloe", "haworthia",
+    "orchid", "fern", "palm", "rubber", "snake", "money", "pink", "princess", "variegata", "albo", "gold",
+]
+DESCRIPTION_WORDS = ["ปลูก", "ง่าย", "ชอบ", "แดด", "รำไร", "น้ำ", "น้อย", "ทน", "ร้อน", "indoor", "bright", "light"]
+
+
+def synthetic_plants(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    categories = ["indoor", "outdoor", "succulent", "tropical", "cactus", "herb"]
+    care_levels = ["easy", "moderate", "difficult"]
+    plants = []
+    for i in range(1, count + 1):
+        genus = rng.choice(LATIN_WORDS).capitalize()
+        plants.append({
+            "id": i,
+            "scientific_name": f"{genus} {rng.choice(LATIN_WORDS)} bench{i}",
+            "common_name_th": "".join(rng.choice(THAI_SYLLABLES) for _ in range(rng.randint(2, 4))),
+            "common_name_en": " ".join(rng.choice(LATIN_WORDS).capitalize() for _ in range(rng.randint(1, 3))),
+            "description_th": " ".join(rng.choice(DESCRIPTION_WORDS) for _ in range(8)),
+            "description_en": None,
+            "category": rng.choice(categories),
+            "care_level": rng.choice(care_levels),
+            "is_trending": rng.random() < 0.05,
+            "is_rare": rng.random() < 0.1,
+        })
+    return plants
+
+
+def sample_queries(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.35:
+            queries.append(rng.choice(THAI_SYLLABLES) + rng.choice(THAI_SYLLABLES))
+        elif kind < 0.6:
+            word = rng.choice(LATIN_WORDS)
+            queries.append(word[:rng.randint(2, len(word))])  # พิมพ์ยังไม่จบคำ
+        elif kind < 0.85:
+            queries.append(f"{rng.choice(LATIN_WORDS)} {rng.choice(LATIN_WORDS)[:3]}")
+        else:
+            queries.append(rng.choice(THAI_SYLLABLES)[:2])
+    return queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(run_query: Callable[[str], int], queries: List[str]) -> Dict:
+    latencies = []
+    hits = 0
+    for q in queries:
+        started = time.perf_counter()
+        hits += run_query(q)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "queries": len(queries),
+        "avg_hits": hits / len(queries),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def bench_memory(plants: List[Dict], queries: List[str], include_descriptions: bool) -> Dict:
+    from app.models.plant import CareLevel, PlantCategory
+    from app.services.search import SEARCH_FIELDS, InMemorySearchIndex
+
+    index = InMemorySearchIndex()
+    started = time.perf_counter()
+    for plant in plants:
+        index.add(
+            plant["id"],
+            {name: plant[name] for name in SEARCH_FIELDS},
+            category=PlantCategory(plant["category"]),
+            care_level=CareLevel(plant["care_level"]),
+            is_trending=plant["is_trending"],
+            is_rare=plant["is_rare"],
+        )
+    print(f"   built in-process index in {time.perf_counter() - started:.2f}s")
+
+    return measure(lambda q: index.search(q, include_descriptions=include_descriptions).total, queries)
+
+
+def bench_postgres(plants: List[Dict], queries: List[str], include_descriptions: bool, keep: bool) -> Dict:
+    from sqlalchemy import insert
+
+    from app.core.database import SessionLocal
+    from app.models.plant import CareLevel, Plant, PlantCategory
+    from app.services.search import postgres_search_enabled, reindex_plants, search_plants
+
+    db = SessionLocal()
+    try:
+        if not postgres_search_enabled(db):
+            raise SystemExit("❌ plants.search_vector not found - run create_search_indexes.py first")
+
+        print("   inserting synthetic plants...")
+        rows = [
+            {
+                **{key: value for key, value in plant.items() if key != "id"},
+                "category": PlantCategory(plant["category"]),
+                "care_level": CareLevel(plant["care_level"]),
+            }
+            for plant in plants
+        ]
+        for start in range(0, len(rows), 5000):
+            db.execute(insert(Plant), rows[start:start + 5000])
+        db.commit()
+
+        bench_ids = [row.id for row in db.query(Plant.id).filter(Plant.scientific_name.like("% bench%")).all()]
+        started = time.perf_counter()
+        reindex_plants(db, bench_ids)
+        db.commit()
+        print(f"   indexed {len(bench_ids)} rows in {time.perf_counter() - started:.2f}s")
+
+        return measure(
+            lambda q: search_plants(db, q, include_descriptions=include_descriptions).total,
+            queries,
+        )
+    finally:
+        if not keep:
+            db.rollback()
+            db.query(Plant).filter(Plant.scientific_name.like("% bench%")).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plant search latency benchmark")
+    parser.add_argument("--backend", choices=["memory", "postgres"], default="memory")
+    parser.add_argument("--plants", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--descriptions", action="store_true", help="Search descriptions too (advanced search)")
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic rows in PostgreSQL")
+    args = parser.parse_args()
+
+    print(f"🚀 Search benchmark: backend={args.backend} plants={args.plants:,} queries={args.queries:,}")
+    plants = synthetic_plants(args.plants)
+    queries = sample_queries(args.queries)
+
+    if args.backend == "memory":
+        result = bench_memory(plants, queries, args.descriptions)
+    else:
+        result = bench_postgres(plants, queries, args.descriptions, args.keep)
+
+    print(
+        f"\n📊 p50 {result['p50_ms']:.2f} ms | p95 {result['p95_ms']:.2f} ms | "
+        f"p99 {result['p99_ms']:.2f} ms | mean {result['mean_ms']:.2f} ms | "
+        f"avg hits {result['avg_hits']:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
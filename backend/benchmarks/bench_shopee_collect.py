@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Shopee Collection Benchmark for PlantDex
+Compare the old sequential crawl with ShopeeClient.search_many against a local stub API
+
+The stub serves paginated item/search results with configurable latency and
+transient 429/503 errors, so no Shopee credentials or network are needed.
+
+Usage:
+    python benchmarks/bench_shopee_collect.py --keywords 7 --items 500 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shopee_client import SEARCH_PAGE_SIZE, ShopeeClient
+
+
+def make_stub_handler(items_per_keyword: int, latency: float, error_rate: float, seed: int = 1):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class StubShopeeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict, headers: Dict = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            with rng_lock:
+                roll = rng.random()
+            if roll < error_rate / 2:
+                return self._send(429, {"error": "rate_limited"}, {"Retry-After": "0.05"})
+            if roll < error_rate:
+                return self._send(503, {"error": "unavailable"})
+
+            url = urlparse(self.path)
+            if not url.path.endswith("/item/search"):
+                return self._send(404, {"error": "not_found"})
+            query = parse_qs(url.query)
+            keyword = query.get("keyword", [""])[0]
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", [str(SEARCH_PAGE_SIZE)])[0])
+            end = min(items_per_keyword, offset + limit)
+            base = abs(hash(keyword)) % 1_000_000 * 10_000
+            items = [
+                {
+                    "item_id": base + i,
+                    "name": f"{keyword} #{i}",
+                    "price": (100 + i % 900) * 100000,
+                    "shop_id": i % 97,
+                    "category_name": "Live Plants",
+                }
+                for i in range(offset, end)
+            ]
+            self._send(200, {
+                "error": None,
+                "response": {"items": items, "has_next_page": end < items_per_keyword, "next_offset": end},
+            })
+
+    return StubShopeeHandler
+
+
+def sequential_crawl(base_url: str, keywords, limit: int) -> Dict:
+    """The pre-pipeline behaviour: one keyword at a time, new connection per request, no retries"""
+    items = 0
+    requests_made = 0
+    for keyword in keywords:
+        offset = 0
+        while offset < limit:
+            requests_made += 1
+            response = requests.get(
+                f"{base_url}/api/v2/item/search",
+                params={"keyword": keyword, "offset": offset, "limit": min(SEARCH_PAGE_SIZE, limit - offset)},
+            )
+            if response.status_code != 200:
+                break  # โค้ดเดิมไม่ retry - หน้าที่เหลือของ keyword นี้หายไป
+            payload = response.json()["response"]
+            items += len(payload["items"])
+            if not payload["has_next_page"]:
+                break
+            offset = payload["next_offset"]
+    return {"items": items, "requests": requests_made, "retries": 0}
+
+
+def concurrent_crawl(base_url: str, keywords, limit: int, workers: int, rate: float) -> Dict:
+    client = ShopeeClient(
+        base_url=base_url,
+        rate_limits={"item/search": (rate, int(rate))},
+        max_workers=workers,
+        backoff_base=0.05,
+        verbose=False,
+    )
+    try:
+        items = sum(len(page) for _, page in client.search_many(keywords, limit))
+        return {"items": items, **client.stats}
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shopee collection pipeline benchmark (local stub server)")
+    parser.add_argument("--keywords", type=int, default=7)
+    parser.add_argument("--items", type=int, default=500, help="Items per keyword")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of 429/503 responses")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=100.0, help="Token bucket rate for item/search (req/s)")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_stub_handler(args.items, args.latency, args.error_rate)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    keywords = [f"plant-{i}" for i in range(args.keywords)]
+    expected = args.keywords * args.items
+
+    print(
+        f"🚀 Shopee collection benchmark: {args.keywords} keywords x {args.items} items, "
+        f"latency {args.latency * 1000:.0f} ms, errors {args.error_rate:.0%}"
+    )
+    runs = []
+    if not args.skip_sequential:
+        runs.append(("sequential", lambda: sequential_crawl(base_url, keywords, args.items)))
+    runs.append((
+        f"concurrent x{args.workers}",
+        lambda: concurrent_crawl(base_url, keywords, args.items, args.workers, args.rate),
+    ))
+
+    for label, run in runs:
+        started = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - started
+        print(
+            f"📊 {label:<16} {elapsed:6.2f}s | {result['items']:,}/{expected:,} items | "
+            f"{result['requests']} requests ({result['requests'] / elapsed:.0f}/s) | {result['retries']} retries"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
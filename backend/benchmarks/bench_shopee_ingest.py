@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Shopee Ingestion Benchmark for PlantDex
+Compare per-product saves with BulkProductWriter on synthetic Shopee payloads
+
+Use a scratch PostgreSQL database with the Shopee tables (create_shopee_tables.py).
+Synthetic rows use item_ids >= 9e12 and are deleted afterwards unless --keep.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_shopee_ingest.py --products 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shopee_ingest import BulkProductWriter, parse_product
+
+ITEM_ID_BASE = 9_000_000_000_000
+SHOP_ID_BASE = 9_000_000_000
+
+
+def synthetic_products(count: int, seed: int = 3) -> List[Dict]:
+    rng = random.Random(seed)
+    categories = ["Live Plants", "Succulents", "Cactus", "Bonsai", "Seeds"]
+    products = []
+    for i in range(count):
+        price = rng.randint(49, 2500) * 100000
+        products.append({
+            "item_id": ITEM_ID_BASE + i,
+            "name": f"ต้นไม้ทดสอบ bench #{i}",
+            "price": price,
+            "original_price": int(price * rng.choice([1, 1, 1.2, 1.5])),
+            "category_name": rng.choice(categories),
+            "shop_id": SHOP_ID_BASE + rng.randint(0, count // 40),
+            "shop_name": f"bench shop {i % 977}",
+            "item_rating": {"rating_star": round(rng.uniform(3, 5), 1)},
+            "historical_sold": rng.randint(0, 5000),
+            "images": [f"img{i}a", f"img{i}b"],
+        })
+    return products
+
+
+def bench_per_product(database_url: str, products: List[Dict]) -> float:
+    """Old save_product behaviour: new connection, three statements and a commit per product"""
+    started = time.perf_counter()
+    for product in products:
+        conn = psycopg2.connect(database_url)
+        try:
+            writer = BulkProductWriter(conn, verbose=False)
+            with conn.cursor() as cursor:
+                writer._write_batch(cursor, [parse_product(product)])
+            conn.commit()
+        finally:
+            conn.close()
+    return time.perf_counter() - started
+
+
+def bench_bulk(database_url: str, products: List[Dict], batch_size: int) -> BulkProductWriter:
+    conn = psycopg2.connect(database_url)
+    try:
+        with BulkProductWriter(conn, batch_size=batch_size, verbose=False) as writer:
+            writer.add_many(products)
+        return writer
+    finally:
+        conn.close()
+
+
+def cleanup(database_url: str):
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM price_history WHERE item_id >= %s", (ITEM_ID_BASE,))
+            cursor.execute("DELETE FROM shopee_products WHERE item_id >= %s", (ITEM_ID_BASE,))
+            cursor.execute("DELETE FROM shopee_shops WHERE shop_id >= %s", (SHOP_ID_BASE,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shopee bulk ingestion benchmark")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--per-product-sample", type=int, default=1000,
+                        help="Products written the old way (extrapolated to --products)")
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic rows")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url or not database_url.startswith("postgres"):
+        raise SystemExit("❌ Set DATABASE_URL to a scratch PostgreSQL database")
+
+    products = synthetic_products(args.products)
+    print(f"🚀 Shopee ingestion benchmark: {args.products:,} products, batch size {args.batch_size}")
+
+    try:
+        if args.per_product_sample:
+            sample = products[:args.per_product_sample]
+            elapsed = bench_per_product(database_url, sample)
+            rate = len(sample) / elapsed
+            print(
+                f"📊 per product  {len(sample):,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s) "
+                f"-> ~{args.products / rate / 60:.1f} min for {args.products:,}"
+            )
+            cleanup(database_url)
+
+        writer = bench_bulk(database_url, products, args.batch_size)
+        print(f"📊 bulk         {writer.summary()}")
+
+        # รอบสอง: collector รันซ้ำโดยไม่มีอะไรเปลี่ยน
+        writer = bench_bulk(database_url, products, args.batch_size)
+        print(f"📊 rerun same   {writer.summary()}")
+
+        # รอบสาม: ราคาเปลี่ยน 5%, ยอดขายเปลี่ยน 20%
+        rng = random.Random(11)
+        for product in products:
+            roll = rng.random()
+            if roll < 0.05:
+                product["price"] += 100000
+            elif roll < 0.25:
+                product["historical_sold"] += 1
+        writer = bench_bulk(database_url, products, args.batch_size)
+        print(f"📊 rerun mixed  {writer.summary()}")
+    finally:
+        if not args.keep:
+            cleanup(database_url)
+
+
+if __name__ == "__main__":
+    main()
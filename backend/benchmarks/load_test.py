@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Concurrent Load Benchmark for PlantDex API
+Fire concurrent requests at a running server and report throughput/latency
+
+Usage:
+    # terminal 1 - threadpool mode
+    DB_ASYNC_ENABLED=false uvicorn main:app --port 8000
+    # terminal 2
+    python benchmarks/load_test.py --base-url http://localhost:8000 --concurrency 50 --requests 2000
+
+    # then restart the server with DB_ASYNC_ENABLED=true and run again to compare
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+DEFAULT_ENDPOINTS = [
+    "/api/v1/plants/market-data",
+    "/api/v1/plants/quick-stats",
+    "/api/v1/plants/search/advanced?q=mon",
+    "/api/v1/shopee/products/stats",
+    "/api/v1/market-intelligence/index",
+]
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    # หนึ่ง session ต่อ thread เพื่อใช้ keep-alive
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _hit(url: str, timeout: float):
+    started = time.perf_counter()
+    try:
+        status = _session().get(url, timeout=timeout).status_code
+    except requests.RequestException:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_load(base_url: str, endpoints: List[str], total_requests: int, concurrency: int, timeout: float) -> Dict:
+    urls = [base_url.rstrip("/") + endpoints[i % len(endpoints)] for i in range(total_requests)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda url: _hit(url, timeout), urls))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    errors = sum(1 for status, _ in results if status == 0 or status >= 500)
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the PlantDex API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Concurrency levels to test")
+    parser.add_argument("--endpoint", action="append", help="Endpoint path (repeatable); defaults to the async DB endpoints")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    endpoints = args.endpoint or DEFAULT_ENDPOINTS
+
+    print(f"🚀 Load testing {args.base_url}")
+    for path in endpoints:
+        print(f"   - {path}")
+
+    # warm up connection pools / caches
+    run_load(args.base_url, endpoints, len(endpoints), 1, args.timeout)
+
+    print(f"\n{'conc':>6} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for concurrency in args.concurrency:
+        result = run_load(args.base_url, endpoints, args.requests, concurrency, args.timeout)
+        print(
+            f"{concurrency:>6} {result['throughput_rps']:>10.1f} {result['p50_ms']:>10.1f} "
+            f"{result['p95_ms']:>10.1f} {result['p99_ms']:>10.1f} {result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
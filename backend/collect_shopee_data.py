@@ -6,10 +6,13 @@ Collect plant data from Shopee and store in database
 
 import psycopg2
 import os
-import json
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 from shopee_client import ShopeeClient
+from shopee_ingest import DEFAULT_BATCH_SIZE, BulkProductWriter
+from app.core.cache import response_cache
+from app.services.price_history import ensure_partitions, is_partitioned
 
 # Load environment variables
 load_dotenv('../env.production')
@@ -19,7 +22,7 @@ class ShopeeDataCollector:
     
     def __init__(self):
         self.database_url = os.getenv('DATABASE_URL')
-        self.shopee_client = ShopeeClient()
+        self.shopee_client = ShopeeClient(max_workers=int(os.getenv('SHOPEE_MAX_WORKERS', '8')))
         
         if not self.database_url:
             raise ValueError("DATABASE_URL not found in environment variables")
@@ -30,104 +33,28 @@ class ShopeeDataCollector:
     
     def save_product(self, product_data: dict) -> bool:
         """Save product data to database"""
+        conn = None
         try:
             conn = self.connect_db()
-            cursor = conn.cursor()
-            
-            # Extract data from Shopee response
-            item_id = product_data.get('item_id')
-            name = product_data.get('name', '')
-            price = product_data.get('price', 0) / 100000  # Convert from Shopee format
-            original_price = product_data.get('original_price', 0) / 100000
-            category = product_data.get('category_name', '')
-            shop_name = product_data.get('shop_name', '')
-            shop_id = product_data.get('shop_id')
-            rating = product_data.get('item_rating', {}).get('rating_star', 0)
-            sold_count = product_data.get('historical_sold', 0)
-            view_count = product_data.get('view_count', 0)
-            like_count = product_data.get('like_count', 0)
-            description = product_data.get('description', '')
-            
-            # Handle images
-            primary_image = ""
-            additional_images = []
-            
-            if product_data.get('images'):
-                images = product_data['images']
-                if images:
-                    primary_image = f"https://cf.shopee.co.th/file/{images[0]}"
-                    additional_images = [f"https://cf.shopee.co.th/file/{img}" for img in images[1:]]
-            
-            # Insert or update product
-            cursor.execute("""
-                INSERT INTO shopee_products (
-                    item_id, name, price, original_price, category, shop_name, 
-                    shop_id, rating, sold_count, view_count, like_count, 
-                    description, primary_image_url, additional_images, updated_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                ON CONFLICT (item_id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    price = EXCLUDED.price,
-                    original_price = EXCLUDED.original_price,
-                    category = EXCLUDED.category,
-                    shop_name = EXCLUDED.shop_name,
-                    rating = EXCLUDED.rating,
-                    sold_count = EXCLUDED.sold_count,
-                    view_count = EXCLUDED.view_count,
-                    like_count = EXCLUDED.like_count,
-                    description = EXCLUDED.description,
-                    primary_image_url = EXCLUDED.primary_image_url,
-                    additional_images = EXCLUDED.additional_images,
-                    updated_at = NOW()
-                RETURNING id;
-            """, (
-                item_id, name, price, original_price, category, shop_name,
-                shop_id, rating, sold_count, view_count, like_count,
-                description, primary_image, json.dumps(additional_images)
-            ))
-            
-            product_id = cursor.fetchone()[0]
-            
-            # Save price history
-            if price > 0:
-                cursor.execute("""
-                    INSERT INTO price_history (item_id, price, original_price, discount_percentage)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    item_id, 
-                    price, 
-                    original_price,
-                    ((original_price - price) / original_price * 100) if original_price > price else 0
-                ))
+            writer = BulkProductWriter(conn, verbose=False)
+            writer.add(product_data)
+            writer.flush()
             
-            # Save shop info
-            if shop_id:
-                cursor.execute("""
-                    INSERT INTO shopee_shops (shop_id, shop_name, created_at, updated_at)
-                    VALUES (%s, %s, NOW(), NOW())
-                    ON CONFLICT (shop_id) DO UPDATE SET
-                        shop_name = EXCLUDED.shop_name,
-                        updated_at = NOW()
-                """, (shop_id, shop_name))
-            
-            conn.commit()
-            print(f"✅ Saved product: {name[:50]}... (ID: {product_id})")
+            if not writer.rows_written:
+                return False
+            print(f"✅ Saved product: {product_data.get('name', '')[:50]}... (item {product_data.get('item_id')})")
             return True
             
         except Exception as e:
             print(f"❌ Error saving product {product_data.get('name', 'Unknown')}: {e}")
-            if conn:
-                conn.rollback()
             return False
             
         finally:
-            if cursor:
-                cursor.close()
             if conn:
                 conn.close()
     
-    def collect_plants(self, keywords: list = None, limit_per_keyword: int = 20):
-        """Collect plant data for multiple keywords"""
+    def collect_plants(self, keywords: list = None, limit_per_keyword: int = 20, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Collect plant data for multiple keywords (pages fetched concurrently)"""
         if keywords is None:
             keywords = [
                 "ต้นไม้มีชีวิต",
@@ -139,32 +66,49 @@ class ShopeeDataCollector:
                 "ไม้ใบ"
             ]
         
-        total_collected = 0
+        keywords = list(dict.fromkeys(keywords))
+        found_per_keyword = {keyword: 0 for keyword in keywords}
+        seen_items = set()  # สินค้าเดียวกันมักติดหลาย keyword - บันทึกครั้งเดียวต่อรอบ
+        started = time.perf_counter()
         
-        for keyword in keywords:
-            print(f"\n🔍 Collecting data for keyword: '{keyword}'")
+        print(f"\n🔍 Collecting {len(keywords)} keywords with {self.shopee_client.max_workers} workers...")
+        conn = self.connect_db()
+        try:
+            # partition ของเดือนนี้ต้องมีก่อนเขียน (ไม่งั้นแถวไปกองที่ default partition)
+            with conn.cursor() as cursor:
+                if is_partitioned(cursor):
+                    ensure_partitions(cursor, months_ahead=1)
+            conn.commit()
             
-            try:
-                # Search for plants
-                plants = self.shopee_client.search_plants(keyword, limit_per_keyword)
-                
-                if plants:
-                    print(f"📊 Found {len(plants)} products for '{keyword}'")
-                    
-                    # Save each product
-                    for plant in plants:
-                        if self.save_product(plant):
-                            total_collected += 1
-                        
-                        # Small delay to avoid rate limiting
-                        import time
-                        time.sleep(0.1)
-                else:
-                    print(f"⚠️ No products found for '{keyword}'")
-                    
-            except Exception as e:
-                print(f"❌ Error collecting data for '{keyword}': {e}")
-                continue
+            # เขียนเป็น batch (commit ต่อ batch) แทนทีละสินค้า
+            with BulkProductWriter(conn, batch_size=batch_size) as writer:
+                for keyword, items in self.shopee_client.search_many(keywords, limit_per_keyword):
+                    found_per_keyword[keyword] += len(items)
+                    fresh = [item for item in items if item.get('item_id') not in seen_items]
+                    seen_items.update(item.get('item_id') for item in fresh)
+                    writer.add_many(fresh)
+        finally:
+            conn.close()
+        total_collected = writer.rows_written
+        
+        for keyword, found in found_per_keyword.items():
+            if found:
+                print(f"📊 Found {found} products for '{keyword}'")
+            else:
+                print(f"⚠️ No products found for '{keyword}'")
+        
+        elapsed = time.perf_counter() - started
+        client_stats = self.shopee_client.stats
+        print(
+            f"⏱️ {elapsed:.1f}s | {client_stats['requests']} requests, "
+            f"{client_stats['retries']} retries, {client_stats['failures']} failures"
+        )
+        if writer.summary():
+            print(f"💾 {writer.summary()}")
+        
+        if total_collected:
+            # API responses built from shopee_products are now out of date
+            response_cache.invalidate_tags("shopee", "market-intelligence")
         
         print(f"\n🎉 Data collection completed!")
         print(f"📊 Total products collected: {total_collected}")
@@ -197,7 +141,7 @@ class ShopeeDataCollector:
             """)
             price_stats = cursor.fetchone()
             
-            # Recent updates
+            # Recent changes (updated_at only moves when the listing changed)
             cursor.execute("""
                 SELECT COUNT(*) 
                 FROM shopee_products 
@@ -207,7 +151,7 @@ class ShopeeDataCollector:
             
             print(f"\n📊 Collection Statistics:")
             print(f"   Total Products: {total_products}")
-            print(f"   Recent Updates (24h): {recent_updates}")
+            print(f"   Changed in last 24h: {recent_updates}")
             
             if price_stats[0]:
                 print(f"   Price Range: ฿{price_stats[0]:.2f} - ฿{price_stats[1]:.2f}")
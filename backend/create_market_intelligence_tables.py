@@ -6,6 +6,7 @@ Core tables for market intelligence and investment analysis
 import psycopg2
 import os
 from dotenv import load_dotenv
+from app.services.batch_jobs import install_batch_job_runs
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -156,6 +157,10 @@ def create_market_intelligence_tables():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_sentiment_timestamp ON market_sentiment_log(timestamp);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_portfolio_plant_id ON investment_portfolio_tracking(plant_id);")
         
+        # 7. Batch job runs (run_market_intelligence.py บันทึกเวลาและจำนวนแถวที่นี่)
+        print("🔨 Creating batch_job_runs table...")
+        install_batch_job_runs(cursor)
+        
         # Commit changes
         conn.commit()
         
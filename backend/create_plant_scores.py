@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Create Plant Investment Scores for PlantDex
+Score the whole catalogue into plant_scores (sortable/filterable in /plants/search/advanced)
+
+Plant edits made through the API rescore the affected plants automatically;
+re-run this after bulk imports or when the scoring rules change.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models.plant import PlantScore
+from app.services.plant_scores import MODEL_VERSION, refresh_plant_scores
+
+def create_plant_scores():
+    """Create plant_scores and recompute every score"""
+    db = SessionLocal()
+
+    try:
+        PlantScore.__table__.create(bind=engine, checkfirst=True)
+
+        started = time.perf_counter()
+        rows = refresh_plant_scores(db)
+        db.commit()
+        print(f"✅ Scored {rows} plants with {MODEL_VERSION} in {time.perf_counter() - started:.2f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error scoring plants: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Scoring PlantDex catalogue...")
+    if create_plant_scores():
+        print("\n🎉 Investment scores are ready")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Create Plant Price Summaries for PlantDex
+Per plant and source price statistics behind /plants/{plant_id}/prices
+
+Writes made through the API refresh the affected plants automatically.
+Re-run this script after bulk imports that bypass the app (it rebuilds
+every summary from plant_prices).
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models.price import PlantPrice, PlantPriceSummary
+from app.services.price_summary import refresh_price_summaries
+
+def create_price_summaries():
+    """Create plant_price_summaries and rebuild it from plant_prices"""
+    db = SessionLocal()
+
+    try:
+        PlantPriceSummary.__table__.create(bind=engine, checkfirst=True)
+        for index in PlantPrice.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+        print("🔄 Rebuilding price summaries...")
+        started = time.perf_counter()
+        rows = refresh_price_summaries(db)
+        db.commit()
+        print(f"✅ {rows} plant/source summaries in {time.perf_counter() - started:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error creating price summaries: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Creating plant price summaries for PlantDex...")
+    if create_price_summaries():
+        print("\n🎉 /plants/{plant_id}/prices now reads the precomputed summaries")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Create Plant Search Index for PlantDex
+Adds plants.search_vector (tsvector + GIN index) and backfills it
+
+PostgreSQL only - SQLite uses the in-process search index automatically.
+Re-run after bulk imports that bypass the ORM (e.g. COPY).
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, engine
+from app.services.search import SEARCH_VECTOR_COLUMN, reindex_plants
+
+
+def create_search_indexes():
+    """Add the search_vector column and GIN index, then backfill every plant"""
+    if engine.dialect.name != "postgresql":
+        print("⚠️ Not a PostgreSQL database - search uses the in-process index, nothing to do")
+        return False
+
+    db = SessionLocal()
+    try:
+        print("🔨 Adding plants.search_vector column...")
+        db.execute(text(f"ALTER TABLE plants ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector"))
+
+        print("🔨 Creating GIN index idx_plants_search_vector...")
+        db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_plants_search_vector ON plants USING GIN ({SEARCH_VECTOR_COLUMN})"
+        ))
+        db.commit()
+
+        print("🔄 Backfilling search vectors...")
+        started = time.perf_counter()
+        updated = reindex_plants(db)
+        db.commit()
+        db.execute(text("ANALYZE plants"))
+        db.commit()
+        print(f"✅ Indexed {updated} plants in {time.perf_counter() - started:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error creating search index: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🚀 Creating plant search index for PlantDex...")
+    if create_search_indexes():
+        print("\n🎉 Search index ready - restart the API to switch to the PostgreSQL search path")
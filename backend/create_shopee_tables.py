@@ -7,6 +7,8 @@ Simple tables to get started with Shopee data collection
 import psycopg2
 import os
 from dotenv import load_dotenv
+from create_shopee_stats import install_shopee_stats
+from app.services.price_history import ensure_partitions, migrate_to_partitioned
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -54,25 +56,18 @@ def create_shopee_tables():
                 primary_image_url TEXT,
                 additional_images JSON,
                 item_status VARCHAR(20) DEFAULT 'NORMAL',
+                content_hash CHAR(32),
                 created_at TIMESTAMP DEFAULT NOW(),
                 updated_at TIMESTAMP DEFAULT NOW()
             );
         """)
+        # ฐานข้อมูลเดิม - fingerprint สำหรับข้ามสินค้าที่ไม่เปลี่ยน (shopee_ingest.py)
+        cursor.execute("ALTER TABLE shopee_products ADD COLUMN IF NOT EXISTS content_hash CHAR(32);")
         
-        # 2. Price History Table (ดูเทรนด์ราคา)
-        print("🔨 Creating price_history table...")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_history (
-                id SERIAL PRIMARY KEY,
-                item_id BIGINT NOT NULL,
-                price DECIMAL(10,2) NOT NULL,
-                original_price DECIMAL(10,2),
-                discount_percentage DECIMAL(5,2),
-                recorded_at TIMESTAMP DEFAULT NOW(),
-                
-                FOREIGN KEY (item_id) REFERENCES shopee_products(item_id)
-            );
-        """)
+        # 2. Price History Table (ดูเทรนด์ราคา) - partition รายเดือน, เดือนเก่าย่อเป็น OHLC รายวัน
+        print("🔨 Creating partitioned price_history table...")
+        migrate_to_partitioned(cursor)
+        ensure_partitions(cursor)
         
         # 3. Shop Information Table
         print("🔨 Creating shopee_shops table...")
@@ -98,9 +93,13 @@ def create_shopee_tables():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopee_category ON shopee_products(category);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopee_price ON shopee_products(price);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopee_shop_id ON shopee_products(shop_id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_item ON price_history(item_id, recorded_at);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopee_created_id ON shopee_products(created_at DESC NULLS LAST, id DESC);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_shopee_shops_id ON shopee_shops(shop_id);")
         
+        # 4. Stats tables (อัปเดตด้วย trigger ทุกครั้งที่ shopee_products เปลี่ยน)
+        print("🔨 Creating Shopee stats tables and triggers...")
+        install_shopee_stats(cursor)
+        
         # Commit changes
         conn.commit()
         
@@ -144,5 +143,6 @@ if __name__ == "__main__":
         print("   1. Test Shopee API connection")
         print("   2. Collect initial plant data")
         print("   3. Display data in frontend")
+        print("   4. Schedule maintain_price_history.py daily (partitions + rollups)")
     else:
         print("\n❌ Database setup failed!") 
\ No newline at end of file
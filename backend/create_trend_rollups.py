@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Create Market Trend Rollups for PlantDex
+Weekly per-category and per-plant aggregates behind /market/trends
+
+Trend rows written through the app refresh their weeks automatically;
+re-run this after loading market_trends in bulk (rebuilds every week).
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models.market import CategoryTrendWeekly, PlantTrendWeekly
+from app.services.trend_rollups import refresh_trend_rollups
+
+def create_trend_rollups():
+    """Create the rollup tables and rebuild them from market_trends"""
+    db = SessionLocal()
+
+    try:
+        for model in (CategoryTrendWeekly, PlantTrendWeekly):
+            model.__table__.create(bind=engine, checkfirst=True)
+
+        started = time.perf_counter()
+        categories, plants = refresh_trend_rollups(db)
+        db.commit()
+        print(f"✅ {categories} category-weeks and {plants} plant-weeks in {time.perf_counter() - started:.2f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error creating trend rollups: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Creating market trend rollups for PlantDex...")
+    if create_trend_rollups():
+        print("\n🎉 /market/trends now reads the weekly rollups")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Demand Forecasting for PlantDex
+Refit weekly demand forecasts for every plant and store them in demand_forecasts
+
+Run after market_trends is updated (weekly cron). /market/demand-forecast
+only reads the stored rows.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models.market import DemandForecast
+from app.services.forecasting import generate_demand_forecasts
+
+def forecast_demand():
+    """Fit all plants and replace the stored forecasts in one transaction"""
+    db = SessionLocal()
+
+    try:
+        DemandForecast.__table__.create(bind=engine, checkfirst=True)
+
+        started = time.perf_counter()
+        rows = generate_demand_forecasts(db)
+        db.commit()
+        print(f"✅ Stored {rows} weekly forecasts in {time.perf_counter() - started:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error forecasting demand: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Forecasting plant demand for PlantDex...")
+    if forecast_demand():
+        print("\n🎉 /market/demand-forecast now serves the new forecasts")
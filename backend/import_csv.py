@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+CSV Import for PlantDex
+Load sellers, plants and the detailed plant CSVs with the same chunked
+engine as /admin/import-jobs
+
+    python import_csv.py plants.csv --type plants
+    python import_csv.py --dir . --on-conflict update
+"""
+
+import sys
+import os
+import argparse
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.csv_import import CHUNK_SIZE, ON_CONFLICT_MODES
+from app.services.csv_types import CSV_TYPES, import_csv
+
+def import_file(path, csv_type, on_conflict="skip", chunk_size=CHUNK_SIZE):
+    """Import one CSV file in its own transaction"""
+    db = SessionLocal()
+    total_bytes = os.path.getsize(path) or 1
+
+    try:
+        with open(path, "rb") as raw:
+            stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+            def progress(report):
+                percent = 100.0 * raw.tell() / total_bytes
+                print(f"\r   {csv_type}: {report.rows_read} rows ({percent:.0f}%, {report.rows_per_second:.0f} rows/s)",
+                      end="", flush=True)
+
+            report = import_csv(db, csv_type, stream, on_conflict, chunk_size, progress)
+            db.commit()
+        print()
+
+        print(f"✅ {os.path.basename(path)}: {report.inserted} inserted, {report.updated} updated, "
+              f"{report.skipped} skipped, {report.failed} failed in {report.elapsed_seconds:.2f}s")
+        for error in report.errors[:10]:
+            print(f"   ⚠️  line {error['line']} ({error['key']}): {error['error']}")
+        if report.failed > 10:
+            print(f"   ... and {report.failed - 10} more errors")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error importing {path}: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Import PlantDex CSV files")
+    parser.add_argument("file", nargs="?", help="CSV file to import (requires --type)")
+    parser.add_argument("--type", choices=list(CSV_TYPES), help="CSV type of FILE")
+    parser.add_argument("--dir", help="import every <csv_type>.csv found in this directory, parents first")
+    parser.add_argument("--on-conflict", choices=ON_CONFLICT_MODES, default="skip")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.dir:
+        jobs = [(os.path.join(args.dir, f"{csv_type}.csv"), csv_type) for csv_type in CSV_TYPES]
+        jobs = [(path, csv_type) for path, csv_type in jobs if os.path.exists(path)]
+        if not jobs:
+            parser.error(f"no known CSV files in {args.dir}")
+    elif args.file and args.type:
+        jobs = [(args.file, args.type)]
+    else:
+        parser.error("give FILE with --type, or --dir")
+
+    print("🚀 Importing CSV data into PlantDex...")
+    ok = True
+    for path, csv_type in jobs:
+        print(f"📥 {path} -> {csv_type}")
+        # แม่ล้มแล้วลูกจะติด foreign key ทั้งไฟล์ - หยุดเลย
+        if not import_file(path, csv_type, args.on_conflict, args.chunk_size):
+            ok = False
+            break
+
+    if ok:
+        print("\n🎉 CSV import completed")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ import csv
 import os
 from datetime import datetime
 from sqlalchemy.orm import Session
+from app.core.cache import response_cache
 from app.core.database import SessionLocal
 from app.models.plant import Plant
 from app.models.plant_detailed import (
@@ -16,6 +17,7 @@ from app.models.plant_detailed import (
 )
 from app.models.user import Seller
 from app.models.market import MarketTrend, PlantPriceIndex, TrendingPlant
+from app.services.plant_scores import refresh_plant_scores
 
 def import_plants_from_csv(db: Session, csv_file: str):
     """นำข้อมูลพืชจาก CSV"""
@@ -306,6 +308,13 @@ def main():
         import_plant_shipping_infos_from_csv(db, 'plant_shipping_infos.csv')
         import_plant_prices_detailed_from_csv(db, 'plant_prices_detailed.csv')
         
+        # คำนวณคะแนนลงทุนใหม่ทั้ง catalogue (script นี้ไม่ผ่าน API listener)
+        print(f"  📈 คำนวณคะแนนลงทุน {refresh_plant_scores(db)} รายการ")
+        db.commit()
+        
+        # ล้าง response cache ของ API (มีผลข้าม process เมื่อใช้ Redis)
+        response_cache.invalidate_tags("plants", "price-index")
+        
         print("\n🎉 การนำเข้าข้อมูลเสร็จสิ้น!")
         
     except Exception as e:
@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.db_pool import close_pool
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.query_profile import DEBUG_HEADERS, QueryProfileMiddleware
+from app.core.async_database import dispose_async_engine
+from app.services.autocomplete import build_autocomplete_index
+from app.services.import_jobs import import_jobs
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -17,11 +24,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, *(DEBUG_HEADERS if settings.DEBUG else ())],
 )
 
+# นับ query ต่อ request (header ใน DEBUG, fail เมื่อเกิน budget ถ้า QUERY_BUDGET_ENFORCE)
+app.add_middleware(QueryProfileMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def build_search_indexes():
+    try:
+        await run_in_threadpool(build_autocomplete_index)
+    except Exception as e:
+        # index จะถูก build ตอนมี request แรกแทน
+        print(f"Warning: could not build autocomplete index: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    import_jobs.shutdown()
+    close_pool()
+    await dispose_async_engine()
+
 @app.get("/")
 def read_root():
     return {
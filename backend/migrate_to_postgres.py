@@ -2,138 +2,219 @@
 """
 Migration script: SQLite to PostgreSQL
 ใช้เมื่อต้องการย้ายข้อมูลจาก development ไป production
+
+Every table in app.models (sell-to-us included) is streamed in primary key
+order, BATCH_SIZE rows at a time, and written with COPY. Primary keys are
+kept and id sequences are moved past them. Each batch commits together
+with its checkpoint row, so an interrupted run continues where it stopped:
+
+    DATABASE_URL=postgresql://... python migrate_to_postgres.py
+    python migrate_to_postgres.py --source sqlite:///./plantdex.db --restart
 """
 
 import sys
 import os
+import argparse
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from app.models import Plant, PlantPrice, User, Seller, PlantListing
-from app.core.config import settings
-import os
+from sqlalchemy import create_engine, inspect, text
+import app.models  # noqa: F401 - register every model on Base.metadata
+from app.core.database import Base
+from app.models.sell_to_us import Base as SellToUsBase
+from app.services.bulk_loader import copy_rows
+
+SQLITE_URL = "sqlite:///./plantdex.db"
+BATCH_SIZE = 5000
+CHECKPOINT_TABLE = "migration_checkpoints"
+MAX_ERRORS_SHOWN = 10
+
+def migration_tables():
+    """Every model table, parents before children"""
+    return Base.metadata.sorted_tables + SellToUsBase.metadata.sorted_tables
+
+def create_target_schema(target_engine):
+    """Create missing tables and the checkpoint table on PostgreSQL"""
+    for metadata in (Base.metadata, SellToUsBase.metadata):
+        metadata.create_all(bind=target_engine, checkfirst=True)
+    with target_engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+            "table_name VARCHAR(100) PRIMARY KEY, last_id BIGINT, rows_copied BIGINT NOT NULL DEFAULT 0, "
+            "rows_failed BIGINT NOT NULL DEFAULT 0, completed BOOLEAN NOT NULL DEFAULT FALSE, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+
+def load_checkpoints(target_engine):
+    with target_engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT table_name, last_id, rows_copied, rows_failed, completed FROM {CHECKPOINT_TABLE}"))
+        return {row.table_name: row for row in rows}
+
+def restart(target_engine, tables):
+    """Empty the target tables and forget all checkpoints"""
+    names = ", ".join(table.name for table in tables)
+    with target_engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+        conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE}"))
+
+def save_checkpoint(cursor, table_name, last_id, copied, failed, completed=False):
+    cursor.execute(
+        f"INSERT INTO {CHECKPOINT_TABLE} (table_name, last_id, rows_copied, rows_failed, completed) "
+        "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (table_name) DO UPDATE SET last_id = EXCLUDED.last_id, "
+        "rows_copied = EXCLUDED.rows_copied, rows_failed = EXCLUDED.rows_failed, "
+        "completed = EXCLUDED.completed, updated_at = now()",
+        (table_name, last_id, copied, failed, completed),
+    )
+
+def reset_sequence(cursor, table, key):
+    """Move the serial sequence of `key` past the copied primary keys"""
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', '{key}'), "
+        f"COALESCE((SELECT MAX({key}) FROM {table.name}), 0) + 1, false) "
+        f"WHERE pg_get_serial_sequence('{table.name}', '{key}') IS NOT NULL"
+    )
+
+def copy_batch(cursor, table, columns, rows, errors):
+    """COPY one batch; a failing batch is retried row by row so one bad row does not stop the table"""
+    try:
+        cursor.execute("SAVEPOINT migrate_batch")
+        copy_rows(cursor, table.name, columns, rows)
+        cursor.execute("RELEASE SAVEPOINT migrate_batch")
+        return len(rows), 0
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT migrate_batch")
+
+    copied = 0
+    for row in rows:
+        try:
+            copy_rows(cursor, table.name, columns, [row])
+            cursor.execute("RELEASE SAVEPOINT migrate_batch")
+            copied += 1
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT migrate_batch")
+            cursor.execute("RELEASE SAVEPOINT migrate_batch")
+            errors.append(f"{table.name} id={row[0]}: {str(e).strip().splitlines()[0]}")
+        cursor.execute("SAVEPOINT migrate_batch")
+    cursor.execute("RELEASE SAVEPOINT migrate_batch")
+    return copied, len(rows) - copied
+
+def migrate_table(source, target_engine, table, checkpoint, batch_size):
+    """Stream one table in primary key order; returns (copied, failed)"""
+    keys = list(table.primary_key.columns)
+    if len(keys) != 1:
+        raise RuntimeError(f"{table.name}: only single-column primary keys are supported")
+    key = keys[0].name
+
+    source_columns = {column["name"] for column in inspect(source).get_columns(table.name)}
+    # คอลัมน์ที่ฐานข้อมูล dev ยังไม่มีจะได้ค่า default ฝั่ง PostgreSQL
+    columns = [key] + [column.name for column in table.columns if column.name in source_columns and column.name != key]
 
-def migrate_to_postgres():
+    last_id = checkpoint.last_id if checkpoint else None
+    copied = checkpoint.rows_copied if checkpoint else 0
+    failed = checkpoint.rows_failed if checkpoint else 0
+    total = source.execute(text(f"SELECT COUNT(*) FROM {table.name}")).scalar()
+    select = text(
+        f"SELECT {', '.join(columns)} FROM {table.name} WHERE {key} > :last_id ORDER BY {key} LIMIT :limit"
+    )
+
+    errors = []
+    started = time.perf_counter()
+    connection = target_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        while True:
+            # text() ไม่แปลง type - ส่งค่าดิบจาก SQLite ไป COPY ตรงๆ
+            rows = source.execute(select, {"last_id": -1 if last_id is None else last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            batch_copied, batch_failed = copy_batch(cursor, table, columns, [tuple(row) for row in rows], errors)
+            copied += batch_copied
+            failed += batch_failed
+            last_id = rows[-1][0]
+            save_checkpoint(cursor, table.name, last_id, copied, failed)
+            connection.commit()
+
+            rate = (copied + failed) / max(time.perf_counter() - started, 1e-9)
+            print(f"\r   {table.name}: {copied + failed}/{total} rows ({rate:.0f} rows/s)", end="", flush=True)
+
+        reset_sequence(cursor, table, key)
+        save_checkpoint(cursor, table.name, last_id, copied, failed, completed=True)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    print(f"\r✅ {table.name}: {copied} rows copied" + (f", {failed} failed" if failed else "") + " " * 20)
+    for error in errors[:MAX_ERRORS_SHOWN]:
+        print(f"   ⚠️  {error}")
+    if len(errors) > MAX_ERRORS_SHOWN:
+        print(f"   ... and {len(errors) - MAX_ERRORS_SHOWN} more errors")
+    return copied, failed
+
+def migrate_to_postgres(source_url=SQLITE_URL, batch_size=BATCH_SIZE, restart_from_scratch=False):
     """Migrate data from SQLite to PostgreSQL"""
-    
-    # Source: SQLite (development)
-    sqlite_url = "sqlite:///./plantdex.db"
-    sqlite_engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
-    SQLiteSession = sessionmaker(bind=sqlite_engine)
-    
+
     # Target: PostgreSQL (production)
     postgres_url = os.getenv("DATABASE_URL")
-    if not postgres_url:
+    if not postgres_url or not postgres_url.startswith("postgres"):
         print("❌ DATABASE_URL not found. Please set PostgreSQL connection string.")
-        return
-    
+        return False
+
+    sqlite_engine = create_engine(source_url)
     postgres_engine = create_engine(postgres_url)
-    PostgresSession = sessionmaker(bind=postgres_engine)
-    
+    tables = migration_tables()
+
     print("🚀 Starting migration from SQLite to PostgreSQL...")
-    
+
     try:
-        # Test PostgreSQL connection
-        with postgres_engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            print("✅ PostgreSQL connection successful")
-        
-        # Migrate data
-        sqlite_session = SQLiteSession()
-        postgres_session = PostgresSession()
-        
-        # Migrate Plants
-        print("🌱 Migrating plants...")
-        plants = sqlite_session.query(Plant).all()
-        for plant in plants:
-            # Create new plant in PostgreSQL
-            new_plant = Plant(
-                scientific_name=plant.scientific_name,
-                common_name_th=plant.common_name_th,
-                common_name_en=plant.common_name_en,
-                category=plant.category,
-                care_level=plant.care_level,
-                origin_country=plant.origin_country,
-                description_th=plant.description_th,
-                description_en=plant.description_en,
-                care_instructions=plant.care_instructions,
-                water_needs=plant.water_needs,
-                light_needs=plant.light_needs,
-                humidity_needs=plant.humidity_needs,
-                temperature_min=plant.temperature_min,
-                temperature_max=plant.temperature_max,
-                growth_rate=plant.growth_rate,
-                max_height=plant.max_height,
-                max_width=plant.max_width,
-                is_poisonous=plant.is_poisonous,
-                is_rare=plant.is_rare,
-                is_trending=plant.is_trending
-            )
-            postgres_session.add(new_plant)
-        
-        postgres_session.commit()
-        print(f"✅ Migrated {len(plants)} plants")
-        
-        # Migrate Users
-        print("👥 Migrating users...")
-        users = sqlite_session.query(User).all()
-        for user in users:
-            new_user = User(
-                email=user.email,
-                username=user.username,
-                hashed_password=user.hashed_password,
-                full_name=user.full_name,
-                phone=user.phone,
-                location=user.location,
-                province=user.province,
-                is_verified=user.is_verified,
-                subscription_tier=user.subscription_tier
-            )
-            postgres_session.add(new_user)
-        
-        postgres_session.commit()
-        print(f"✅ Migrated {len(users)} users")
-        
-        # Migrate Plant Prices
-        print("💰 Migrating plant prices...")
-        prices = sqlite_session.query(PlantPrice).all()
-        for price in prices:
-            new_price = PlantPrice(
-                plant_id=price.plant_id,
-                source=price.source,
-                source_url=price.source_url,
-                price=price.price,
-                currency=price.currency,
-                plant_size=price.plant_size,
-                pot_size=price.pot_size,
-                condition=price.condition,
-                seller_location=price.seller_location,
-                seller_name=price.seller_name,
-                seller_rating=price.seller_rating,
-                availability=price.availability,
-                stock_quantity=price.stock_quantity,
-                shipping_cost=price.shipping_cost,
-                shipping_time=price.shipping_time,
-                is_verified=price.is_verified
-            )
-            postgres_session.add(new_price)
-        
-        postgres_session.commit()
-        print(f"✅ Migrated {len(prices)} price records")
-        
-        print("\n🎉 Migration completed successfully!")
-        print(f"📊 Total migrated:")
-        print(f"  - Plants: {len(plants)}")
-        print(f"  - Users: {len(users)}")
-        print(f"  - Prices: {len(prices)}")
-        
+        create_target_schema(postgres_engine)
+        print("✅ PostgreSQL schema ready")
+        if restart_from_scratch:
+            restart(postgres_engine, tables)
+            print("🗑️  Target tables emptied, checkpoints cleared")
+        checkpoints = load_checkpoints(postgres_engine)
+
+        started = time.perf_counter()
+        totals = {}
+        with sqlite_engine.connect() as source:
+            source_tables = set(inspect(source).get_table_names())
+            for table in tables:
+                checkpoint = checkpoints.get(table.name)
+                if checkpoint and checkpoint.completed:
+                    print(f"⏭️  {table.name}: already migrated ({checkpoint.rows_copied} rows)")
+                    continue
+                if table.name not in source_tables:
+                    print(f"⏭️  {table.name}: not in source database")
+                    continue
+                if checkpoint is None:
+                    with postgres_engine.connect() as conn:
+                        if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table.name})")).scalar():
+                            print(f"❌ {table.name} already has rows in PostgreSQL; run with --restart to replace them")
+                            return False
+                elif checkpoint.last_id is not None:
+                    print(f"↩️  {table.name}: resuming after id {checkpoint.last_id}")
+                totals[table.name] = migrate_table(source, postgres_engine, table, checkpoint, batch_size)
+
+        copied = sum(count for count, _ in totals.values())
+        failed = sum(count for _, count in totals.values())
+        print(f"\n🎉 Migration completed in {time.perf_counter() - started:.1f}s!")
+        print(f"📊 {copied} rows copied across {len(totals)} tables" + (f", {failed} rows failed" if failed else ""))
+        return True
+
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
-        postgres_session.rollback()
+        print(f"\n❌ Migration failed: {e}")
+        print("💡 Re-run the same command to resume from the last checkpoint")
+        return False
     finally:
-        sqlite_session.close()
-        postgres_session.close()
+        sqlite_engine.dispose()
+        postgres_engine.dispose()
 
 if __name__ == "__main__":
-    migrate_to_postgres() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate PlantDex data from SQLite to PostgreSQL")
+    parser.add_argument("--source", default=SQLITE_URL, help=f"source database URL (default {SQLITE_URL})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="empty the target tables and start over")
+    args = parser.parse_args()
+    sys.exit(0 if migrate_to_postgres(args.source, args.batch_size, args.restart) else 1)
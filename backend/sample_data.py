@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.core.database import SessionLocal
 from app.models.plant import Plant, PlantCategory, CareLevel
 from app.models.price import PlantPrice
+from app.services.price_summary import refresh_price_summaries
 from app.models.user import User, Seller
 from app.core.security import get_password_hash
 from datetime import datetime, date
@@ -163,6 +164,9 @@ def insert_sample_data():
             price = PlantPrice(**price_data_item)
             db.add(price)
         
+        # สรุปราคาของ plant ที่เพิ่มราคาใน transaction เดียวกัน
+        db.flush()
+        refresh_price_summaries(db, {item["plant_id"] for item in price_data})
         db.commit()
         print(f"✅ Inserted {len(price_data)} price records")
         
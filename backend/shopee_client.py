@@ -6,93 +6,265 @@ Simple client to collect plant data from Shopee
 
 import requests
 import hashlib
+import random
+import threading
 import time
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 # Load environment variables
 load_dotenv('../env.production')
 
+# requests/second และ burst ต่อ endpoint (ตาม quota ของ partner API)
+DEFAULT_RATE_LIMITS = {
+    "item/search": (10.0, 10),
+    "item/get": (20.0, 20),
+    "shop/get": (10.0, 10),
+}
+FALLBACK_RATE_LIMIT = (5.0, 5)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+SEARCH_PAGE_SIZE = 50  # สูงสุดต่อหน้าของ item/search
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
 class ShopeeClient:
-    """Simple Shopee API client for plant data collection"""
+    """Shopee API client for plant data collection.
     
-    def __init__(self):
+    Shares one keep-alive requests.Session across threads, rate-limits each
+    endpoint with a token bucket and retries 429/5xx/network errors with
+    jittered exponential backoff.
+    """
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        max_workers: int = 8,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        timeout: float = 15.0,
+        verbose: bool = True,
+    ):
         self.app_id = os.getenv('SHOPEE_APP_ID', '15394330041')
         self.secret_key = os.getenv('SHOPEE_SECRET_KEY', 'IWGHVNOTGSQ44M7LB6ZEALICHFG6G5GP')
-        self.base_url = "https://partner.shopeemobile.com"
+        self.base_url = base_url or os.getenv('SHOPEE_BASE_URL', "https://partner.shopeemobile.com")
         self.access_token = None
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.verbose = verbose
+        
+        # connection pool ใหญ่พอสำหรับทุก worker - ไม่ต้อง handshake TLS ใหม่ทุก request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, 10))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self._limiters = {
+            endpoint: TokenBucket(rate, burst)
+            for endpoint, (rate, burst) in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+        self._limiters_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
         
         print(f"🔑 Shopee Client initialized with App ID: {self.app_id}")
     
+    def close(self):
+        self.session.close()
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    def _limiter(self, endpoint: str) -> TokenBucket:
+        with self._limiters_lock:
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = TokenBucket(*FALLBACK_RATE_LIMIT)
+            return self._limiters[endpoint]
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
     def _generate_signature(self, path: str, timestamp: int, access_token: str = "") -> str:
         """Generate signature for Shopee API requests"""
         base_string = f"{self.app_id}{path}{timestamp}{access_token}{self.secret_key}"
         return hashlib.sha256(base_string.encode()).hexdigest()
     
     def _make_request(self, endpoint: str, params: Dict = None, method: str = "GET") -> Optional[Dict]:
-        """Make authenticated request to Shopee API"""
-        try:
-            timestamp = int(time.time())
-            path = f"/api/v2/{endpoint}"
-            
-            # Generate signature
-            signature = self._generate_signature(path, timestamp, self.access_token or "")
-            
-            # Prepare headers
-            headers = {
-                "Authorization": f"SHA256 {signature}",
-                "Content-Type": "application/json"
-            }
-            
-            # Prepare parameters
-            if params is None:
-                params = {}
-            
-            params.update({
-                "app_id": self.app_id,
-                "timestamp": timestamp,
-                "access_token": self.access_token or ""
-            })
-            
-            # Make request
-            if method.upper() == "GET":
-                response = requests.get(f"{self.base_url}{path}", params=params, headers=headers)
-            else:
-                response = requests.post(f"{self.base_url}{path}", json=params, headers=headers)
+        """Make authenticated, rate-limited request to Shopee API (with retries)"""
+        path = f"/api/v2/{endpoint}"
+        limiter = self._limiter(endpoint)
+        
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            self._count("requests")
+            retry_after = None
+            try:
+                # ลายเซ็นผูกกับ timestamp จึงต้องสร้างใหม่ทุกครั้งที่ retry
+                timestamp = int(time.time())
+                signature = self._generate_signature(path, timestamp, self.access_token or "")
+                
+                headers = {
+                    "Authorization": f"SHA256 {signature}",
+                    "Content-Type": "application/json"
+                }
+                
+                request_params = dict(params or {})
+                request_params.update({
+                    "app_id": self.app_id,
+                    "timestamp": timestamp,
+                    "access_token": self.access_token or ""
+                })
+                
+                if method.upper() == "GET":
+                    response = self.session.get(
+                        f"{self.base_url}{path}", params=request_params, headers=headers, timeout=self.timeout
+                    )
+                else:
+                    response = self.session.post(
+                        f"{self.base_url}{path}", json=request_params, headers=headers, timeout=self.timeout
+                    )
+                
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in RETRY_STATUS_CODES:
+                    print(f"❌ API Error: {response.status_code} - {response.text[:200]}")
+                    self._count("failures")
+                    return None
+                retry_after = response.headers.get("Retry-After")
+                error = f"HTTP {response.status_code}"
+                
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except Exception as e:
+                print(f"❌ Request error: {e}")
+                self._count("failures")
+                return None
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"❌ API Error: {response.status_code} - {response.text}")
+            if attempt == self.max_retries:
+                print(f"❌ {endpoint} failed after {attempt + 1} attempts: {error}")
+                self._count("failures")
                 return None
-                
-        except Exception as e:
-            print(f"❌ Request error: {e}")
-            return None
-    
-    def search_plants(self, keyword: str = "ต้นไม้มีชีวิต", limit: int = 50) -> Optional[List[Dict]]:
-        """Search for plant products on Shopee"""
-        print(f"🔍 Searching for plants with keyword: '{keyword}'")
+            self._count("retries")
+            time.sleep(self._backoff(attempt, retry_after))
         
+        return None
+    
+    def search_plants_page(self, keyword: str, offset: int = 0, page_size: int = SEARCH_PAGE_SIZE) -> Optional[Dict]:
+        """One page of item/search: {"items", "has_next_page", "next_offset"} or None on failure"""
         params = {
             "keyword": keyword,
-            "limit": limit,
-            "offset": 0,
+            "limit": page_size,
+            "offset": offset,
             "category_id": "11075404",  # Live Plants category
             "sort_by": "pop"  # Sort by popularity
         }
         
         result = self._make_request("item/search", params)
+        if not result or result.get("error") is not None:
+            return None
         
-        if result and result.get("error") is None:
-            items = result.get("response", {}).get("items", [])
+        response = result.get("response", {})
+        items = response.get("items", [])
+        return {
+            "items": items,
+            "has_next_page": bool(response.get("has_next_page")) and len(items) > 0,
+            "next_offset": response.get("next_offset", offset + len(items)),
+        }
+    
+    def search_plants(self, keyword: str = "ต้นไม้มีชีวิต", limit: int = 50) -> Optional[List[Dict]]:
+        """Search for plant products on Shopee (follows offset pagination up to `limit`)"""
+        if self.verbose:
+            print(f"🔍 Searching for plants with keyword: '{keyword}'")
+        
+        items = []
+        offset = 0
+        while len(items) < limit:
+            page = self.search_plants_page(keyword, offset, min(SEARCH_PAGE_SIZE, limit - len(items)))
+            if page is None:
+                if not items:
+                    print(f"❌ Search failed for '{keyword}'")
+                    return None
+                break
+            items.extend(page["items"])
+            if not page["has_next_page"]:
+                break
+            offset = page["next_offset"]
+        
+        if self.verbose:
             print(f"✅ Found {len(items)} plant products")
-            return items
-        else:
-            print(f"❌ Search failed: {result}")
-            return None
+        return items[:limit]
+    
+    def search_many(
+        self, keywords: Sequence[str], limit_per_keyword: int = 50, page_size: int = SEARCH_PAGE_SIZE
+    ) -> Iterator[Tuple[str, List[Dict]]]:
+        """Fetch every keyword's pages concurrently; yields (keyword, items) as pages arrive.
+        
+        Pages are requested by offset up front so all workers stay busy; once a
+        keyword reports its last page, its later pages are skipped.
+        """
+        last_offset: Dict[str, int] = {}
+        lock = threading.Lock()
+        
+        def fetch(keyword: str, offset: int, size: int) -> Tuple[str, List[Dict]]:
+            with lock:
+                if keyword in last_offset and offset > last_offset[keyword]:
+                    return keyword, []
+            page = self.search_plants_page(keyword, offset, size)
+            if page is None:
+                print(f"⚠️ Page offset={offset} failed for '{keyword}'")
+                return keyword, []
+            if not page["has_next_page"]:
+                with lock:
+                    last_offset[keyword] = min(offset, last_offset.get(keyword, offset))
+            return keyword, page["items"]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shopee") as pool:
+            futures = [
+                pool.submit(fetch, keyword, offset, min(page_size, limit_per_keyword - offset))
+                for keyword in keywords
+                for offset in range(0, limit_per_keyword, page_size)
+            ]
+            for future in as_completed(futures):
+                keyword, items = future.result()
+                if items:
+                    yield keyword, items
     
     def get_product_details(self, item_id: int) -> Optional[Dict]:
         """Get detailed information about a specific product"""
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Shopee Bulk Ingestion for PlantDex
+Buffer Shopee products and upsert them in batches (products, price history, shops)
+"""
+
+import hashlib
+import json
+import time
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from psycopg2.extras import execute_values
+
+DEFAULT_BATCH_SIZE = 1000
+
+PRODUCT_COLUMNS = (
+    "item_id", "name", "price", "original_price", "category", "shop_name",
+    "shop_id", "rating", "sold_count", "view_count", "like_count",
+    "description", "primary_image_url", "additional_images", "content_hash",
+)
+
+UPSERT_PRODUCTS_SQL = f"""
+    INSERT INTO shopee_products ({", ".join(PRODUCT_COLUMNS)}, updated_at)
+    VALUES %s
+    ON CONFLICT (item_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        price = EXCLUDED.price,
+        original_price = EXCLUDED.original_price,
+        category = EXCLUDED.category,
+        shop_name = EXCLUDED.shop_name,
+        rating = EXCLUDED.rating,
+        sold_count = EXCLUDED.sold_count,
+        view_count = EXCLUDED.view_count,
+        like_count = EXCLUDED.like_count,
+        description = EXCLUDED.description,
+        primary_image_url = EXCLUDED.primary_image_url,
+        additional_images = EXCLUDED.additional_images,
+        content_hash = EXCLUDED.content_hash,
+        updated_at = NOW()
+    WHERE shopee_products.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+"""
+
+SELECT_EXISTING_SQL = """
+    SELECT item_id, content_hash, price, original_price
+    FROM shopee_products
+    WHERE item_id = ANY(%s)
+"""
+PRODUCT_TEMPLATE = "(" + ", ".join(["%s"] * len(PRODUCT_COLUMNS)) + ", NOW())"
+
+INSERT_PRICE_HISTORY_SQL = """
+    INSERT INTO price_history (item_id, price, original_price, discount_percentage)
+    VALUES %s
+"""
+
+UPSERT_SHOPS_SQL = """
+    INSERT INTO shopee_shops (shop_id, shop_name, created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (shop_id) DO UPDATE SET
+        shop_name = EXCLUDED.shop_name,
+        updated_at = NOW()
+    WHERE shopee_shops.shop_name IS DISTINCT FROM EXCLUDED.shop_name
+"""
+
+
+def parse_product(product_data: dict) -> Dict:
+    """Map a Shopee item payload to shopee_products column values"""
+    images = product_data.get('images') or []
+    row = {
+        "item_id": product_data.get('item_id'),
+        "name": product_data.get('name', ''),
+        "price": product_data.get('price', 0) / 100000,  # Convert from Shopee format
+        "original_price": product_data.get('original_price', 0) / 100000,
+        "category": product_data.get('category_name', ''),
+        "shop_name": product_data.get('shop_name', ''),
+        "shop_id": product_data.get('shop_id'),
+        "rating": product_data.get('item_rating', {}).get('rating_star', 0),
+        "sold_count": product_data.get('historical_sold', 0),
+        "view_count": product_data.get('view_count', 0),
+        "like_count": product_data.get('like_count', 0),
+        "description": product_data.get('description', ''),
+        "primary_image_url": f"https://cf.shopee.co.th/file/{images[0]}" if images else "",
+        "additional_images": json.dumps([f"https://cf.shopee.co.th/file/{img}" for img in images[1:]]),
+    }
+    row["content_hash"] = content_hash(row)
+    return row
+
+
+def content_hash(row: Dict) -> str:
+    """Fingerprint of everything we store for a listing (not a security hash)"""
+    payload = json.dumps(
+        [row[column] for column in PRODUCT_COLUMNS if column != "content_hash"],
+        ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def money(value) -> Optional[Decimal]:
+    """Round like DECIMAL(10,2) so incoming floats compare with stored prices"""
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def discount_percentage(price: float, original_price: float) -> float:
+    return ((original_price - price) / original_price * 100) if original_price > price else 0
+
+
+class BulkProductWriter:
+    """Buffer Shopee products and write them with multi-row upserts.
+
+    Each flush dedupes the batch (last payload per item_id / shop_id wins)
+    and compares content hashes with the stored rows: unchanged listings are
+    not rewritten, and price_history only gets a row when the price or
+    original price actually moved. Writes go out with execute_values in key
+    order and are committed per batch. A batch that fails is retried row by
+    row so one bad product only costs itself.
+    """
+
+    def __init__(self, conn, batch_size: int = DEFAULT_BATCH_SIZE, verbose: bool = True):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self._buffer: Dict[int, Dict] = {}
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0, "price_changes": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # เก็บสิ่งที่ดึงมาแล้วไว้ แม้การ crawl จะล้มกลางทาง
+        self.flush()
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_written / self.seconds if self.seconds else 0.0
+
+    def add(self, product_data: dict):
+        row = parse_product(product_data)
+        if row["item_id"] is None:
+            self.rows_failed += 1
+            return
+        # ON CONFLICT DO UPDATE แก้แถวเดิมซ้ำใน statement เดียวไม่ได้ - เก็บตัวล่าสุดต่อ item_id
+        self._buffer.pop(row["item_id"], None)
+        self._buffer[row["item_id"]] = row
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, products: Iterable[dict]):
+        for product in products:
+            self.add(product)
+
+    def flush(self) -> int:
+        """Write and commit the buffered batch; returns rows processed"""
+        if not self._buffer:
+            return 0
+        rows = sorted(self._buffer.values(), key=lambda row: row["item_id"])
+        self._buffer = {}
+
+        started = time.perf_counter()
+        try:
+            with self.conn.cursor() as cursor:
+                counts = self._write_batch(cursor, rows)
+            self.conn.commit()
+            written = len(rows)
+        except Exception as e:
+            self.conn.rollback()
+            print(f"⚠️ Batch of {len(rows)} failed ({e}) - retrying row by row")
+            written, counts = self._write_rows_individually(rows)
+        elapsed = time.perf_counter() - started
+
+        for key, value in counts.items():
+            self.counts[key] += value
+        self.rows_written += written
+        self.rows_failed += len(rows) - written
+        self.batches += 1
+        self.seconds += elapsed
+        if self.verbose:
+            print(
+                f"💾 Batch {self.batches}: {written} products in {elapsed:.2f}s "
+                f"({written / elapsed if elapsed else 0:,.0f} rows/s) - "
+                f"{counts['inserted']} new, {counts['updated']} changed, {counts['unchanged']} unchanged"
+            )
+        return written
+
+    def _write_batch(self, cursor, rows: List[Dict]) -> Dict[str, int]:
+        cursor.execute(SELECT_EXISTING_SQL, ([row["item_id"] for row in rows],))
+        existing = {item_id: (hash_, price, original) for item_id, hash_, price, original in cursor.fetchall()}
+
+        changed = []
+        history = []
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "price_changes": 0}
+        for row in rows:
+            previous = existing.get(row["item_id"])
+            if previous is not None and previous[0] == row["content_hash"]:
+                counts["unchanged"] += 1
+                continue
+            changed.append(row)
+            counts["inserted" if previous is None else "updated"] += 1
+
+            if row["price"] > 0 and (
+                previous is None
+                or money(row["price"]) != previous[1]
+                or money(row["original_price"]) != previous[2]
+            ):
+                history.append((
+                    row["item_id"], row["price"], row["original_price"],
+                    discount_percentage(row["price"], row["original_price"]),
+                ))
+        counts["price_changes"] = len(history)
+
+        if changed:
+            execute_values(
+                cursor, UPSERT_PRODUCTS_SQL,
+                [tuple(row[column] for column in PRODUCT_COLUMNS) for row in changed],
+                template=PRODUCT_TEMPLATE, page_size=len(changed),
+            )
+        if history:
+            execute_values(cursor, INSERT_PRICE_HISTORY_SQL, history, page_size=len(history))
+
+        shops: Dict[int, str] = {}
+        for row in changed:
+            if row["shop_id"]:
+                shops[row["shop_id"]] = row["shop_name"]
+        if shops:
+            execute_values(
+                cursor, UPSERT_SHOPS_SQL, sorted(shops.items()),
+                template="(%s, %s, NOW(), NOW())", page_size=len(shops),
+            )
+        return counts
+
+    def _write_rows_individually(self, rows: List[Dict]):
+        written = 0
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "price_changes": 0}
+        with self.conn.cursor() as cursor:
+            for row in rows:
+                # savepoint ต่อสินค้า - แถวที่เสียไม่ทำให้ทั้ง batch ถูก rollback
+                cursor.execute("SAVEPOINT product")
+                try:
+                    for key, value in self._write_batch(cursor, [row]).items():
+                        counts[key] += value
+                    cursor.execute("RELEASE SAVEPOINT product")
+                    written += 1
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT product")
+                    print(f"❌ Error saving product {row.get('name') or row['item_id']}: {e}")
+        self.conn.commit()
+        return written, counts
+
+    def summary(self) -> Optional[str]:
+        if not self.batches:
+            return None
+        return (
+            f"{self.rows_written:,} products in {self.batches} batches, {self.seconds:.1f}s "
+            f"({self.rows_per_second:,.0f} rows/s) - {self.counts['inserted']:,} new, "
+            f"{self.counts['updated']:,} changed, {self.counts['unchanged']:,} unchanged, "
+            f"{self.counts['price_changes']:,} price changes, {self.rows_failed} failed"
+        )
@@ -1,140 +1,76 @@
 #!/usr/bin/env python3
 """
 Sync Plants to Railway Database
+Differential sync ของ plant master CSV - เขียนเฉพาะพืชที่เพิ่ม/เปลี่ยน/หายไปจากไฟล์
+
+    python sync_plants.py                      # sync plant_data/plantdex_master_1-118.csv
+    python sync_plants.py --dry-run            # แสดง diff อย่างเดียว
+    python sync_plants.py --file master.csv --keep-missing
 """
 
-from app.core.database import SessionLocal
-from app.models.plant import Plant, PlantCategory, CareLevel
-import csv
+import sys
 import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.models.plant import Plant, PlantMasterHash
+from app.services.plant_sync import sync_plant_master
+
+MASTER_CSV = 'plant_data/plantdex_master_1-118.csv'
 
-def sync_plants():
+def print_summary(report):
+    """แสดงสรุป diff"""
+    title = "Diff (dry run - ยังไม่ได้เขียน)" if report.dry_run else "Sync เสร็จสิ้น!"
+    print(f"\n🎯 {title} ({report.rows_read} แถว, {report.elapsed_seconds:.2f} วินาที)")
+    print(f"  ✅ เพิ่มพืชใหม่: {report.inserted} ต้น")
+    print(f"  ✏️  แก้ไข: {report.updated} ต้น")
+    print(f"  🗑️  ลบ (ไม่อยู่ในไฟล์แล้ว): {report.deleted} ต้น")
+    print(f"  💤 ไม่เปลี่ยนแปลง: {report.unchanged} ต้น")
+    if report.skipped:
+        print(f"  ⚠️  ชื่อซ้ำในไฟล์ (ข้าม): {report.skipped} แถว")
+    if report.failed:
+        print(f"  ❌ ผิดพลาด: {report.failed} แถว")
+    for kind, icon in (("insert", "+"), ("update", "~"), ("delete", "-")):
+        for name in report.samples[kind]:
+            print(f"     {icon} {name}")
+    for error in report.errors[:10]:
+        print(f"     ❌ บรรทัด {error['line']} ({error['key']}): {error['error']}")
+
+def sync_plants(csv_file=MASTER_CSV, dry_run=False, keep_missing=False):
     print("🌱 เริ่ม sync ข้อมูลพืช...")
-    
+
+    if not os.path.exists(csv_file):
+        print(f"❌ ไม่พบไฟล์: {csv_file}")
+        return False
+
     db = SessionLocal()
     try:
-        # ตรวจสอบข้อมูลปัจจุบัน
-        current_count = db.query(Plant).count()
-        print(f"พืชปัจจุบัน: {current_count} ต้น")
-        
-        # แปลงค่า category ให้ตรงกับ enum
-        category_mapping = {
-            'indoor': PlantCategory.INDOOR,
-            'outdoor': PlantCategory.OUTDOOR,
-            'tropical': PlantCategory.TROPICAL,
-            'succulent': PlantCategory.SUCCULENT,
-            'cactus': PlantCategory.CACTUS,
-            'orchid': PlantCategory.ORCHID,
-            'herb': PlantCategory.HERB,
-            'tree': PlantCategory.TREE,
-            'shrub': PlantCategory.SHRUB,
-            'vine': PlantCategory.VINE,
-            'garden': PlantCategory.GARDEN,
-            'water': PlantCategory.WATER,
-            'rock': PlantCategory.ROCK,
-            'border': PlantCategory.BORDER,
-            'other': PlantCategory.OTHER
-        }
-        
-        # แปลงค่า care_level ให้ตรงกับ enum
-        care_level_mapping = {
-            'easy': CareLevel.EASY,
-            'moderate': CareLevel.MODERATE,
-            'difficult': CareLevel.DIFFICULT
-        }
-        
-        # แปลงค่า boolean
-        def parse_boolean(value):
-            if isinstance(value, str):
-                return value.lower() in ['true', '1', 'yes', 'y']
-            return bool(value)
-        
-        # แปลงค่า numeric
-        def parse_float(value):
-            try:
-                return float(value) if value else 0.0
-            except (ValueError, TypeError):
-                return 0.0
-        
-        # อ่านข้อมูลจาก CSV
-        csv_file = 'plant_data/plantdex_master_1-118.csv'
-        
-        if not os.path.exists(csv_file):
-            print(f"❌ ไม่พบไฟล์: {csv_file}")
-            return
-        
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            plants_added = 0
-            plants_skipped = 0
-            
-            for row in reader:
-                try:
-                    # ตรวจสอบว่าพืชมีอยู่แล้วหรือไม่
-                    existing_plant = db.query(Plant).filter(
-                        Plant.scientific_name == row['scientific_name']
-                    ).first()
-                    
-                    if existing_plant:
-                        print(f"  ⚠️  พืชมีอยู่แล้ว: {row['scientific_name']} ข้ามไป")
-                        plants_skipped += 1
-                        continue
-                    
-                    # แปลงค่า category
-                    csv_category = row['category'].lower()
-                    mapped_category = category_mapping.get(csv_category, PlantCategory.OTHER)
-                    
-                    # แปลงค่า care_level
-                    csv_care_level = row['care_level'].lower()
-                    mapped_care_level = care_level_mapping.get(csv_care_level, CareLevel.MODERATE)
-                    
-                    # สร้างพืชใหม่
-                    plant = Plant(
-                        scientific_name=row['scientific_name'],
-                        common_name_th=row['common_name_th'],
-                        common_name_en=row['common_name_en'],
-                        category=mapped_category,
-                        care_level=mapped_care_level,
-                        origin_country=row['origin_country'],
-                        description_th=row['description_th'],
-                        description_en=row['description_en'],
-                        care_instructions=row['care_instructions'],
-                        water_needs=row['water_needs'],
-                        light_needs=row['light_needs'],
-                        humidity_needs=row['humidity_needs'],
-                        temperature_min=parse_float(row['temperature_min']),
-                        temperature_max=parse_float(row['temperature_max']),
-                        growth_rate=row['growth_rate'],
-                        max_height=parse_float(row['max_height']),
-                        max_width=parse_float(row['max_width']),
-                        is_poisonous=parse_boolean(row['is_poisonous']),
-                        is_rare=parse_boolean(row['is_rare']),
-                        is_trending=parse_boolean(row['is_trending'])
-                    )
-                    
-                    db.add(plant)
-                    plants_added += 1
-                    print(f"  ✅ เพิ่มพืช: {row['common_name_th']} ({row['scientific_name']})")
-                    
-                except Exception as e:
-                    print(f"  ❌ เกิดข้อผิดพลาดกับพืช: {row.get('scientific_name', 'Unknown')} - {e}")
-                    continue
-            
-            try:
-                db.commit()
-                print(f"\n🎯 Sync เสร็จสิ้น!")
-                print(f"  ✅ เพิ่มพืชใหม่: {plants_added} ต้น")
-                print(f"  ⚠️  ข้ามพืชที่มีอยู่: {plants_skipped} ต้น")
-                print(f"  📊 รวมพืชในฐานข้อมูล: {db.query(Plant).count()} ต้น")
-            except Exception as e:
-                print(f"❌ เกิดข้อผิดพลาดในการ commit: {e}")
-                db.rollback()
-                
+        PlantMasterHash.__table__.create(bind=engine, checkfirst=True)
+        print(f"พืชปัจจุบัน: {db.query(Plant).count()} ต้น")
+
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+            report = sync_plant_master(db, file, apply=not dry_run, delete_missing=not keep_missing)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+        print_summary(report)
+        print(f"  📊 รวมพืชในฐานข้อมูล: {db.query(Plant).count()} ต้น")
+        return True
+
     except Exception as e:
         print(f"❌ เกิดข้อผิดพลาด: {e}")
         db.rollback()
+        return False
     finally:
         db.close()
 
 if __name__ == "__main__":
-    sync_plants() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Differential sync of the plant master CSV")
+    parser.add_argument("--file", default=MASTER_CSV)
+    parser.add_argument("--dry-run", action="store_true", help="print the diff without writing")
+    parser.add_argument("--keep-missing", action="store_true", help="do not delete plants that left the file")
+    args = parser.parse_args()
+    sys.exit(0 if sync_plants(args.file, args.dry_run, args.keep_missing) else 1)